@@ -0,0 +1,275 @@
+"""
+Admission control and load shedding
+Requests are classified by route into cheap reads, compute (analyze,
+feasibility, risk, dashboard) and expensive (plans, login, sign-up) classes.  Each
+class has a concurrency limit and a bounded FIFO queue.  A request that
+cannot start in time is answered straight away with 503 and Retry-After
+instead of waiting until the client has given up:
+
+- queue_full: the class queue is at capacity
+- deadline:   the estimated queue wait (or the actual wait) exceeds the
+              class timeout, or the client's X-Request-Timeout if shorter
+- shed:       the server as a whole is under pressure and this class is
+              shed before cheaper ones (expensive first, then compute)
+
+Pressure is the fraction of slots and queue places in use across the
+sheddable classes (shed_at below 1, so not cheap reads, whose large
+capacity would otherwise hide a saturated compute or expensive class); a
+class sheds arrivals that would have to queue once pressure reaches its
+shed_at level.  Configured with ADMISSION_* environment
+variables; see build_controller().
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+from responses import dumps
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+# (class, method or None for any, path prefix); first match wins.  A trailing
+# "$" matches the path exactly (sign-up, but not /api/users/{id}/goals)
+DEFAULT_RULES: Tuple[Tuple[str, Optional[str], str], ...] = (
+    ("exempt", None, "/api/health"),
+    ("exempt", None, "/metrics"),
+    ("expensive", "POST", "/api/plan/"),
+    ("expensive", "POST", "/api/auth/login"),
+    ("expensive", "POST", "/api/users$"),
+    ("compute", "POST", "/api/portfolio/analyze"),
+    ("compute", "POST", "/api/portfolio/feasibility"),
+    ("compute", "POST", "/api/portfolio/risk"),
+    ("compute", "GET", "/api/dashboard/"),
+)
+
+# class: (concurrency, queue size, queue timeout seconds, shed_at pressure)
+DEFAULT_LIMITS: Dict[str, Tuple[int, int, float, float]] = {
+    "read": (64, 256, 2.0, 1.0),
+    "compute": (16, 64, 2.0, 0.85),
+    "expensive": (8, 32, 5.0, 0.6),
+}
+
+
+class ClassLimiter:
+    """Concurrency limit with a bounded FIFO queue for one route class"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, timeout: float, shed_at: float = 1.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.shed_at = shed_at
+        self.active = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "deadline": 0, "shed": 0}
+        # Smoothed seconds per request, used to estimate queue waits
+        self.service_time: Optional[float] = None
+        self._waiters: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        """Expected seconds before a new arrival would start"""
+        if self.active < self.concurrency and not self._waiters:
+            return 0.0
+        per_request = self.service_time or 0.0
+        return per_request * (self.queued + 1) / self.concurrency
+
+    def retry_after(self) -> int:
+        """Whole seconds a rejected client should wait before retrying"""
+        return max(1, min(30, math.ceil(self.estimated_wait())))
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, queueing for up to `timeout` seconds; False if none was granted"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait expired
+                return True
+            waiter.cancel()
+            return False
+        except asyncio.CancelledError:
+            # Client went away; pass on a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self._pass_slot()
+            waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, duration: float):
+        self.service_time = duration if self.service_time is None else 0.8 * self.service_time + 0.2 * duration
+        self._pass_slot()
+
+    def _pass_slot(self):
+        # Hand the slot straight to the next waiter still waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "service_time_ms": None if self.service_time is None else round(self.service_time * 1000, 2),
+        }
+
+
+class AdmissionController:
+    """Route classification and the per-class limiters"""
+
+    def __init__(self, limiters: Sequence[ClassLimiter],
+                 rules: Sequence[Tuple[str, Optional[str], str]] = DEFAULT_RULES, default_class: str = "read"):
+        self.limiters = {limiter.name: limiter for limiter in limiters}
+        self.rules = tuple(rules)
+        self.default_class = default_class
+
+    def classify(self, method: str, path: str) -> str:
+        for name, rule_method, prefix in self.rules:
+            if rule_method is not None and rule_method != method:
+                continue
+            if path == prefix[:-1] if prefix.endswith("$") else path.startswith(prefix):
+                return name
+        return self.default_class
+
+    def pressure(self) -> float:
+        """Fraction of the sheddable classes' slots and queue places currently in use"""
+        used = capacity = 0
+        for limiter in self.limiters.values():
+            if limiter.shed_at >= 1.0:
+                continue
+            used += limiter.active + limiter.queued
+            capacity += limiter.concurrency + limiter.queue_size
+        return used / capacity if capacity else 0.0
+
+    def reject_reason(self, limiter: ClassLimiter, deadline: float) -> Optional[str]:
+        """Why an arrival should be turned away now, or None to admit or queue it"""
+        if limiter.active < limiter.concurrency and not limiter.queued:
+            return None
+        if limiter.queued >= limiter.queue_size:
+            return "queue_full"
+        if limiter.shed_at < 1.0 and self.pressure() >= limiter.shed_at:
+            return "shed"
+        if limiter.estimated_wait() > deadline:
+            return "deadline"
+        return None
+
+    def collect(self):
+        """Copy queue depths into gauges (registered as a metrics collector)"""
+        for name, limiter in self.limiters.items():
+            ADMISSION_QUEUE_DEPTH.labels(name).set(limiter.queued)
+            ADMISSION_IN_FLIGHT.labels(name).set(limiter.active)
+
+    def stats(self) -> Dict:
+        return {"pressure": round(self.pressure(), 3),
+                "classes": {name: limiter.stats() for name, limiter in self.limiters.items()}}
+
+
+def _client_timeout(scope) -> Optional[float]:
+    for name, value in scope["headers"]:
+        if name == TIMEOUT_HEADER:
+            try:
+                seconds = float(value)
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = self.controller.classify(scope["method"], scope["path"])
+        limiter = self.controller.limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        client_timeout = _client_timeout(scope)
+        deadline = limiter.timeout if client_timeout is None else min(limiter.timeout, client_timeout)
+        reason = self.controller.reject_reason(limiter, deadline)
+        if reason is None and not await limiter.acquire(deadline):
+            reason = "deadline"
+        if reason is not None:
+            await self._reject(limiter, reason, send)
+            return
+
+        limiter.admitted += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(limiter: ClassLimiter, reason: str, send):
+        limiter.rejected[reason] += 1
+        ADMISSION_REJECTED.labels(limiter.name, reason).inc()
+        body = dumps({"detail": "Server is busy, please retry later", "reason": reason})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(limiter.retry_after()).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def build_controller() -> Optional[AdmissionController]:
+    """
+    Controller configured from ADMISSION_ENABLED and, per class (READ,
+    COMPUTE, EXPENSIVE), ADMISSION_<CLASS>_CONCURRENCY, _QUEUE, _TIMEOUT
+    (seconds) and _SHED_AT (pressure from 0 to 1; 1 disables shedding)
+    """
+    if os.getenv("ADMISSION_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    limiters: List[ClassLimiter] = []
+    for name, (concurrency, queue_size, timeout, shed_at) in DEFAULT_LIMITS.items():
+        prefix = f"ADMISSION_{name.upper()}_"
+        limiters.append(ClassLimiter(
+            name,
+            concurrency=int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+            queue_size=int(os.getenv(prefix + "QUEUE", queue_size)),
+            timeout=float(os.getenv(prefix + "TIMEOUT", timeout)),
+            shed_at=float(os.getenv(prefix + "SHED_AT", shed_at)),
+        ))
+    return AdmissionController(limiters)
+
+
+def install_admission(app) -> Optional[AdmissionController]:
+    """Add AdmissionMiddleware unless ADMISSION_ENABLED is false; returns its controller"""
+    controller = build_controller()
+    if controller is not None:
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+    return controller
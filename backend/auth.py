@@ -1,20 +1,78 @@
 """
 Password hashing utilities using bcrypt
+bcrypt is deliberately slow, so the async variants run it on a small
+dedicated thread pool: the event loop stays free and at most
+BCRYPT_MAX_WORKERS hashes burn CPU at once.
 """
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
 
+from metrics import BCRYPT_SECONDS
+
+# Work factor for new hashes; stored hashes with a different cost are
+# upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    with BCRYPT_SECONDS.labels("hash").time():
+        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify a password against a hash"""
     try:
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        with BCRYPT_SECONDS.labels("verify").time():
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     except (ValueError, AttributeError):
         return False
 
+
+def hash_cost(password_hash: str) -> Optional[int]:
+    """Work factor encoded in a bcrypt hash ("$2b$12$..." -> 12), None if unparseable"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash: str, rounds: Optional[int] = None) -> bool:
+    """True when the stored hash was made with a different work factor"""
+    cost = hash_cost(password_hash)
+    return cost is not None and cost != (rounds or BCRYPT_ROUNDS)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """The bounded thread pool used for hashing"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt"
+                )
+    return _executor
+
+
+async def hash_password_async(password: str, rounds: Optional[int] = None) -> str:
+    """hash_password on the bcrypt thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), hash_password, password, rounds)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """verify_password on the bcrypt thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), verify_password, password, password_hash)
@@ -0,0 +1,86 @@
+"""
+Cold start (import time) report
+Imports the app in a fresh interpreter with `python -X importtime`, prints
+the total and the slowest top-level packages by cumulative import time, and
+exits non-zero when the total exceeds --budget.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import --top 15 --budget 2.0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_SECONDS = 3.0
+
+
+def import_budget() -> float:
+    return float(os.getenv("IMPORT_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS))
+
+
+def measure(module: str = "main") -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """
+    (total seconds, [(package, seconds)] slowest first, loaded modules) for
+    importing `module` in a fresh interpreter.  Package times are the self
+    times of all their submodules, so nested imports are not counted twice.
+    """
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+
+    # Lines look like "import time:   self [us] |   cumulative | imported package"
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        if name == module:
+            total = int(cumulative) / 1e6
+        root = name.split(".", 1)[0]
+        packages[root] = packages.get(root, 0.0) + int(own) / 1e6
+
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return total, sorted(packages.items(), key=lambda kv: kv[1], reverse=True), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=import_budget())
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    total, packages, loaded = measure(args.module)
+    lazy = {name: name in loaded for name in ("openai", "transformers", "torch", "torch_geometric")}
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "import_seconds": round(total, 4),
+            "budget_seconds": args.budget,
+            "top": [{"package": name, "seconds": round(sec, 4)} for name, sec in packages[:args.top]],
+            "lazy_modules_loaded": lazy,
+        }, indent=2))
+    else:
+        print(f"import {args.module}: {total * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+        for name, seconds in packages[:args.top]:
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+        eager = [name for name, is_loaded in lazy.items() if is_loaded]
+        if eager:
+            print(f"eagerly imported: {', '.join(eager)}")
+
+    sys.exit(1 if total > args.budget else 0)
+
+
+if __name__ == "__main__":
+    main()
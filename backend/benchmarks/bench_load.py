@@ -0,0 +1,424 @@
+"""
+End-to-end load test
+Replays a weighted mix of login, get-user, analyze, feasibility,
+portfolio-update and plan requests against the real app and reports
+throughput, error rates and p50/p95/p99 latency per route as JSON.
+
+A seeded synthetic dataset (init_data.generate) is written to a scratch
+directory first, and plan calls go to a local LLM stub, so runs are
+repeatable and diffable between builds:
+
+- in-process (default): the ASGI app is driven through httpx without a
+  network hop, with its lifespan running as under uvicorn
+- --uvicorn: a local uvicorn server is started on the dataset
+- --url: an already running server, which must serve a dataset generated
+  with the same --users/--seed/--password
+
+Load is either closed-loop (--concurrency workers, each sending the next
+request when the previous one completes) or open-loop (--rps, requests
+scheduled at fixed intervals).  In open-loop mode latency is measured from
+the scheduled start, so a server that falls behind is not flattered by the
+generator slowing down with it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load --concurrency 16 --duration 30
+    python -m benchmarks.bench_load --rps 200 --duration 60 --mix get_user=6,plan=1 --output load.json
+    python -m benchmarks.bench_load --uvicorn --workers 4 --rps 500 --compare load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from init_data import generate, synthetic_user
+from llm_stub import LLMStubServer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "load-test-password"
+DEFAULT_MIX = {
+    "login": 1, "get_user": 6, "analyze": 3, "feasibility": 3, "portfolio_update": 1, "plan": 1,
+}
+# Fixed so the generated goals (and thus request bodies) repeat across runs
+CREATED_AT = "2025-01-01T00:00:00"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'get_user=6,plan=1' -> {"get_user": 6.0, "plan": 1.0}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown route {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Workload:
+    """Builds requests for the route mix from the same seeded dataset the server holds"""
+
+    def __init__(self, users: int, seed: int, mix: Dict[str, float], rng: random.Random):
+        self.users = users
+        self.seed = seed
+        self.routes = list(mix)
+        self.weights = [mix[r] for r in self.routes]
+        self.rng = rng
+        self.today = date.today()
+
+    def _profile(self, user_id: int):
+        user, portfolio, goals = synthetic_user(user_id, self.seed, CREATED_AT, self.today)
+        goals = [
+            {k: g[k] for k in ("user_id", "goal_name", "target_amount", "target_date", "priority")}
+            for g in goals
+        ]
+        return user, portfolio, goals
+
+    def next_request(self) -> Tuple[str, str, str, Optional[Dict]]:
+        """(route, method, path, json body) for one randomly chosen request"""
+        route = self.rng.choices(self.routes, weights=self.weights)[0]
+        user_id = self.rng.randint(1, self.users)
+        user, portfolio, goals = self._profile(user_id)
+
+        if route == "login":
+            return route, "POST", "/api/auth/login", {"email": user["email"], "password": PASSWORD}
+        if route == "get_user":
+            return route, "GET", f"/api/users/{user_id}", None
+        if route == "analyze":
+            return route, "POST", "/api/portfolio/analyze", {"user_id": user_id, "goals": goals, "time_horizon": 10}
+        if route == "feasibility":
+            body = {"user_id": user_id, "allocation": portfolio["allocation"], "goals": goals}
+            return route, "POST", "/api/portfolio/feasibility", body
+        if route == "portfolio_update":
+            stocks = self.rng.randint(20, 90)
+            bonds = self.rng.randint(0, 100 - stocks)
+            allocation = {"stocks": stocks, "bonds": bonds, "cash": 100 - stocks - bonds}
+            return route, "PUT", f"/api/portfolio/{user_id}", {"allocation": allocation}
+        return route, "POST", "/api/plan/generate", {"user_id": user_id, "goals": goals}
+
+
+class Recorder:
+    """Latency samples and status counts per route"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, route: str, seconds: float, status: str, ok: bool):
+        self.latencies.setdefault(route, []).append(seconds)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+        self.errors[route] = self.errors.get(route, 0) + (not ok)
+
+    @staticmethod
+    def _summary(latencies: List[float], errors: int) -> Dict:
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        }
+
+    def report(self, elapsed: float) -> Dict:
+        routes = {
+            route: {**self._summary(values, self.errors[route]), "status": dict(sorted(self.statuses[route].items()))}
+            for route, values in sorted(self.latencies.items())
+        }
+        everything = [v for values in self.latencies.values() for v in values]
+        overall = self._summary(everything, sum(self.errors.values())) if everything else {"requests": 0}
+        overall["throughput_rps"] = round(len(everything) / elapsed, 2) if elapsed else 0.0
+        return {"elapsed_s": round(elapsed, 3), "overall": overall, "routes": routes}
+
+
+async def send(client: httpx.AsyncClient, workload: Workload, recorder: Recorder,
+               scheduled: Optional[float] = None):
+    route, method, path, body = workload.next_request()
+    start = scheduled if scheduled is not None else time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body)
+        status, ok = str(response.status_code), response.status_code < 400
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    recorder.record(route, time.perf_counter() - start, status, ok)
+
+
+async def closed_loop(client, workload, recorder, concurrency: int, duration: float, requests: Optional[int]):
+    deadline = time.perf_counter() + duration
+    remaining = [requests]
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            await send(client, workload, recorder)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, workload, recorder, rps: float, duration: float, requests: Optional[int],
+                    max_outstanding: int) -> int:
+    """Returns the number of arrivals dropped because max_outstanding were in flight"""
+    total = int(rps * duration) if requests is None else requests
+    start = time.perf_counter()
+    outstanding, dropped = set(), 0
+    for i in range(total):
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(outstanding) >= max_outstanding:
+            dropped += 1
+            continue
+        task = asyncio.ensure_future(send(client, workload, recorder, scheduled))
+        outstanding.add(task)
+        task.add_done_callback(outstanding.discard)
+    if outstanding:
+        await asyncio.gather(*outstanding)
+    return dropped
+
+
+# ----------------------------------------------------------------------
+# Targets
+# ----------------------------------------------------------------------
+
+def server_environment(data_dir: Path, llm_url: str, hash_rounds: int) -> Dict[str, str]:
+    """Settings pointing the app at the dataset and LLM stub"""
+    return {
+        "STORAGE_DIR": str(data_dir),
+        "OPENAI_API_KEY": "load-test",
+        "OPENAI_BASE_URL": llm_url,
+        # Stored hashes use this cost, so logins verify instead of rehashing
+        "BCRYPT_ROUNDS": str(hash_rounds),
+        "LOGIN_RATE_ENABLED": "false",
+        # Plan calls should reach the LLM stub rather than the plan cache
+        "PLAN_CACHE_ENABLED": "false",
+        "JOB_STORE_PATH": str(data_dir / "jobs.jsonl"),
+        "ML_WARMUP": "true",
+    }
+
+
+@contextmanager
+def patched_environment(values: Dict[str, str]) -> Iterator[None]:
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@asynccontextmanager
+async def inprocess_client(data_dir: Path, llm_url: str, hash_rounds: int) -> AsyncIterator[httpx.AsyncClient]:
+    """The app with its lifespan running, served over httpx's ASGI transport"""
+    with patched_environment(server_environment(data_dir, llm_url, hash_rounds)):
+        import auth
+        import storage
+        from main import app
+
+        # Module-level settings already read at import time
+        originals = (storage.USERS_FILE, storage.PORTFOLIOS_FILE, storage.GOALS_FILE, auth.BCRYPT_ROUNDS)
+        storage.USERS_FILE = data_dir / "users.json"
+        storage.PORTFOLIOS_FILE = data_dir / "portfolios.json"
+        storage.GOALS_FILE = data_dir / "goals.json"
+        auth.BCRYPT_ROUNDS = hash_rounds
+        try:
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=60) as client:
+                    yield client
+        finally:
+            storage.USERS_FILE, storage.PORTFOLIOS_FILE, storage.GOALS_FILE, auth.BCRYPT_ROUNDS = originals
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(data_dir: Path, llm_url: str, hash_rounds: int, workers: int,
+                         connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    """A local uvicorn server on the dataset, stopped afterwards"""
+    port = _free_port()
+    env = {**os.environ, **server_environment(data_dir, llm_url, hash_rounds)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=connections)) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/api/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("uvicorn did not become ready")
+            yield client
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@asynccontextmanager
+async def external_client(url: str, connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    async with httpx.AsyncClient(base_url=url, timeout=60,
+                                 limits=httpx.Limits(max_connections=connections)) as client:
+        yield client
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+async def run_load(
+    mix: Dict[str, float] = DEFAULT_MIX,
+    users: int = 1000,
+    seed: int = 0,
+    concurrency: int = 16,
+    rps: Optional[float] = None,
+    duration: float = 10.0,
+    requests: Optional[int] = None,
+    target: str = "inprocess",
+    url: Optional[str] = None,
+    workers: int = 1,
+    hash_rounds: int = 4,
+    llm_latency: float = 0.5,
+    max_outstanding: int = 1000,
+) -> Dict:
+    """Generate the dataset, start the LLM stub and target, drive the mix and report"""
+    config = {
+        "target": target, "mix": mix, "users": users, "seed": seed,
+        "mode": "open" if rps else "closed", "rps": rps, "concurrency": None if rps else concurrency,
+        "duration_s": duration, "requests": requests, "hash_rounds": hash_rounds, "llm_latency_s": llm_latency,
+    }
+    if target == "uvicorn":
+        config["workers"] = workers
+    recorder = Recorder()
+    workload = Workload(users, seed, mix, random.Random(seed))
+    connections = max_outstanding if rps else concurrency
+
+    with tempfile.TemporaryDirectory(prefix="load_") as scratch, LLMStubServer(latency=llm_latency) as llm:
+        data_dir = Path(scratch)
+        if target != "url":
+            generate(users, data_dir, seed=seed, password=PASSWORD, hash_rounds=hash_rounds,
+                     created_at=CREATED_AT, workers=os.cpu_count() or 1)
+
+        if target == "inprocess":
+            client_context = inprocess_client(data_dir, llm.url, hash_rounds)
+        elif target == "uvicorn":
+            client_context = uvicorn_client(data_dir, llm.url, hash_rounds, workers, connections)
+        else:
+            client_context = external_client(url, connections)
+
+        async with client_context as client:
+            start = time.perf_counter()
+            dropped = 0
+            if rps:
+                dropped = await open_loop(client, workload, recorder, rps, duration, requests, max_outstanding)
+            else:
+                await closed_loop(client, workload, recorder, concurrency, duration, requests)
+            elapsed = time.perf_counter() - start
+            # Identical concurrent plan calls share one LLM call; with several
+            # uvicorn workers this only covers the worker that answers
+            coalescing = await client.get("/api/stats/coalescing")
+            coalesced = coalescing.json()["plan"]["coalesced"] if coalescing.status_code == 200 else None
+
+        report = recorder.report(elapsed)
+        report["overall"]["dropped"] = dropped
+        report["llm_stub_requests"] = llm.request_count
+        report["plan_calls_coalesced"] = coalesced
+
+    return {"created_at": datetime.now().isoformat(timespec="seconds"), "config": config, **report}
+
+
+def compare_reports(previous: Dict, current: Dict) -> List[str]:
+    """Human-readable p50/p99/error-rate changes per route"""
+    lines = []
+    rows = [("overall", previous.get("overall", {}), current["overall"])]
+    rows += [(route, previous.get("routes", {}).get(route, {}), stats) for route, stats in current["routes"].items()]
+    for name, before, after in rows:
+        if not before.get("requests"):
+            continue
+        changes = []
+        for key in ("p50_ms", "p99_ms"):
+            change = after[key] / before[key] - 1 if before[key] else 0.0
+            changes.append(f"{key} {before[key]:.1f} -> {after[key]:.1f} ({change:+.0%})")
+        changes.append(f"errors {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+        lines.append(f"{name:18s} " + ", ".join(changes))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a realistic request mix and report latency percentiles")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="route weights, e.g. login=1,get_user=6,analyze=3,feasibility=3,portfolio_update=1,plan=1")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users in the dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=16, help="closed-loop workers")
+    load.add_argument("--rps", type=float, help="open-loop arrival rate")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="open-loop in-flight cap")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--uvicorn", action="store_true", help="start a local uvicorn server")
+    target.add_argument("--url", help="target an already running server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--hash-rounds", type=int, default=4, help="bcrypt cost of the dataset's passwords")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per LLM stub reply")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="previous report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        mix=args.mix, users=args.users, seed=args.seed, concurrency=args.concurrency, rps=args.rps,
+        duration=args.duration, requests=args.requests,
+        target="uvicorn" if args.uvicorn else "url" if args.url else "inprocess", url=args.url,
+        workers=args.workers, hash_rounds=args.hash_rounds, llm_latency=args.llm_latency,
+        max_outstanding=args.max_outstanding,
+    ))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+    if args.compare:
+        for line in compare_reports(json.loads(args.compare.read_text()), report):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
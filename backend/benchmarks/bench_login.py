@@ -0,0 +1,115 @@
+"""
+Login throughput benchmark
+Drives /api/auth/login in-process at several concurrency levels and, while
+the logins run, probes /api/health to show how responsive the event loop
+stays while bcrypt is busy.
+
+Usage (from backend/):
+    python -m benchmarks.bench_login --requests 64 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+import auth
+from main import app, get_db
+from models import User
+
+PASSWORD = "benchmark-password"
+
+
+class InMemoryDB:
+    """Just enough of DB for the login endpoint"""
+
+    def __init__(self, users):
+        self.by_email = {u.email: u for u in users}
+
+    def get_user_by_email(self, email):
+        return self.by_email.get(email)
+
+    def update_user(self, user_id, user):
+        self.by_email[user.email] = user
+        return user
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_level(client, emails, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, probes = [], []
+    done = asyncio.Event()
+
+    async def login(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/auth/login", json={"email": emails[i % len(emails)], "password": PASSWORD}
+            )
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/api/health")
+            probes.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*[login(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "logins_per_second": round(requests / elapsed, 2),
+        "login_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "login_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "health_p50_ms": round(statistics.median(probes) * 1000, 2) if probes else None,
+        "health_p99_ms": round(percentile(probes, 99) * 1000, 2) if probes else None,
+    }
+
+
+async def main_async(args):
+    password_hash = auth.hash_password(PASSWORD, rounds=args.rounds)
+    users = [
+        User(id=i, name=f"Bench {i}", email=f"bench{i}@example.com", password_hash=password_hash,
+             age=30, current_income=1.0, current_savings=1.0, risk_profile="moderate")
+        for i in range(1, 33)
+    ]
+    # Keep the stored cost so logins measure verification, not upgrades
+    auth.BCRYPT_ROUNDS = args.rounds
+    app.dependency_overrides[get_db] = lambda: InMemoryDB(users)
+    results = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for concurrency in args.concurrency:
+            results.append(await run_level(client, [u.email for u in users], args.requests, concurrency))
+    app.dependency_overrides.clear()
+    return {
+        "bcrypt_rounds": args.rounds,
+        "bcrypt_max_workers": auth.BCRYPT_MAX_WORKERS,
+        "levels": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput under concurrency")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--rounds", type=int, default=auth.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
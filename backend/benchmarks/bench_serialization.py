@@ -0,0 +1,183 @@
+"""
+Response serialization benchmark
+Encodes a FeasibilityResponse carrying a 40-year monthly projection (480
+points) the ways FastAPI's default JSONResponse does (stdlib json after
+response_model serialisation, or jsonable_encoder for routes without one)
+and with FastJSONResponse, and reports per-response time and payload size
+raw, gzipped and (if installed) brotli-compressed.
+
+The `routes` section times whole requests through FastAPI instead: the same
+payload from a route that returns it for response_model validation (the
+default path) and from one that returns FastJSONResponse directly (what the
+projection endpoints do), plus the real /api/portfolio/feasibility endpoint
+with the app's middleware.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --iterations 500
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import time
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from compression import brotli
+from responses import FastJSONResponse, orjson
+from models import User
+from schemas import FeasibilityResponse
+
+YEARS = 40
+
+
+def projection_response(years: int = YEARS) -> FeasibilityResponse:
+    """Synthetic feasibility response with one projection point per month"""
+    value, points = 50000.0, []
+    for month in range(years * 12):
+        value = value * (1 + 0.06 / 12) + 750.0
+        points.append({"year": 2025 + month // 12, "value": round(value, 2)})
+    goals = [
+        {
+            "goal_name": f"Goal {i}", "target_amount": 100000.0 * (i + 1),
+            "target_date": f"{2030 + 5 * i}-01-01", "years_to_goal": 5.0 * (i + 1),
+            "projected_value": 90000.0 * (i + 1), "shortfall": 10000.0 * (i + 1),
+            "on_track": i % 2 == 0, "required_monthly_savings": 812.5,
+            "assumed_monthly_contribution": 750.0,
+        }
+        for i in range(5)
+    ]
+    return FeasibilityResponse(expected_return=0.06, goal_feasibility=goals, projection=points)
+
+
+def time_per_call(fn, iterations: int) -> float:
+    """Median seconds per call over `iterations` runs"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+async def asgi_post(app, path: str, body: bytes) -> bytes:
+    """One POST through an ASGI app without a client or network; returns the body"""
+    chunks = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+def route_cases(model: FeasibilityResponse) -> dict:
+    """name -> (app, path, request body) for the whole-request timings"""
+    payload = model.model_dump(mode="json")
+    routes = FastAPI()
+
+    @routes.post("/response-model", response_model=FeasibilityResponse)
+    def via_response_model():
+        return payload
+
+    @routes.post("/fast-json", response_model=FeasibilityResponse)
+    def via_fast_json():
+        return FastJSONResponse(payload)
+
+    import main
+
+    class StubDB:
+        def get_user(self, user_id):
+            return User(id=user_id, name="Bench", email="bench@example.com", age=30, current_income=90000.0,
+                        current_savings=50000.0, monthly_savings=750.0, risk_profile="moderate")
+
+    main.app.dependency_overrides[main.get_db] = StubDB
+    this_year = time.localtime().tm_year
+    feasibility = json.dumps({
+        "user_id": 1, "allocation": {"stocks": 60, "bonds": 30, "cash": 10},
+        "goals": [{"goal_name": f"Goal {i}", "target_amount": 100000.0 * (i + 1),
+                   "target_date": f"{this_year + 8 * (i + 1)}-01-01", "priority": "medium"} for i in range(5)],
+    }).encode()
+    return {
+        "response_model_route": (routes, "/response-model", b""),
+        "fast_json_route": (routes, "/fast-json", b""),
+        "feasibility_endpoint": (main.app, "/api/portfolio/feasibility", feasibility),
+    }
+
+
+def time_routes(model: FeasibilityResponse, iterations: int) -> dict:
+    import main
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = {}
+        for name, (app, path, body) in route_cases(model).items():
+            call = lambda: loop.run_until_complete(asgi_post(app, path, body))
+            response = call()
+            results[name] = {"median_us": round(time_per_call(call, iterations) * 1e6, 1), "bytes": len(response)}
+        return results
+    finally:
+        main.app.dependency_overrides.clear()
+        loop.close()
+
+
+def run(iterations: int) -> dict:
+    model = projection_response()
+    # What a route returns after response_model validation
+    validated = model.model_dump(mode="json")
+
+    encoders = {
+        "stdlib_json": lambda: JSONResponse(validated).body,
+        "jsonable_encoder_stdlib_json": lambda: JSONResponse(jsonable_encoder(model)).body,
+        "fast_json": lambda: FastJSONResponse(validated).body,
+        "fast_json_from_model": lambda: FastJSONResponse(model).body,
+    }
+    results = {}
+    for name, encode in encoders.items():
+        body = encode()
+        entry = {
+            "median_us": round(time_per_call(encode, iterations) * 1e6, 1),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, 6)),
+        }
+        if brotli is not None:
+            entry["brotli_bytes"] = len(brotli.compress(body, quality=4))
+        results[name] = entry
+
+    return {
+        "projection_points": len(model.projection),
+        "iterations": iterations,
+        "orjson": orjson is not None,
+        "brotli": brotli is not None,
+        "encoders": results,
+        "routes": time_routes(model, iterations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of a large projection response")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations), indent=2))
+
+
+if __name__ == "__main__":
+    main()
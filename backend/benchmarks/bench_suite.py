@@ -0,0 +1,249 @@
+"""
+Microbenchmark suite with regression tracking
+Times the hot paths of storage and portfolio math in-process:
+
+- FileStorage read/write of N-record users files (default 1k, 100k, 1M)
+- UserStorage.get_by_email (worst case: the last user in the file)
+- PortfolioService.generate_allocation with 1-50 goals
+- _compute_goal_feasibility and _compute_projection
+- bcrypt verify at BCRYPT_ROUNDS
+
+`run` writes the results to a JSON baseline; `compare` runs the suite again
+and exits non-zero if any case's median is more than --threshold slower than
+the baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_suite run --output benchmarks/baseline.json
+    python -m benchmarks.bench_suite compare --baseline benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.bench_suite run --sizes 1000 --filter allocation
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import auth
+import storage
+from models import User
+from schemas import FinancialGoalCreate
+from services.portfolio_service import PortfolioService
+from storage import FileStorage, UserStorage
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_GOAL_COUNTS = (1, 5, 10, 25, 50)
+DEFAULT_THRESHOLD = 0.15
+PASSWORD = "benchmark-password"
+
+
+def time_case(fn: Callable, min_rounds: int = 3, min_time: float = 0.5, max_rounds: int = 1000,
+              warmup: int = 1) -> Dict:
+    """
+    Call fn `warmup` times untimed, then repeatedly (at least min_rounds
+    times and min_time seconds) and summarise the per-call times
+    """
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_rounds and (len(samples) < min_rounds or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "rounds": len(samples),
+    }
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+def synthetic_users(count: int) -> List[Dict]:
+    """Records shaped like users.json entries"""
+    now = datetime.now().isoformat()
+    return [
+        {
+            "id": i, "name": f"User {i}", "email": f"user{i}@example.com",
+            "password_hash": "$2b$12$" + "x" * 53, "age": 20 + i % 50,
+            "current_income": 40000.0 + i % 100 * 1000, "current_savings": 5000.0 + i % 40 * 2500,
+            "monthly_savings": 500.0, "risk_profile": ("conservative", "moderate", "aggressive")[i % 3],
+            "created_at": now, "updated_at": None,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def synthetic_goals(count: int, seed: int = 0) -> List[FinancialGoalCreate]:
+    """Goals spread over 1-40 years with mixed priorities"""
+    rng = random.Random(seed)
+    this_year = date.today().year
+    return [
+        FinancialGoalCreate(
+            user_id=1,
+            goal_name=f"Goal {i}",
+            target_amount=float(rng.randrange(10_000, 2_000_000, 1_000)),
+            target_date=f"{this_year + rng.randint(1, 40)}-{rng.randint(1, 12):02d}-01",
+            priority=rng.choice(("high", "medium", "low")),
+        )
+        for i in range(count)
+    ]
+
+
+def bench_user() -> User:
+    return User(id=1, name="Bench", email="bench@example.com", age=35, current_income=90000.0,
+                current_savings=60000.0, monthly_savings=1200.0, risk_profile="moderate")
+
+
+@contextmanager
+def users_file(directory: Path) -> Iterator[Path]:
+    """Point UserStorage at a scratch users file for the duration"""
+    original = storage.USERS_FILE
+    storage.USERS_FILE = directory / "users.json"
+    try:
+        yield storage.USERS_FILE
+    finally:
+        storage.USERS_FILE = original
+
+
+# ----------------------------------------------------------------------
+# Cases
+# ----------------------------------------------------------------------
+
+def storage_cases(sizes: Sequence[int], directory: Path, wanted: Callable[[str], bool]) -> Iterator:
+    for size in sizes:
+        names = [f"storage.write[{size}]", f"storage.read[{size}]", f"users.get_by_email[{size}]"]
+        if not any(wanted(name) for name in names):
+            continue
+        # Large files take seconds per operation; a few rounds are enough
+        options = {"min_time": 0.5, "warmup": 1} if size < 100_000 else {"min_time": 0.0, "warmup": 0}
+        records = synthetic_users(size)
+        path = directory / f"users_{size}.json"
+        FileStorage._write_json(path, records)
+        yield names[0], (lambda: FileStorage._write_json(path, records)), options
+        # Only one copy of a large dataset in memory at a time
+        del records
+        yield names[1], (lambda: FileStorage._read_json(path)), options
+
+        with users_file(directory):
+            path.replace(storage.USERS_FILE)
+            last = f"user{size}@example.com"
+            yield names[2], (lambda: UserStorage.get_by_email(last)), options
+            storage.USERS_FILE.unlink()
+
+
+def portfolio_cases(goal_counts: Sequence[int]) -> Iterator:
+    service = PortfolioService()
+    user = bench_user()
+    for count in goal_counts:
+        goals = synthetic_goals(count)
+        yield f"allocation[goals={count}]", (lambda: service.generate_allocation(user, goals, 10)), {}
+
+    goals = synthetic_goals(10)
+    yield "feasibility[goals=10]", (lambda: service._compute_goal_feasibility(user, goals, 0.065)), {}
+    yield "projection[goals=10]", (lambda: service._compute_projection(user, goals, 0.065)), {}
+
+
+def bcrypt_cases(wanted: Callable[[str], bool]) -> Iterator:
+    name = f"bcrypt.verify[rounds={auth.BCRYPT_ROUNDS}]"
+    if not wanted(name):
+        return
+    password_hash = auth.hash_password(PASSWORD)
+    yield name, (lambda: auth.verify_password(PASSWORD, password_hash)), {"min_rounds": 5, "warmup": 0}
+
+
+def run_suite(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    goal_counts: Sequence[int] = DEFAULT_GOAL_COUNTS,
+    name_filter: Optional[str] = None,
+    log: Callable[[str], None] = lambda line: None,
+) -> Dict:
+    """Run every case (or those whose name contains name_filter)"""
+    wanted = lambda name: not name_filter or name_filter in name
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_") as scratch:
+        directory = Path(scratch)
+        suites = (storage_cases(sizes, directory, wanted), portfolio_cases(goal_counts), bcrypt_cases(wanted))
+        for cases in suites:
+            for name, fn, options in cases:
+                if not wanted(name):
+                    continue
+                results[name] = time_case(fn, **options)
+                log(f"{name:36s} {results[name]['median_s'] * 1000:10.3f} ms  ({results[name]['rounds']} rounds)")
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "bcrypt_rounds": auth.BCRYPT_ROUNDS,
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Per-case median change against the baseline; a case regresses when it is
+    more than `threshold` (a fraction) slower.  Cases missing from either run
+    are skipped.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None or before["median_s"] <= 0:
+            continue
+        change = result["median_s"] / before["median_s"] - 1
+        rows.append({
+            "case": name,
+            "baseline_s": before["median_s"],
+            "current_s": result["median_s"],
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage and portfolio math microbenchmarks")
+    parser.add_argument("mode", choices=("run", "compare"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="record counts for the storage cases")
+    parser.add_argument("--goals", type=int, nargs="+", default=list(DEFAULT_GOAL_COUNTS),
+                        help="goal counts for the allocation cases")
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="where `run` writes results (default: baseline)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction, e.g. 0.15 for 15%%")
+    args = parser.parse_args()
+
+    log = lambda line: print(line, file=sys.stderr)
+    current = run_suite(args.sizes, args.goals, args.filter, log=log)
+
+    if args.mode == "run":
+        output = args.output or args.baseline
+        output.write_text(json.dumps(current, indent=2) + "\n")
+        log(f"wrote {len(current['results'])} results to {output}")
+        return
+
+    rows = compare(json.loads(args.baseline.read_text()), current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['case']:36s} {row['baseline_s'] * 1000:10.3f} -> {row['current_s'] * 1000:10.3f} ms "
+              f"{row['change']:+7.1%} {flag}")
+    regressions = [row["case"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,56 +2,117 @@
 File-based database interface
 This replaces SQLAlchemy for the MVP with file-based storage
 """
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import Depends
+
 from storage import UserStorage, PortfolioStorage, GoalStorage
 from models import User, Portfolio, FinancialGoal
-from typing import Optional
+from tracing import traced
+from typing import Dict, List, Optional, Tuple
+
+# Threads used by AsyncDB for blocking file I/O
+STORAGE_MAX_WORKERS = int(os.getenv("STORAGE_MAX_WORKERS", 8))
 
 
 class DB:
     """Database interface that mimics SQLAlchemy session"""
     
     # User operations
+    @traced("db.get_user")
     def get_user(self, user_id: int) -> Optional[User]:
         user_data = UserStorage.get_by_id(user_id)
         return User.from_dict(user_data) if user_data else None
     
+    @traced("db.get_user_by_email")
     def get_user_by_email(self, email: str) -> Optional[User]:
         user_data = UserStorage.get_by_email(email)
         return User.from_dict(user_data) if user_data else None
     
+    @traced("db.create_user")
     def create_user(self, user: User) -> User:
         user_data = UserStorage.create(user.to_dict())
         return User.from_dict(user_data)
     
+    @traced("db.update_user")
     def update_user(self, user_id: int, user: User) -> Optional[User]:
         user_data = UserStorage.update(user_id, user.to_dict())
         return User.from_dict(user_data) if user_data else None
     
+    @traced("db.patch_user")
+    def patch_user(self, user_id: int, fields: Dict) -> Optional[User]:
+        user_data = UserStorage.patch(user_id, fields)
+        return User.from_dict(user_data) if user_data else None
+    
     # Portfolio operations
+    @traced("db.get_portfolio_by_user_id")
     def get_portfolio_by_user_id(self, user_id: int) -> Optional[Portfolio]:
         portfolio_data = PortfolioStorage.get_by_user_id(user_id)
         return Portfolio.from_dict(portfolio_data) if portfolio_data else None
     
+    @traced("db.get_portfolio")
     def get_portfolio(self, portfolio_id: int) -> Optional[Portfolio]:
         portfolio_data = PortfolioStorage.get_by_id(portfolio_id)
         return Portfolio.from_dict(portfolio_data) if portfolio_data else None
     
+    @traced("db.create_portfolio")
     def create_portfolio(self, portfolio: Portfolio) -> Portfolio:
         portfolio_data = PortfolioStorage.create(portfolio.to_dict())
         return Portfolio.from_dict(portfolio_data)
     
+    @traced("db.update_portfolio")
     def update_portfolio(self, user_id: int, portfolio: Portfolio) -> Portfolio:
         portfolio_data = PortfolioStorage.update(user_id, portfolio.to_dict())
         return Portfolio.from_dict(portfolio_data)
     
     # Goal operations
+    @traced("db.get_goals_by_user_id")
     def get_goals_by_user_id(self, user_id: int) -> list[FinancialGoal]:
         goals_data = GoalStorage.get_by_user_id(user_id)
         return [FinancialGoal.from_dict(g) for g in goals_data]
     
+    @traced("db.get_goal")
+    def get_goal(self, goal_id: int) -> Optional[FinancialGoal]:
+        goal_data = GoalStorage.get_by_id(goal_id)
+        return FinancialGoal.from_dict(goal_data) if goal_data else None
+    
+    @traced("db.create_goal")
     def create_goal(self, goal: FinancialGoal) -> FinancialGoal:
         goal_data = GoalStorage.create(goal.to_dict())
         return FinancialGoal.from_dict(goal_data)
+    
+    @traced("db.update_goal")
+    def update_goal(self, goal_id: int, goal: FinancialGoal) -> Optional[FinancialGoal]:
+        goal_data = GoalStorage.update(goal_id, goal.to_dict())
+        return FinancialGoal.from_dict(goal_data) if goal_data else None
+    
+    @traced("db.delete_goal")
+    def delete_goal(self, goal_id: int) -> bool:
+        return GoalStorage.delete(goal_id)
+    
+    # Aggregate reads
+    @traced("db.get_user_bundle")
+    def get_user_bundle(
+        self, user_id: int, portfolio: bool = True, goals: bool = True
+    ) -> Tuple[Optional[User], Optional[Portfolio], List[FinancialGoal]]:
+        """
+        User, portfolio and goals in one storage pass: each file is read at
+        most once, and not at all when the user does not exist or the part
+        is not wanted.
+        """
+        user = self.get_user(user_id)
+        if user is None:
+            return None, None, []
+        return (
+            user,
+            self.get_portfolio_by_user_id(user_id) if portfolio else None,
+            self.get_goals_by_user_id(user_id) if goals else [],
+        )
 
 
 # Global DB instance
@@ -61,3 +122,92 @@ db = DB()
 def get_db():
     """Dependency function that returns DB instance"""
     return db
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_storage_executor() -> ThreadPoolExecutor:
+    """The bounded thread pool AsyncDB runs storage calls on"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=STORAGE_MAX_WORKERS, thread_name_prefix="storage"
+                )
+    return _executor
+
+
+class AsyncDB:
+    """
+    Awaitable view of a DB: every call runs on the storage thread pool, so
+    async endpoints never block the event loop on open/json.load.  Wraps
+    whatever DB it is given, which keeps dependency overrides working.
+    """
+
+    def __init__(self, db: DB):
+        self.db = db
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        # Copy the context so spans opened in the worker join the caller's trace
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await loop.run_in_executor(get_storage_executor(), call)
+
+    # User operations
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self._run(self.db.get_user, user_id)
+
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        return await self._run(self.db.get_user_by_email, email)
+
+    async def create_user(self, user: User) -> User:
+        return await self._run(self.db.create_user, user)
+
+    async def update_user(self, user_id: int, user: User) -> Optional[User]:
+        return await self._run(self.db.update_user, user_id, user)
+
+    async def patch_user(self, user_id: int, fields: Dict) -> Optional[User]:
+        return await self._run(self.db.patch_user, user_id, fields)
+
+    # Portfolio operations
+    async def get_portfolio_by_user_id(self, user_id: int) -> Optional[Portfolio]:
+        return await self._run(self.db.get_portfolio_by_user_id, user_id)
+
+    async def get_portfolio(self, portfolio_id: int) -> Optional[Portfolio]:
+        return await self._run(self.db.get_portfolio, portfolio_id)
+
+    async def create_portfolio(self, portfolio: Portfolio) -> Portfolio:
+        return await self._run(self.db.create_portfolio, portfolio)
+
+    async def update_portfolio(self, user_id: int, portfolio: Portfolio) -> Portfolio:
+        return await self._run(self.db.update_portfolio, user_id, portfolio)
+
+    # Goal operations
+    async def get_goals_by_user_id(self, user_id: int) -> list[FinancialGoal]:
+        return await self._run(self.db.get_goals_by_user_id, user_id)
+
+    async def get_goal(self, goal_id: int) -> Optional[FinancialGoal]:
+        return await self._run(self.db.get_goal, goal_id)
+
+    async def create_goal(self, goal: FinancialGoal) -> FinancialGoal:
+        return await self._run(self.db.create_goal, goal)
+
+    async def update_goal(self, goal_id: int, goal: FinancialGoal) -> Optional[FinancialGoal]:
+        return await self._run(self.db.update_goal, goal_id, goal)
+
+    async def delete_goal(self, goal_id: int) -> bool:
+        return await self._run(self.db.delete_goal, goal_id)
+
+    # Aggregate reads
+    async def get_user_bundle(
+        self, user_id: int, portfolio: bool = True, goals: bool = True
+    ) -> Tuple[Optional[User], Optional[Portfolio], List[FinancialGoal]]:
+        return await self._run(self.db.get_user_bundle, user_id, portfolio, goals)
+
+
+def get_async_db(db: DB = Depends(get_db)) -> AsyncDB:
+    """Dependency function that returns an AsyncDB over the get_db instance"""
+    return AsyncDB(db)
@@ -0,0 +1,44 @@
+"""
+Conditional request helpers (ETag / If-None-Match / If-Match)
+ETags are strong validators derived from the stored record: its updated_at
+plus a hash of its content, so they change whenever the record is written.
+"""
+import hashlib
+import json
+from typing import Optional
+
+# Responses are per user and must be revalidated before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(record) -> str:
+    """Strong ETag for a model object (anything with to_dict) or a plain dict"""
+    data = record.to_dict() if hasattr(record, "to_dict") else record
+    content = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    digest = hashlib.sha256(f"{data.get('updated_at')}|{content}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches_none(if_none_match: Optional[str], etag: str) -> bool:
+    """True when If-None-Match matches, i.e. a GET can be answered with 304 (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = _tags(if_none_match)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def etag_matches(if_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    True when a write may proceed under If-Match (strong comparison).  A
+    missing header always passes; a missing resource never matches.
+    """
+    if if_match is None:
+        return True
+    if etag is None:
+        return False
+    tags = _tags(if_match)
+    return "*" in tags or etag in tags
@@ -1,13 +1,29 @@
 """
 Initialize mock data files
-This script creates the data directory and populates it with sample data
+This script creates the data directory and populates it with sample data.
+
+With --users N it instead generates a seeded synthetic dataset of N users
+(with portfolios and 0-10 goals each) for load testing.  Records are
+streamed to disk one at a time, so memory stays flat at millions of users,
+and shards of users are generated in parallel worker processes:
+
+    python init_data.py --users 1000000 --workers 8 --password secret --hash-rounds 4
+    python init_data.py --users 100000 --format ndjson --out /tmp/dataset
 """
+import argparse
 import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
 
 DATA_DIR = Path(__file__).parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
 
 # Sample users
 users = [
@@ -126,6 +142,7 @@ goals = [
 def init_data():
     """Initialize data files with sample data"""
     print("Initializing mock data files...")
+    DATA_DIR.mkdir(exist_ok=True)
     
     # Write users
     with open(DATA_DIR / "users.json", 'w') as f:
@@ -145,6 +162,256 @@ def init_data():
     print("\nMock data initialization complete!")
     print(f"Data files are stored in: {DATA_DIR}")
 
+
+# ----------------------------------------------------------------------
+# Synthetic dataset generator
+# ----------------------------------------------------------------------
+
+MAX_GOALS = 10
+DEFAULT_SHARD_SIZE = 50_000
+TABLES = ("users", "portfolios", "goals")
+
+FIRST_NAMES = (
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+    "Wei", "Priya", "Ahmed", "Fatima", "Hiroshi", "Yuki", "Olga", "Ivan", "Lucia", "Mateo",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Chen", "Patel", "Khan", "Tanaka", "Sato", "Ivanova", "Petrov", "Rossi", "Silva",
+)
+
+# (name, target as a multiple of annual income (low, high), years away (low, high), relative frequency)
+GOAL_TEMPLATES = (
+    ("Retirement Fund", (5.0, 15.0), (10, 40), 30),
+    ("Emergency Fund", (0.25, 0.75), (1, 3), 20),
+    ("House Down Payment", (0.5, 2.0), (2, 10), 15),
+    ("Children's Education", (1.0, 4.0), (5, 18), 10),
+    ("New Car", (0.2, 0.8), (1, 5), 10),
+    ("Wedding", (0.2, 0.6), (1, 4), 5),
+    ("Travel", (0.05, 0.3), (1, 3), 5),
+    ("Start a Business", (0.5, 3.0), (3, 10), 5),
+)
+GOAL_WEIGHTS = tuple(t[3] for t in GOAL_TEMPLATES)
+
+# Likelihood of 0..MAX_GOALS goals; most users have one to three
+GOAL_COUNT_WEIGHTS = (8, 22, 24, 18, 10, 6, 4, 3, 2, 2, 1)
+
+RISK_PROFILES = ("conservative", "moderate", "aggressive")
+ALLOCATION_CENTRES = {
+    "conservative": (40, 50),
+    "moderate": (60, 30),
+    "aggressive": (80, 15),
+}
+
+
+def _risk_weights(age: int) -> Tuple[float, float, float]:
+    """Younger users skew aggressive, older users conservative"""
+    young = max(0.0, min(1.0, (60 - age) / 40))
+    return (0.15 + 0.45 * (1 - young), 0.45, 0.1 + 0.4 * young)
+
+
+def _user_rng(seed: int, user_id: int) -> random.Random:
+    # Per-user stream: output does not depend on shard size or worker count
+    return random.Random(seed * 1_000_003 + user_id)
+
+
+def synthetic_user(user_id: int, seed: int, created_at: str, today: date) -> Tuple[Dict, Dict, List[Dict]]:
+    """(user, portfolio, goals) for one user id, fully determined by seed and id"""
+    rng = _user_rng(seed, user_id)
+
+    age = int(min(80, max(18, rng.gauss(42, 13))))
+    # Log-normal income peaking in the early fifties
+    career = 1.0 - ((age - 52) / 40) ** 2
+    income = round(min(1_500_000.0, max(15_000.0, rng.lognormvariate(math.log(62_000), 0.55) * (0.6 + 0.5 * career))), -2)
+    savings_rate = min(0.35, max(0.0, rng.gauss(0.12, 0.07)))
+    years_working = max(0, age - 22)
+    savings = round(income * savings_rate * years_working * rng.lognormvariate(0, 0.6) * 0.6, -2)
+    risk_profile = rng.choices(RISK_PROFILES, weights=_risk_weights(age))[0]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    user = {
+        "id": user_id,
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{last.lower()}.{user_id}@example.com",
+        "age": age,
+        "current_income": income,
+        "current_savings": savings,
+        "monthly_savings": round(income * savings_rate / 12, 2),
+        "risk_profile": risk_profile,
+        "created_at": created_at,
+        "updated_at": None,
+    }
+
+    stocks, bonds = ALLOCATION_CENTRES[risk_profile]
+    stocks = max(10, min(95, stocks + rng.randint(-10, 10)))
+    bonds = max(0, min(100 - stocks, bonds + rng.randint(-8, 8)))
+    portfolio = {
+        "id": user_id,
+        "user_id": user_id,
+        "allocation": {"stocks": stocks, "bonds": bonds, "cash": 100 - stocks - bonds},
+        "created_at": created_at,
+        "updated_at": None,
+    }
+
+    goals = []
+    count = rng.choices(range(MAX_GOALS + 1), weights=GOAL_COUNT_WEIGHTS)[0]
+    for k in range(count):
+        name, (low, high), (soonest, latest), _ = rng.choices(GOAL_TEMPLATES, weights=GOAL_WEIGHTS)[0]
+        years = rng.randint(soonest, latest)
+        goals.append({
+            # Ids are reserved in blocks of MAX_GOALS per user so shards never collide
+            "id": (user_id - 1) * MAX_GOALS + k + 1,
+            "user_id": user_id,
+            "goal_name": name,
+            "target_amount": round(income * rng.uniform(low, high), -2),
+            "target_date": date(today.year + years, rng.randint(1, 12), 1).isoformat(),
+            "priority": rng.choices(("high", "medium", "low"), weights=(4, 4, 2))[0],
+            "created_at": created_at,
+        })
+    return user, portfolio, goals
+
+
+def _write_shard(task: Dict) -> Dict[str, int]:
+    """
+    Generate users [start, stop) into one part file per table.  JSON parts
+    hold comma-separated records so they can be concatenated into an array.
+    """
+    start, stop, directory = task["start"], task["stop"], Path(task["directory"])
+    password, password_hash = task["password"], task["password_hash"]
+    if password is not None and password_hash is None:
+        from auth import hash_password
+
+    today = date.fromisoformat(task["today"])
+    ndjson = task["format"] == "ndjson"
+    counts = dict.fromkeys(TABLES, 0)
+    files = {t: open(directory / f"{t}.{start:012d}.part", "w") for t in TABLES}
+    try:
+        def emit(table: str, record: Dict):
+            f = files[table]
+            if not ndjson and counts[table]:
+                f.write(",\n")
+            f.write(json.dumps(record, separators=(",", ":")))
+            if ndjson:
+                f.write("\n")
+            counts[table] += 1
+
+        for user_id in range(start, stop):
+            user, portfolio, goals = synthetic_user(user_id, task["seed"], task["created_at"], today)
+            if password is not None:
+                user["password_hash"] = password_hash or hash_password(password, rounds=task["hash_rounds"])
+            emit("users", user)
+            emit("portfolios", portfolio)
+            for goal in goals:
+                emit("goals", goal)
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
+
+
+def _assemble(directory: Path, out_dir: Path, fmt: str) -> None:
+    """Concatenate part files, in id order, into users/portfolios/goals files"""
+    for table in TABLES:
+        parts = sorted(directory.glob(f"{table}.*.part"))
+        target = out_dir / f"{table}.{'ndjson' if fmt == 'ndjson' else 'json'}"
+        with open(target, "w") as out:
+            if fmt == "json":
+                out.write("[\n")
+            first = True
+            for part in parts:
+                if part.stat().st_size == 0:
+                    continue
+                if fmt == "json" and not first:
+                    out.write(",\n")
+                with open(part) as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                first = False
+            if fmt == "json":
+                out.write("\n]\n")
+
+
+def generate(
+    users: int,
+    out_dir: Path = DATA_DIR,
+    seed: int = 0,
+    fmt: str = "json",
+    workers: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    password: Optional[str] = None,
+    hash_rounds: int = 4,
+    unique_salts: bool = False,
+    created_at: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Dict[str, int]:
+    """
+    Write a synthetic dataset of `users` users to out_dir as the storage
+    layout (users.json, portfolios.json, goals.json) or as NDJSON.  Returns
+    record counts per table.
+
+    With a password every user gets a bcrypt hash of it at `hash_rounds`;
+    by default one hash is shared, unique_salts hashes each user separately.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    password_hash = None
+    if password is not None and not unique_salts:
+        from auth import hash_password
+        password_hash = hash_password(password, rounds=hash_rounds)
+
+    created_at = created_at or datetime.now().isoformat()
+    today = today or date.today()
+
+    with tempfile.TemporaryDirectory(prefix="dataset_", dir=out_dir) as scratch:
+        tasks = [
+            {
+                "start": start, "stop": min(users + 1, start + shard_size), "directory": scratch,
+                "seed": seed, "format": fmt, "password": password, "password_hash": password_hash,
+                "hash_rounds": hash_rounds, "created_at": created_at, "today": today.isoformat(),
+            }
+            for start in range(1, users + 1, shard_size)
+        ]
+        if workers > 1 and len(tasks) > 1:
+            with Pool(min(workers, len(tasks))) as pool:
+                results = pool.map(_write_shard, tasks, chunksize=1)
+        else:
+            results = [_write_shard(task) for task in tasks]
+        _assemble(Path(scratch), out_dir, fmt)
+
+    return {table: sum(r[table] for r in results) for table in TABLES}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Initialize sample data or generate a synthetic dataset")
+    parser.add_argument("--users", type=int, help="generate this many synthetic users instead of the samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=("json", "ndjson"), default="json",
+                        help="json: storage files read by the API; ndjson: one record per line")
+    parser.add_argument("--out", type=Path, default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--password", help="give every user a bcrypt hash of this password")
+    parser.add_argument("--hash-rounds", type=int, default=4, help="bcrypt cost for generated hashes")
+    parser.add_argument("--unique-salts", action="store_true", help="hash each user's password separately")
+    args = parser.parse_args(argv)
+
+    if args.users is None:
+        init_data()
+        return
+
+    start = time.perf_counter()
+    counts = generate(
+        args.users, args.out, seed=args.seed, fmt=args.format, workers=args.workers,
+        shard_size=args.shard_size, password=args.password, hash_rounds=args.hash_rounds,
+        unique_salts=args.unique_salts,
+    )
+    elapsed = time.perf_counter() - start
+    for table in TABLES:
+        print(f"✓ Generated {counts[table]} {table}")
+    print(f"\n{args.users} users in {elapsed:.1f}s ({args.users / max(elapsed, 1e-9):,.0f} users/s) -> {args.out}")
+
+
 if __name__ == "__main__":
-    init_data()
+    main()
 
@@ -0,0 +1,257 @@
+"""
+Local OpenAI-compatible stub server for tests and load testing
+Serves POST /v1/chat/completions with a canned completion after a
+configurable latency, and can be told to fail the first N requests.
+Requests with "stream": true get the reply as server-sent event chunks.
+Optional requests-per-window and tokens-per-window limits answer 429 with
+Retry-After, like a real provider.
+
+Run standalone:
+    python llm_stub.py --port 8089 --latency 2.0
+then point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_REPLY = (
+    "Financial Plan Summary\n\n"
+    "Your savings rate and allocation are consistent with your goals. "
+    "Keep contributing monthly, rebalance once a year and revisit the plan "
+    "after any major life event."
+)
+
+
+class LLMStubServer:
+    """OpenAI chat-completions stub running in a background thread"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        fail_first: int = 0,
+        fail_status: int = 500,
+        chunk_delay: float = 0.0,
+        rpm_limit: Optional[int] = None,
+        tpm_limit: Optional[int] = None,
+        limit_window: float = 60.0,
+    ):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.limit_window = limit_window
+        self.throttled_count = 0
+        self._window = deque()  # (timestamp, tokens) of admitted requests
+        self.reply = reply
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to the OpenAI client (includes /v1)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "LLMStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LLMStubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _begin(self) -> int:
+        with self._lock:
+            self.request_count += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.request_count
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    @staticmethod
+    def request_tokens(request: dict) -> int:
+        """Tokens charged against the limit: prompt words plus max_tokens"""
+        prompt = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        return prompt + int(request.get("max_tokens") or 0)
+
+    def _admit(self, request: dict) -> Optional[float]:
+        """Record the request, or return seconds to wait if over a limit"""
+        if self.rpm_limit is None and self.tpm_limit is None:
+            return None
+        tokens = self.request_tokens(request)
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0][0] >= self.limit_window:
+                self._window.popleft()
+            over_requests = self.rpm_limit is not None and len(self._window) + 1 > self.rpm_limit
+            used_tokens = sum(t for _, t in self._window)
+            over_tokens = self.tpm_limit is not None and used_tokens + tokens > self.tpm_limit
+            if over_requests or over_tokens:
+                self.throttled_count += 1
+                oldest = self._window[0][0] if self._window else now
+                return max(0.01, self.limit_window - (now - oldest))
+            self._window.append((now, tokens))
+            return None
+
+    def completion_body(self, request: dict) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        return {
+            "id": f"chatcmpl-stub-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(self.reply.split()),
+                "total_tokens": prompt_tokens + len(self.reply.split()),
+            },
+        }
+
+    def stream_chunks(self, request: dict):
+        """Yield chat.completion.chunk bodies, one word per chunk"""
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            yield {
+                "id": f"chatcmpl-stub-{self.request_count}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None,
+                }],
+            }
+        yield {
+            "id": f"chatcmpl-stub-{self.request_count}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, request: dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for chunk in stub.stream_chunks(request):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if stub.chunk_delay:
+                        time.sleep(stub.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                number = stub._begin()
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    if number <= stub.fail_first:
+                        self._send_json(stub.fail_status, {"error": {"message": "stub failure"}})
+                        return
+                    retry_after = stub._admit(request)
+                    if retry_after is not None:
+                        self._send_json(
+                            429,
+                            {"error": {"message": "rate limit exceeded", "type": "rate_limit_exceeded"}},
+                            headers={"Retry-After": f"{retry_after:.3f}"},
+                        )
+                        return
+                    if request.get("stream"):
+                        self._send_stream(request)
+                    else:
+                        self._send_json(200, stub.completion_body(request))
+                finally:
+                    stub._end()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before replying")
+    parser.add_argument("--fail-first", type=int, default=0, help="fail the first N requests")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--rpm", type=int, default=None, help="requests allowed per minute")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens allowed per minute")
+    args = parser.parse_args()
+
+    stub = LLMStubServer(
+        args.host, args.port,
+        latency=args.latency, fail_first=args.fail_first, chunk_delay=args.chunk_delay,
+        rpm_limit=args.rpm, tpm_limit=args.tpm,
+    )
+    print(f"LLM stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,78 @@
-from fastapi import FastAPI, HTTPException, Depends
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, Header, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from typing import List, Optional
+from datetime import date
 import os
+import json
+import math
+import sys
+import threading
 from dotenv import load_dotenv
 
-from database import get_db, DB
+from database import get_db, get_async_db, DB, AsyncDB
 from models import User, Portfolio, FinancialGoal
 from schemas import (
-    UserCreate, UserUpdate, UserResponse, LoginRequest,
+    UserCreate, UserUpdate, UserResponse, LoginRequest, LoginResponse, TokenClaims,
     PortfolioCreate, PortfolioResponse, PortfolioUpdate,
-    FinancialGoalCreate, FinancialGoalResponse,
+    FinancialGoalCreate, FinancialGoalUpdate, FinancialGoalResponse,
     AssetAllocationRequest, AssetAllocationResponse,
     FeasibilityRequest, FeasibilityResponse,
-    FinancialPlanRequest, FinancialPlanResponse
+    FinancialPlanRequest, FinancialPlanResponse, DashboardResponse,
+    RiskAnalysisOptions, RiskAnalysisRequest, RiskBatchRequest, RiskBatchResponse, RiskMetrics,
+    PlanJobRequest, PlanJobResponse
+)
+from services.goal_cache import StoredGoals
+from services.job_queue import QueueFullError
+from services.plan_service import PlanStreamInterrupted
+from services.what_if import WhatIfSession
+from services.container import (
+    ServiceContainer, get_services, init_services, shutdown_services, warmup_enabled
 )
-from services.portfolio_service import PortfolioService
-from services.plan_service import PlanService
-from services.ml_service import MLService
-from auth import hash_password, verify_password
+from auth import hash_password_async, verify_password_async, needs_rehash
+from tokens import TokenSigner, get_token_signer, get_current_claims, get_optional_claims
+from http_cache import CACHE_CONTROL, compute_etag, etag_matches, etag_matches_none
+from responses import FastJSONResponse
+from compression import CompressionMiddleware
+import metrics
+from profiling import install_profiling
+from admission import install_admission
+import tracing
 
 load_dotenv()
 
-app = FastAPI(title="Financial Planning API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build service singletons once and optionally warm up heavy models"""
+    services = init_services()
+    if warmup_enabled():
+        await run_in_threadpool(services.warmup)
+    else:
+        services.ready = True
+    await services.job_queue.start()
+    yield
+    await services.aclose()
+    shutdown_services()
+
+
+app = FastAPI(
+    title="Financial Planning API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+
+# Per-route-class concurrency limits and load shedding.  Innermost, so 503s
+# still get CORS headers and show up in metrics and traces.
+admission = install_admission(app)
+if admission is not None:
+    metrics.REGISTRY.add_collector(admission.collect)
 
 # CORS middleware
 app.add_middleware(
@@ -30,6 +81,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read ETags (for If-Match) and trace ids
+    expose_headers=["ETag", "X-Trace-Id"],
+)
+
+# Root span per request; trace id returned in X-Trace-Id
+if tracing.get_exporter() is not None:
+    app.add_middleware(tracing.TracingMiddleware)
+
+# Opt-in per-request sampling profiler (not installed unless configured)
+install_profiling(app)
+
+# Outermost but for compression, so latency covers CORS handling and the endpoint
+if os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes"):
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Compress large responses (projections, batch results); small ones go out as-is
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
 )
 
 
@@ -38,16 +108,41 @@ def root():
     return {"message": "Financial Planning API", "version": "1.0.0"}
 
 
+async def _admit_credential_check(request: Request, services: ServiceContainer, email: Optional[str] = None):
+    """Reject over-limit auth attempts with 429 before any bcrypt work is done"""
+    limiter = services.login_limiter
+    if limiter is None:
+        return
+    client_ip = request.client.host if request.client else None
+    if limiter.blocking:
+        # SQLite-shared buckets can wait on another worker's write lock
+        retry_after = await run_in_threadpool(limiter.check, client_ip, email)
+    else:
+        retry_after = limiter.check(client_ip, email)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
 @app.post("/api/users", response_model=UserResponse)
-def create_user(user: UserCreate, db: DB = Depends(get_db)):
+async def create_user(
+    user: UserCreate,
+    request: Request,
+    db: AsyncDB = Depends(get_async_db),
+    services: ServiceContainer = Depends(get_services),
+):
     """Create a new user profile"""
+    await _admit_credential_check(request, services)
     # Check if email already exists
-    existing = db.get_user_by_email(user.email)
+    existing = await db.get_user_by_email(user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash the password
-    password_hash = hash_password(user.password)
+    # Hash the password (on the bcrypt pool, off the event loop)
+    password_hash = await hash_password_async(user.password)
     
     db_user = User(
         name=user.name,
@@ -58,40 +153,99 @@ def create_user(user: UserCreate, db: DB = Depends(get_db)):
         current_savings=user.current_savings,
         risk_profile=user.risk_profile
     )
-    created_user = db.create_user(db_user)
+    created_user = await db.create_user(db_user)
     return created_user
 
 
+# Serialises If-Match check-then-write within this process
+_conditional_write_lock = threading.Lock()
+
+
+def _not_modified(if_none_match: Optional[str], etag: str, response: Response) -> Optional[Response]:
+    """304 when the client's copy is current; otherwise tag the outgoing response"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches_none(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _fast_json(content, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Render a large payload straight from the service's dicts with the fast
+    encoder.  Returning a response skips response_model validation and
+    jsonable_encoder (the route's response_model still documents the shape);
+    headers already set on `response`, such as the ETag, are carried over.
+    """
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    return FastJSONResponse(content, headers=headers)
+
+
+def _require_match(if_match: Optional[str], current) -> None:
+    """412 when an If-Match precondition does not hold for the stored record"""
+    if not etag_matches(if_match, compute_etag(current) if current else None):
+        raise HTTPException(status_code=412, detail="Resource has changed; fetch it again")
+
+
 @app.get("/api/users/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: DB = Depends(get_db)):
-    """Get user profile by ID"""
+def get_user(
+    user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Get user profile by ID (supports If-None-Match)"""
+    _vouched(claims, user_id)
     user = db.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _not_modified(if_none_match, compute_etag(user), response) or user
 
 
 @app.put("/api/users/{user_id}", response_model=UserResponse)
-def update_user(user_id: int, update: UserUpdate, db: DB = Depends(get_db)):
-    """Update user profile (email and password are not changed here)"""
-    existing = db.get_user(user_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    updated = User(
-        name=update.name,
-        age=update.age,
-        email=existing.email,
-        password_hash=existing.password_hash,
-        current_income=update.current_income,
-        current_savings=update.current_savings,
-        monthly_savings=update.monthly_savings,
-        risk_profile=update.risk_profile,
-        created_at=existing.created_at,
-    )
-    result = db.update_user(user_id, updated)
+def update_user(
+    user_id: int,
+    update: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Update user profile (email and password are not changed here; supports If-Match)"""
+    if _vouched(claims, user_id) and if_match is None:
+        # The token vouches for the user and there is no precondition to check
+        # against the stored record: merge the fields without reading it first
+        with _conditional_write_lock:
+            result = db.patch_user(user_id, update.model_dump())
+        if not result:
+            raise HTTPException(status_code=404, detail="User not found")
+        response.headers["ETag"] = compute_etag(result)
+        return result
+
+    with _conditional_write_lock:
+        existing = db.get_user(user_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="User not found")
+        _require_match(if_match, existing)
+
+        updated = User(
+            name=update.name,
+            age=update.age,
+            email=existing.email,
+            password_hash=existing.password_hash,
+            current_income=update.current_income,
+            current_savings=update.current_savings,
+            monthly_savings=update.monthly_savings,
+            risk_profile=update.risk_profile,
+            created_at=existing.created_at,
+        )
+        result = db.update_user(user_id, updated)
     if not result:
         raise HTTPException(status_code=500, detail="Failed to update user")
+    response.headers["ETag"] = compute_etag(result)
     return result
 
 
@@ -104,10 +258,126 @@ def get_user_by_email(email: str, db: DB = Depends(get_db)):
     return user
 
 
-@app.post("/api/auth/login", response_model=UserResponse)
-def login(credentials: LoginRequest, db: DB = Depends(get_db)):
-    """Authenticate user with email and password"""
-    user = db.get_user_by_email(credentials.email)
+def _stored_goals(services: ServiceContainer, db: DB, user_id: int) -> StoredGoals:
+    """A user's stored goals from the per-user goal cache"""
+    return services.goal_cache.get(user_id, db.get_goals_by_user_id)
+
+
+def _vouched(claims: Optional[TokenClaims], user_id: int) -> bool:
+    """
+    True when a bearer token was sent for `user_id`, so the user is known to
+    exist without a storage lookup; 403 when the token is for another user.
+    Requests without a token are not authenticated here (False).
+    """
+    if claims is None:
+        return False
+    if claims.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Token is not valid for this user")
+    return True
+
+
+def _require_user(db: DB, user_id: int, claims: Optional[TokenClaims] = None) -> None:
+    if _vouched(claims, user_id):
+        return
+    user = db.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+def _user_goal(db: DB, user_id: int, goal_id: int) -> FinancialGoal:
+    goal = db.get_goal(goal_id)
+    if not goal or goal.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return goal
+
+
+@app.get("/api/users/{user_id}/goals", response_model=List[FinancialGoalResponse])
+def list_goals(
+    user_id: int,
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Stored goals of a user"""
+    _require_user(db, user_id, claims)
+    return db.get_goals_by_user_id(user_id)
+
+
+@app.post("/api/users/{user_id}/goals", response_model=FinancialGoalResponse, status_code=201)
+def create_goal(
+    user_id: int,
+    goal: FinancialGoalUpdate,
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Store a goal for a user; analysis requests without `goals` use the stored ones"""
+    _require_user(db, user_id, claims)
+    with _conditional_write_lock:
+        created = db.create_goal(FinancialGoal(user_id=user_id, **goal.model_dump()))
+    services.goal_cache.invalidate(user_id)
+    return created
+
+
+@app.get("/api/users/{user_id}/goals/{goal_id}", response_model=FinancialGoalResponse)
+def get_goal(
+    user_id: int,
+    goal_id: int,
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """One stored goal"""
+    _vouched(claims, user_id)
+    return _user_goal(db, user_id, goal_id)
+
+
+@app.put("/api/users/{user_id}/goals/{goal_id}", response_model=FinancialGoalResponse)
+def update_goal(
+    user_id: int,
+    goal_id: int,
+    update: FinancialGoalUpdate,
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Replace a stored goal"""
+    _vouched(claims, user_id)
+    with _conditional_write_lock:
+        _user_goal(db, user_id, goal_id)
+        updated = db.update_goal(goal_id, FinancialGoal(user_id=user_id, **update.model_dump()))
+    services.goal_cache.invalidate(user_id)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return updated
+
+
+@app.delete("/api/users/{user_id}/goals/{goal_id}", status_code=204)
+def delete_goal(
+    user_id: int,
+    goal_id: int,
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Delete a stored goal"""
+    _vouched(claims, user_id)
+    with _conditional_write_lock:
+        _user_goal(db, user_id, goal_id)
+        db.delete_goal(goal_id)
+    services.goal_cache.invalidate(user_id)
+    return Response(status_code=204)
+
+
+@app.post("/api/auth/login", response_model=LoginResponse)
+async def login(
+    credentials: LoginRequest,
+    request: Request,
+    db: AsyncDB = Depends(get_async_db),
+    signer: TokenSigner = Depends(get_token_signer),
+    services: ServiceContainer = Depends(get_services),
+):
+    """Authenticate user with email and password and issue an access token"""
+    await _admit_credential_check(request, services, credentials.email)
+    user = await db.get_user_by_email(credentials.email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
@@ -119,104 +389,506 @@ def login(credentials: LoginRequest, db: DB = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    if not await verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    return user
+    # Transparently upgrade hashes made with an old work factor
+    if needs_rehash(user.password_hash):
+        user.password_hash = await hash_password_async(credentials.password)
+        await db.update_user(user.id, user)
+    
+    token, claims = signer.issue(user.id, user.risk_profile)
+    return LoginResponse(
+        **UserResponse.model_validate(user).model_dump(),
+        access_token=token,
+        expires_in=claims["exp"] - claims["iat"],
+    )
+
+
+@app.get("/api/auth/me", response_model=TokenClaims)
+def current_session(claims: TokenClaims = Depends(get_current_claims)):
+    """Return the caller's token claims without touching storage"""
+    return claims
+
+
+@app.post("/api/auth/logout", status_code=204)
+def logout(
+    claims: TokenClaims = Depends(get_current_claims),
+    signer: TokenSigner = Depends(get_token_signer),
+):
+    """Revoke the caller's access token"""
+    signer.revoke({"jti": claims.jti, "exp": claims.expires_at})
+
+
+def _analysis_etag(user: User, goals_version: str, **inputs) -> str:
+    """
+    Validator for an analysis of stored goals: it changes with the user, the
+    goals version, the request inputs and the date projections start from.
+    Also the analysis cache key, so analyses of unchanged goals are reused.
+    """
+    return compute_etag({
+        "user": user.to_dict(), "goals_version": goals_version,
+        "inputs": inputs, "as_of": date.today().isoformat(),
+    })
 
 
 @app.post("/api/portfolio/analyze", response_model=AssetAllocationResponse)
-def analyze_portfolio(request: AssetAllocationRequest, db: DB = Depends(get_db)):
-    """Analyze user inputs and generate asset allocation recommendation"""
+def analyze_portfolio(
+    request: AssetAllocationRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+):
+    """
+    Analyze user inputs and generate asset allocation recommendation.
+    Without `goals` the user's stored goals are used, the result is cached
+    and the response carries an ETag (supports If-None-Match).
+    """
     # Get user
     user = db.get_user(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+
+    if request.goals is None:
+        stored = _stored_goals(services, db, request.user_id)
+        etag = _analysis_etag(user, stored.version, time_horizon=request.time_horizon)
+        return _not_modified(if_none_match, etag, response) or _fast_json(
+            _stored_allocation(services, user, stored, request.time_horizon, etag), response
+        )
     
     # Use portfolio service to generate allocation
-    portfolio_service = PortfolioService()
-    allocation = portfolio_service.generate_allocation(
+    allocation = services.portfolio_service.generate_allocation(
         user=user,
         goals=request.goals,
         time_horizon=request.time_horizon
     )
     
-    return allocation
+    return _fast_json(allocation)
+
+
+def _stored_allocation(services: ServiceContainer, user: User, stored: StoredGoals,
+                       time_horizon: Optional[int], etag: Optional[str] = None):
+    """Allocation analysis of a user's stored goals, through the analysis cache"""
+    etag = etag or _analysis_etag(user, stored.version, time_horizon=time_horizon)
+    return services.analysis_cache.get_or_compute(
+        f"allocation:{etag}",
+        lambda: services.portfolio_service.generate_allocation(
+            user=user, goals=list(stored.goals), time_horizon=time_horizon
+        ),
+    )
 
 
 @app.post("/api/portfolio/feasibility", response_model=FeasibilityResponse)
-def compute_feasibility(request: FeasibilityRequest, db: DB = Depends(get_db)):
-    """Recompute goal feasibility and projection for a given allocation without changing the stored portfolio"""
+def compute_feasibility(
+    request: FeasibilityRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+):
+    """
+    Recompute goal feasibility and projection for a given allocation without
+    changing the stored portfolio.  Without `goals` the user's stored goals
+    are used, the result is cached and the response carries an ETag
+    (supports If-None-Match).
+    """
     user = db.get_user(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    alloc = request.allocation
+    if request.goals is None:
+        stored = _stored_goals(services, db, request.user_id)
+        etag = _analysis_etag(user, stored.version, allocation=request.allocation)
+        return _not_modified(if_none_match, etag, response) or _fast_json(services.analysis_cache.get_or_compute(
+            f"feasibility:{etag}", lambda: _feasibility(services, user, list(stored.goals), request.allocation)
+        ), response)
+
+    return _fast_json(_feasibility(services, user, request.goals, request.allocation))
+
+
+def _feasibility(services: ServiceContainer, user: User, goals, alloc: dict) -> dict:
+    """Goal feasibility and projection at the expected return of an allocation"""
     expected_return = (
         alloc.get("stocks", 0) * 0.08 +
         alloc.get("bonds",  0) * 0.04 +
         alloc.get("cash",   0) * 0.02
     ) / 100
 
-    portfolio_service = PortfolioService()
+    portfolio_service = services.portfolio_service
     return {
         "expected_return": round(expected_return, 4),
-        "goal_feasibility": portfolio_service._compute_goal_feasibility(user, request.goals, expected_return),
-        "projection":       portfolio_service._compute_projection(user, request.goals, expected_return),
+        "goal_feasibility": portfolio_service._compute_goal_feasibility(user, goals, expected_return),
+        "projection":       portfolio_service._compute_projection(user, goals, expected_return),
     }
 
 
+@app.websocket("/api/portfolio/what-if/{user_id}")
+async def what_if(
+    websocket: WebSocket,
+    user_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    services: ServiceContainer = Depends(get_services),
+):
+    """
+    Live feasibility for an allocation editor: the user and stored goals are
+    loaded once, then each burst of allocation updates is answered with one
+    FeasibilityResponse for the latest of them (see services/what_if.py)
+    """
+    await websocket.accept()
+    user = await db.get_user(user_id)
+    if not user:
+        await websocket.close(code=4404, reason="User not found")
+        return
+    stored = await run_in_threadpool(_stored_goals, services, db.db, user_id)
+    goals = list(stored.goals)
+
+    def compute(allocation: dict) -> dict:
+        result = FeasibilityResponse(**_feasibility(services, user, goals, allocation))
+        return result.model_dump(mode="json")
+
+    await WhatIfSession(websocket, compute).run(user_id=user_id, goals=len(goals), goals_version=stored.version)
+
+
+def _risk_options(request: RiskAnalysisOptions) -> dict:
+    """Keyword arguments for RiskService from a risk request body"""
+    return request.model_dump(include=set(RiskAnalysisOptions.model_fields))
+
+
+@app.post("/api/portfolio/risk", response_model=RiskMetrics)
+def analyze_risk(request: RiskAnalysisRequest, services: ServiceContainer = Depends(get_services)):
+    """Compute VaR/CVaR, expected max drawdown and Sharpe for one allocation"""
+    try:
+        return _fast_json(services.risk_service.analyze(request.allocation, **_risk_options(request)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/portfolio/risk/batch", response_model=RiskBatchResponse)
+def analyze_risk_batch(request: RiskBatchRequest, services: ServiceContainer = Depends(get_services)):
+    """Compute risk metrics for many allocations in one vectorised pass"""
+    try:
+        results = services.risk_service.analyze_batch(request.allocations, **_risk_options(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _fast_json({"results": results})
+
+
 @app.get("/api/portfolio/{user_id}", response_model=PortfolioResponse)
-def get_portfolio(user_id: int, db: DB = Depends(get_db)):
-    """Get user's current portfolio"""
+def get_portfolio(
+    user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Get user's current portfolio (supports If-None-Match)"""
+    _vouched(claims, user_id)
     portfolio = db.get_portfolio_by_user_id(user_id)
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return portfolio
+    return _not_modified(if_none_match, compute_etag(portfolio), response) or portfolio
 
 
 @app.put("/api/portfolio/{user_id}", response_model=PortfolioResponse)
-def update_portfolio(user_id: int, update: PortfolioUpdate, db: DB = Depends(get_db)):
-    """Update user's portfolio allocation"""
+def update_portfolio(
+    user_id: int,
+    update: PortfolioUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: DB = Depends(get_db),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Update user's portfolio allocation (supports If-Match)"""
+    _vouched(claims, user_id)
     portfolio = Portfolio(
         user_id=user_id,
         allocation=update.allocation
     )
     
-    updated_portfolio = db.update_portfolio(user_id, portfolio)
+    with _conditional_write_lock:
+        if if_match is not None:
+            _require_match(if_match, db.get_portfolio_by_user_id(user_id))
+        updated_portfolio = db.update_portfolio(user_id, portfolio)
+    response.headers["ETag"] = compute_etag(updated_portfolio)
     return updated_portfolio
 
 
+# Section name -> model its sub-fields are validated against
+DASHBOARD_SECTIONS = {
+    "user": UserResponse,
+    "portfolio": PortfolioResponse,
+    "goals": FinancialGoalResponse,
+    "analysis": AssetAllocationResponse,
+}
+
+
+def _dashboard_include(fields: Optional[str]) -> dict:
+    """
+    Parse ?fields=user,goals,analysis.allocation into a pydantic `include`
+    spec: a bare section selects all of it, section.field only that field.
+    """
+    if not fields:
+        return {name: True for name in DASHBOARD_SECTIONS}
+    include: dict = {}
+    for item in filter(None, (f.strip() for f in fields.split(","))):
+        section, _, field = item.partition(".")
+        model = DASHBOARD_SECTIONS.get(section)
+        if model is None or (field and field not in model.model_fields):
+            raise HTTPException(status_code=400, detail=f"Unknown dashboard field: {item}")
+        if not field:
+            include[section] = True
+        elif include.get(section) is not True:
+            include.setdefault(section, set()).add(field)
+    return include
+
+
+@app.get("/api/dashboard/{user_id}", response_model=DashboardResponse)
+async def get_dashboard(
+    user_id: int,
+    fields: Optional[str] = None,
+    time_horizon: int = Query(10, ge=1, le=100),
+    db: AsyncDB = Depends(get_async_db),
+    services: ServiceContainer = Depends(get_services),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """
+    User, stored portfolio, stored goals and the allocation analysis of those
+    goals in one call.  `fields` selects sections or section.field entries
+    (e.g. user.name,analysis.allocation); unselected sections are neither
+    loaded nor computed.
+    """
+    _vouched(claims, user_id)
+    include = _dashboard_include(fields)
+    user, portfolio, _ = await db.get_user_bundle(user_id, portfolio="portfolio" in include, goals=False)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Goals and their analysis come from the same caches as /api/portfolio/analyze
+    stored = analysis = None
+    if "goals" in include or "analysis" in include:
+        stored = await run_in_threadpool(_stored_goals, services, db.db, user_id)
+    if "analysis" in include:
+        analysis = await run_in_threadpool(_stored_allocation, services, user, stored, time_horizon)
+
+    dashboard = DashboardResponse(
+        user=UserResponse.model_validate(user) if "user" in include else None,
+        portfolio=PortfolioResponse.model_validate(portfolio) if portfolio else None,
+        goals=[FinancialGoalResponse.model_validate(g) for g in stored.records] if "goals" in include else None,
+        analysis=analysis,
+    )
+    # Lists take the per-item spec under "__all__"
+    if isinstance(include.get("goals"), set):
+        include["goals"] = {"__all__": include["goals"]}
+    return FastJSONResponse(dashboard.model_dump(mode="json", include=include))
+
+
 @app.post("/api/plan/generate", response_model=FinancialPlanResponse)
-async def generate_plan(request: FinancialPlanRequest, db: DB = Depends(get_db)):
+async def generate_plan(
+    request: FinancialPlanRequest,
+    db: AsyncDB = Depends(get_async_db),
+    services: ServiceContainer = Depends(get_services),
+):
     """Generate financial plan summary using OpenAI"""
     # Get user
-    user = db.get_user(request.user_id)
+    user = await db.get_user(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get portfolio
-    portfolio = db.get_portfolio_by_user_id(request.user_id)
+    portfolio = await db.get_portfolio_by_user_id(request.user_id)
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
+    goals = request.goals
+    if goals is None:
+        goals = list((await run_in_threadpool(_stored_goals, services, db.db, request.user_id)).goals)
+
     # Generate plan using OpenAI
-    plan_service = PlanService()
-    plan_summary = await plan_service.generate_plan(
+    plan_summary = await services.plan_service.generate_plan(
         user=user,
         portfolio=portfolio,
-        goals=request.goals
+        goals=goals
     )
     
     return FinancialPlanResponse(summary=plan_summary)
 
 
+@app.post("/api/plan/generate/stream")
+async def generate_plan_stream(
+    request: FinancialPlanRequest,
+    db: AsyncDB = Depends(get_async_db),
+    services: ServiceContainer = Depends(get_services),
+):
+    """Stream the financial plan summary as server-sent events"""
+    user = await db.get_user(request.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    portfolio = await db.get_portfolio_by_user_id(request.user_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    goals = request.goals
+    if goals is None:
+        goals = list((await run_in_threadpool(_stored_goals, services, db.db, request.user_id)).goals)
+
+    async def events():
+        # Each token event carries JSON so newlines in the text survive SSE framing
+        try:
+            async for text in services.plan_service.stream_plan(user, portfolio, goals):
+                yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+        except PlanStreamInterrupted as e:
+            # The client must discard the partial plan rather than treat it as done
+            error = {"detail": "Plan generation was interrupted", "reason": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/plan/jobs", response_model=PlanJobResponse, status_code=202)
+def submit_plan_job(
+    request: PlanJobRequest,
+    db: DB = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
+    claims: Optional[TokenClaims] = Depends(get_optional_claims),
+):
+    """Queue plan generation and return a job id immediately"""
+    _require_user(db, request.user_id, claims)
+
+    payload = request.model_dump(include={"user_id", "goals"})
+    if payload["goals"] is None:
+        # Snapshot the stored goals so the job plans what the user had when submitting
+        payload["goals"] = [g.model_dump() for g in _stored_goals(services, db, request.user_id).goals]
+    try:
+        job, _ = services.job_queue.submit(request.user_id, payload, request.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return job
+
+
+@app.get("/api/plan/jobs/{job_id}", response_model=PlanJobResponse)
+def get_plan_job(job_id: str, services: ServiceContainer = Depends(get_services)):
+    """Poll a plan job for its status or result"""
+    job = services.job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/plan/cache/stats")
+def plan_cache_stats(services: ServiceContainer = Depends(get_services)):
+    """Hit-rate and size metrics for the plan summary cache"""
+    if services.plan_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **services.plan_cache.stats()}
+
+
+@app.get("/api/stats/coalescing")
+def coalescing_stats(services: ServiceContainer = Depends(get_services)):
+    """How many identical concurrent calls were served by a shared computation"""
+    return {
+        "plan": services.plan_service.inflight.stats(),
+        "allocation": services.portfolio_service.inflight.stats(),
+    }
+
+
+@app.get("/api/stats/goal-cache")
+def goal_cache_stats(services: ServiceContainer = Depends(get_services)):
+    """Hit rates and sizes of the stored goals cache and the analysis cache built on it"""
+    return {"goals": services.goal_cache.stats(), "analysis": services.analysis_cache.stats()}
+
+
+@app.get("/api/stats/login-limiter")
+def login_limiter_stats(services: ServiceContainer = Depends(get_services)):
+    """Tracked keys and rejections of the login admission control"""
+    if services.login_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **services.login_limiter.stats()}
+
+
+@app.get("/api/stats/admission")
+def admission_stats():
+    """Slots, queue depths and rejections per route class"""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(services: ServiceContainer = Depends(get_services)):
+    """Prometheus text exposition of the in-process metrics registry"""
+    for status, count in services.job_queue.stats().items():
+        if status in ("queued", "running", "succeeded", "failed"):
+            metrics.PLAN_JOBS.labels(status).set(count)
+    for name, flight in (("plan", services.plan_service.inflight), ("allocation", services.portfolio_service.inflight)):
+        metrics.COALESCED_CALLS.labels(name).set(flight.stats()["coalesced"])
+    if services.plan_cache is not None:
+        metrics.CACHE_ENTRIES.labels("plan").set(len(services.plan_cache))
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _trace_buffer() -> tracing.RingBufferExporter:
+    exporter = tracing.get_exporter()
+    if not isinstance(exporter, tracing.RingBufferExporter):
+        raise HTTPException(status_code=404, detail="In-memory trace buffer is not enabled")
+    return exporter
+
+
+@app.get("/api/debug/traces")
+def recent_traces(limit: int = 20):
+    """Summaries of the most recent traces in the in-memory buffer"""
+    return {"traces": _trace_buffer().recent(limit)}
+
+
+@app.get("/api/debug/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """All spans of one trace, in start order"""
+    spans = _trace_buffer().get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
 
+@app.get("/api/health/ready")
+def readiness_check(services: ServiceContainer = Depends(get_services)):
+    """Readiness endpoint: only ready once startup warmup has completed"""
+    if not services.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "warmup_seconds": services.warmup_seconds}
+
+
+# Heavy dependencies that must only be imported on first use
+LAZY_MODULES = ("openai", "transformers", "torch", "torch_geometric")
+
+# Time spent importing this module and everything it pulls in
+IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 4)
+
+
+@app.get("/api/health/startup")
+def startup_report(services: ServiceContainer = Depends(get_services)):
+    """Cold start timings and which lazily imported dependencies are loaded so far"""
+    return {
+        "import_seconds": IMPORT_SECONDS,
+        "warmup_seconds": services.warmup_seconds,
+        "ready": services.ready,
+        "lazy_modules_loaded": {name: name in sys.modules for name in LAZY_MODULES},
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8000)))
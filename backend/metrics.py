@@ -0,0 +1,329 @@
+"""
+In-process metrics registry with Prometheus text exposition
+Counters, gauges and histograms with labels.  Each labelled series owns its
+own lock, so recording is a dict lookup plus an uncontended lock and stays
+cheap enough to leave on under full load.  The registry lock is only taken
+the first time a label combination is seen and while rendering.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """The series for these label values (created on first use)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._series():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """Increment an unlabelled counter"""
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def track_inprogress(self):
+        return self.labels().track_inprogress()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._series():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Callback run before each render, e.g. to copy stats into gauges"""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4)"""
+        for collector in list(self._collectors):
+            collector()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"])
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent", ["method", "route"])
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+# Admission control
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("admission_queue_depth", "Requests waiting for a slot", ["class"])
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("admission_in_flight", "Requests holding a slot", ["class"])
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Requests answered 503 by admission control", ["class", "reason"])
+
+# Storage
+STORAGE_SECONDS = REGISTRY.histogram(
+    "storage_io_seconds", "Time spent reading/writing JSON storage files", ["op", "file"])
+STORAGE_BYTES = REGISTRY.counter(
+    "storage_io_bytes_total", "Bytes read/written by JSON storage", ["op", "file"])
+
+# Compute
+BCRYPT_SECONDS = REGISTRY.histogram("bcrypt_seconds", "Time spent hashing or verifying passwords", ["op"])
+ALLOCATION_SECONDS = REGISTRY.histogram(
+    "allocation_seconds", "Time to compute an asset allocation (excluding coalesced waiters)")
+
+# LLM
+LLM_SECONDS = REGISTRY.histogram("llm_request_seconds", "LLM call latency", ["call", "outcome"])
+LLM_IN_FLIGHT = REGISTRY.gauge("llm_requests_in_flight", "LLM calls currently waiting on the provider")
+LLM_FALLBACKS = REGISTRY.counter(
+    "llm_fallbacks_total", "Plans served from the rule-based fallback", ["reason"])
+
+# Caches
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by result", ["cache", "result"])
+CACHE_HIT_RATIO = REGISTRY.gauge("cache_hit_ratio", "Cache hits / lookups since start", ["cache"])
+CACHE_ENTRIES = REGISTRY.gauge("cache_entries", "Entries currently held", ["cache"])
+
+# Background work (refreshed from service stats when /metrics is scraped)
+PLAN_JOBS = REGISTRY.gauge("plan_jobs", "Plan jobs by status", ["status"])
+COALESCED_CALLS = REGISTRY.gauge(
+    "coalesced_calls", "Calls served by another caller's in-flight computation", ["flight"])
+
+# What-if WebSocket sessions
+WHATIF_SESSIONS = REGISTRY.gauge("whatif_sessions", "Open what-if WebSocket sessions")
+WHATIF_UPDATES = REGISTRY.counter(
+    "whatif_updates_total", "What-if allocation updates by outcome", ["outcome"])
+
+
+def _update_hit_ratios():
+    totals: Dict[str, Dict[str, float]] = {}
+    for (cache, result), child in CACHE_REQUESTS._series():
+        totals.setdefault(cache, {})[result] = child.value
+    for cache, counts in totals.items():
+        lookups = counts.get("hit", 0.0) + counts.get("miss", 0.0)
+        CACHE_HIT_RATIO.labels(cache).set(counts.get("hit", 0.0) / lookups if lookups else 0.0)
+
+
+REGISTRY.add_collector(_update_hit_ratios)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the (shared) scope; label by
+            # its template so /api/users/1 and /api/users/2 are one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.labels(scope["method"], route, status).inc()
+            HTTP_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - start)
@@ -0,0 +1,278 @@
+"""
+Offline bulk plan generation
+Regenerates plan summaries for every user with a portfolio, merge-joining the
+user, portfolio and goal files as they are streamed from storage.  Provider calls are scheduled under
+requests/min and tokens/min token buckets with adaptive (AIMD) concurrency,
+progress is checkpointed so a rerun resumes where it stopped, and results
+are written into the plan cache that /api/plan/generate reads from.
+
+Usage:
+    python plan_batch.py --rpm 500 --tpm 150000 --max-concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import openai
+from dotenv import load_dotenv
+
+from models import User, Portfolio, FinancialGoal
+from storage import UserStorage, PortfolioStorage, GoalStorage
+from services.container import build_plan_cache
+from services.llm_client import LLMClient
+from services.plan_cache import PlanCache
+from services.plan_service import PlanService, MAX_TOKENS, TEMPERATURE
+from services.rate_limiter import AsyncTokenBucket, AdaptiveConcurrency
+
+DEFAULT_CHECKPOINT = Path(__file__).parent / "data" / "plan_batch.checkpoint"
+
+logger = logging.getLogger(__name__)
+
+
+def _groups_by_user(records: Iterator[Dict]) -> Iterator[Tuple[int, List[Dict]]]:
+    """Consecutive records grouped by user_id; raises ValueError if user ids go backwards"""
+    previous = None
+    for user_id, group in groupby(records, key=lambda r: r["user_id"]):
+        if previous is not None and user_id < previous:
+            raise ValueError(f"records are not ordered by user_id ({user_id} after {previous})")
+        previous = user_id
+        yield user_id, list(group)
+
+
+def ordered_by(records: Iterable[Dict], key: str = "user_id") -> bool:
+    """True when `key` never decreases (one streaming pass)"""
+    previous = None
+    for record in records:
+        if previous is not None and record[key] < previous:
+            return False
+        previous = record[key]
+    return True
+
+
+def iter_work(
+    users: Iterable[Dict],
+    portfolios: Iterable[Dict],
+    goals: Iterable[Dict],
+) -> Iterator[Tuple[User, Portfolio, List[FinancialGoal]]]:
+    """
+    Merge-join users with their portfolio and goals.  Users must be ordered
+    by id and portfolios and goals by user_id (the order init_data writes
+    them in; run_batch checks, and sorts a file that is not, before any
+    work starts), so only one user's records are held at a time.  Raises
+    ValueError on out-of-order input.
+    """
+    portfolio_groups = _groups_by_user(iter(portfolios))
+    goal_groups = _groups_by_user(iter(goals))
+    portfolio_head = next(portfolio_groups, None)
+    goals_head = next(goal_groups, None)
+
+    previous = None
+    for user_data in users:
+        user_id = user_data["id"]
+        if previous is not None and user_id < previous:
+            raise ValueError(f"users are not ordered by id ({user_id} after {previous})")
+        previous = user_id
+        while portfolio_head is not None and portfolio_head[0] < user_id:
+            portfolio_head = next(portfolio_groups, None)
+        while goals_head is not None and goals_head[0] < user_id:
+            goals_head = next(goal_groups, None)
+
+        if portfolio_head is None or portfolio_head[0] != user_id:
+            continue
+        user_goals = goals_head[1] if goals_head is not None and goals_head[0] == user_id else []
+        yield (
+            User.from_dict(user_data),
+            # The last record wins if a user has several portfolios
+            Portfolio.from_dict(portfolio_head[1][-1]),
+            [FinancialGoal.from_dict(g) for g in user_goals],
+        )
+
+    # Read to the end so records out of order after the last user still raise
+    for _ in portfolio_groups:
+        pass
+    for _ in goal_groups:
+        pass
+
+
+def _in_order(iter_all: Callable[[], Iterator[Dict]], key: str, table: str) -> Iterator[Dict]:
+    """Stream a table ordered by `key`, sorting in memory only if the file is not already"""
+    if ordered_by(iter_all(), key):
+        return iter_all()
+    logger.warning("%s are not ordered by %s; sorting them in memory", table, key)
+    return iter(sorted(iter_all(), key=lambda r: r[key]))
+
+
+class Checkpoint:
+    """Append-only record of finished user ids (one JSON line each)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done: Set[int] = set()
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        self.done.add(json.loads(line)["user_id"])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a")
+
+    def mark(self, user_id: int):
+        self.done.add(user_id)
+        self._file.write(json.dumps({"user_id": user_id, "at": time.time()}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class BulkPlanRunner:
+    """Schedules plan generation for many users under provider rate limits"""
+
+    def __init__(
+        self,
+        plan_service: PlanService,
+        cache: PlanCache,
+        checkpoint: Checkpoint,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int = 16,
+        initial_concurrency: int = 4,
+        max_attempts: int = 5,
+        period: float = 60.0,
+    ):
+        self.plan_service = plan_service
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.request_bucket = AsyncTokenBucket(requests_per_minute, period=period)
+        self.token_bucket = AsyncTokenBucket(tokens_per_minute, period=period)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, maximum=max_concurrency)
+        self.max_attempts = max_attempts
+        self.stats = {
+            "generated": 0, "cached": 0, "resumed": 0, "failed": 0, "throttled": 0,
+        }
+
+    @staticmethod
+    def estimate_tokens(prompt: str) -> int:
+        """Provider-side token charge: ~4 characters per prompt token plus the completion budget"""
+        return len(prompt) // 4 + MAX_TOKENS
+
+    async def run(self, work: Iterator[Tuple[User, Portfolio, List[FinancialGoal]]], limit: Optional[int] = None):
+        tasks: Set[asyncio.Task] = set()
+        scheduled = 0
+        for user, portfolio, goals in work:
+            if limit is not None and scheduled >= limit:
+                break
+            if user.id in self.checkpoint.done:
+                self.stats["resumed"] += 1
+                continue
+
+            prompt = self.plan_service.prompt_for(user, portfolio, goals)
+            key = self.plan_service.cache_key(prompt)
+            if self.cache.get(key) is not None:
+                self.stats["cached"] += 1
+                self.checkpoint.mark(user.id)
+                continue
+
+            # Waiting for a slot here keeps the number of live tasks bounded
+            await self.concurrency.acquire()
+            task = asyncio.create_task(self._generate(user.id, key, prompt))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            scheduled += 1
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        return self.stats
+
+    async def _generate(self, user_id: int, key: str, prompt: str):
+        try:
+            for attempt in range(self.max_attempts):
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(self.estimate_tokens(prompt))
+                try:
+                    summary = await self.plan_service.llm.complete(
+                        self.plan_service.build_messages(prompt),
+                        max_tokens=MAX_TOKENS,
+                        temperature=TEMPERATURE,
+                    )
+                except openai.RateLimitError as e:
+                    self.stats["throttled"] += 1
+                    self.concurrency.on_throttle()
+                    retry_after = self._retry_after(e)
+                    self.request_bucket.drain(retry_after)
+                    await asyncio.sleep(retry_after)
+                    continue
+                except Exception:
+                    await asyncio.sleep(self.plan_service.llm.backoff_delay(attempt))
+                    continue
+
+                self.cache.put(key, summary)
+                self.checkpoint.mark(user_id)
+                self.concurrency.on_success()
+                self.stats["generated"] += 1
+                return
+            self.stats["failed"] += 1
+        finally:
+            await self.concurrency.release()
+
+    def _retry_after(self, error: openai.RateLimitError) -> float:
+        try:
+            return max(0.0, float(error.response.headers.get("retry-after", "")))
+        except (TypeError, ValueError, AttributeError):
+            return self.request_bucket.period / self.request_bucket.rate
+
+
+async def run_batch(args) -> Dict:
+    cache = build_plan_cache()
+    if cache is None:
+        raise SystemExit("Plan cache is disabled (PLAN_CACHE_ENABLED); nothing to write results to")
+    # Rate-limit errors must reach the scheduler, so the client does not retry them itself.
+    # The runner's adaptive limit decides concurrency; the client semaphore must not cap it.
+    client = LLMClient(max_retries=0, max_concurrency=args.max_concurrency)
+    if not client.available:
+        raise SystemExit("OPENAI_API_KEY is not set")
+    plan_service = PlanService(llm_client=client, cache=cache)
+    checkpoint = Checkpoint(args.checkpoint)
+    runner = BulkPlanRunner(
+        plan_service, cache, checkpoint,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_concurrency=args.max_concurrency,
+    )
+    try:
+        # Checked before the run starts, so iter_work never fails partway through
+        work = iter_work(
+            _in_order(UserStorage.iter_all, "id", "users"),
+            _in_order(PortfolioStorage.iter_all, "user_id", "portfolios"),
+            _in_order(GoalStorage.iter_all, "user_id", "goals"),
+        )
+        return await runner.run(work, limit=args.limit)
+    finally:
+        checkpoint.close()
+        await client.aclose()
+        cache.close()
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Regenerate plan summaries for all users")
+    parser.add_argument("--rpm", type=float, default=500, help="provider requests per minute")
+    parser.add_argument("--tpm", type=float, default=150000, help="provider tokens per minute")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--checkpoint", default=str(DEFAULT_CHECKPOINT))
+    parser.add_argument("--limit", type=int, default=None, help="stop after scheduling N users")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = asyncio.run(run_batch(args))
+    print(json.dumps({**stats, "seconds": round(time.perf_counter() - start, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
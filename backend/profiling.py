@@ -0,0 +1,215 @@
+"""
+On-demand request profiling
+A sampling profiler for individual requests, opt-in per request with the
+X-Profile admin header (matching PROFILE_ADMIN_TOKEN) or for a random
+PROFILE_SAMPLE_RATE fraction of requests.  Stacks are written in collapsed
+("folded") format, ready for flamegraph.pl or speedscope, to PROFILE_DIR
+with the method, route and duration in the file name; only the newest
+PROFILE_MAX_FILES files are kept.
+
+When neither trigger is configured the middleware is not installed at all,
+so there is no per-request cost.
+"""
+import asyncio
+import functools
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent / "data" / "profiles"
+PROFILE_HEADER = "x-profile"
+
+# Threads currently running a sync endpoint for the profiled request.  The
+# threadpool copies the request's context, so the endpoint wrapper below
+# finds the set of the request it is serving.
+_request_threads: ContextVar[Optional[Set[int]]] = ContextVar("profiled_request_threads", default=None)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stacks of all threads every `interval` seconds from a
+    background thread and keeps those for which `belongs(frame)` is true for
+    some frame on the stack, plus every stack of the threads in `threads`.
+    """
+
+    def __init__(self, belongs: Callable, interval: float = 0.001, threads: Optional[Set[int]] = None):
+        self.belongs = belongs
+        self.interval = interval
+        self.threads = threads if threads is not None else set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: Optional[int] = None):
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            labels, relevant = [], thread_id in self.threads
+            while frame is not None:
+                relevant = relevant or self.belongs(frame)
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if relevant:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def folded(self) -> str:
+        """Collapsed stack format: one "frame;frame;frame count" line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileWriter:
+    """Writes profiles into a directory and prunes the oldest beyond `max_files`"""
+
+    def __init__(self, directory, max_files: int = 100):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    @staticmethod
+    def _slug(route: str) -> str:
+        return re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+
+    def write(self, method: str, route: str, duration: float, folded: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S") + f"{time.time() % 1:.6f}"[1:]
+        path = self.directory / f"{stamp}_{method}_{self._slug(route)}_{duration * 1000:.0f}ms.folded"
+        path.write_text(folded)
+        self.prune()
+        return path
+
+    def prune(self):
+        files = sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests with StackSampler"""
+
+    def __init__(
+        self,
+        app,
+        writer: ProfileWriter,
+        sample_rate: float = 0.0,
+        admin_token: Optional[str] = None,
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.interval = interval
+
+    def _selected(self, scope) -> bool:
+        if self.admin_token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode("latin-1"):
+                    return hmac.compare_digest(value, self.admin_token.encode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # While this coroutine's frame is on the event loop thread's stack, that
+        # thread is working on this request.  Sync endpoints run in the
+        # threadpool; the worker registers itself in `threads` while it runs
+        # this request's endpoint, so concurrent requests to the same endpoint
+        # are not merged into this profile.
+        request_frame = sys._getframe()
+        threads: Set[int] = set()
+        _instrument(scope.get("app"))
+        token = _request_threads.set(threads)
+
+        sampler = StackSampler(lambda frame: frame is request_frame, interval=self.interval, threads=threads)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_threads.reset(token)
+            sampler.stop()
+            duration = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", scope.get("path", ""))
+            await run_in_threadpool(
+                self.writer.write, scope["method"], route, duration, sampler.folded()
+            )
+
+
+def _track_thread(call: Callable) -> Callable:
+    """Wrap a sync endpoint to register its worker thread with the profiled request, if any"""
+    @functools.wraps(call)
+    def tracked(*args, **kwargs):
+        threads = _request_threads.get()
+        if threads is None:
+            return call(*args, **kwargs)
+        ident = threading.get_ident()
+        threads.add(ident)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            threads.discard(ident)
+
+    tracked.profiled = True
+    return tracked
+
+
+def _instrument(app):
+    """
+    Wrap the sync endpoints of `app` with _track_thread (once per route).
+    Route handlers read `dependant.call` per request; dependencies are left
+    alone because dependency_overrides are keyed by their original callables.
+    """
+    for route in getattr(app, "routes", ()):
+        dependant = getattr(route, "dependant", None)
+        call = getattr(dependant, "call", None)
+        if call is None or getattr(call, "profiled", False) or asyncio.iscoroutinefunction(call):
+            continue
+        dependant.call = _track_thread(call)
+
+
+def install_profiling(app) -> bool:
+    """Add ProfilingMiddleware when PROFILE_SAMPLE_RATE or PROFILE_ADMIN_TOKEN is set"""
+    sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", 0) or 0)
+    admin_token = os.getenv("PROFILE_ADMIN_TOKEN") or None
+    if sample_rate <= 0 and not admin_token:
+        return False
+    app.add_middleware(
+        ProfilingMiddleware,
+        writer=ProfileWriter(
+            os.getenv("PROFILE_DIR", str(DEFAULT_PROFILE_DIR)),
+            max_files=int(os.getenv("PROFILE_MAX_FILES", 100)),
+        ),
+        sample_rate=sample_rate,
+        admin_token=admin_token,
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", 1)) / 1000,
+    )
+    return True
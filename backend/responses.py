@@ -0,0 +1,60 @@
+"""
+Fast JSON responses
+FastJSONResponse renders with orjson when it is installed (falling back to
+compact stdlib json) and understands pydantic models, model objects with
+to_dict(), datetimes and numpy values directly, so endpoints can return
+them without a jsonable_encoder pass.
+"""
+import dataclasses
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types neither orjson nor json handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    # numpy scalars and arrays (stdlib path; orjson serialises them natively)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialise `content` to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by the fast encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Dict, List
 from datetime import datetime
 
@@ -44,6 +44,20 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class LoginResponse(UserResponse):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class TokenClaims(BaseModel):
+    """Claims carried by a verified access token"""
+    user_id: int
+    risk_profile: str
+    jti: str
+    expires_at: int
+
+
 # Portfolio Schemas
 class PortfolioCreate(BaseModel):
     user_id: int
@@ -67,7 +81,14 @@ class PortfolioResponse(BaseModel):
 
 # Financial Goal Schemas
 class FinancialGoalCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None  # taken from the URL when created via /api/users/{user_id}/goals
+    goal_name: str
+    target_amount: float
+    target_date: str
+    priority: str
+
+
+class FinancialGoalUpdate(BaseModel):
     goal_name: str
     target_amount: float
     target_date: str
@@ -90,7 +111,7 @@ class FinancialGoalResponse(BaseModel):
 # Asset Allocation Schemas
 class AssetAllocationRequest(BaseModel):
     user_id: int
-    goals: List[FinancialGoalCreate]
+    goals: Optional[List[FinancialGoalCreate]] = None  # None: use the user's stored goals
     time_horizon: Optional[int] = 10  # fallback if goal dates are missing
 
 
@@ -118,6 +139,19 @@ class GoalAllocationBreakdown(BaseModel):
     weight_pct: float
 
 
+class RiskMetrics(BaseModel):
+    expected_return: float
+    volatility: float
+    sharpe_ratio: float
+    parametric_var: float
+    parametric_cvar: float
+    historical_var: Optional[float] = None
+    historical_cvar: Optional[float] = None
+    expected_max_drawdown: float
+    confidence: float
+    horizon_years: float
+
+
 class AssetAllocationResponse(BaseModel):
     allocation: Dict[str, float]
     reasoning: str
@@ -126,13 +160,45 @@ class AssetAllocationResponse(BaseModel):
     goal_feasibility: List[GoalFeasibility] = []
     projection: List[ProjectionPoint] = []
     goal_allocation_breakdown: List[GoalAllocationBreakdown] = []
+    risk_metrics: Optional[RiskMetrics] = None
+
+
+# Dashboard: everything the overview screen needs in one response; sections
+# left out by ?fields= are omitted
+class DashboardResponse(BaseModel):
+    user: Optional[UserResponse] = None
+    portfolio: Optional[PortfolioResponse] = None
+    goals: Optional[List[FinancialGoalResponse]] = None
+    analysis: Optional[AssetAllocationResponse] = None
+
+
+# Risk analytics (single allocation or batch)
+class RiskAnalysisOptions(BaseModel):
+    confidence: float = Field(0.95, gt=0, lt=1)
+    horizon_years: float = Field(1.0, gt=0)
+    drawdown_horizon_years: int = Field(10, ge=1, le=50)
+    expected_returns: Optional[Dict[str, float]] = None  # per asset class overrides
+    volatilities: Optional[Dict[str, float]] = None
+    history: Optional[List[Dict[str, float]]] = None     # per-period asset class returns
+
+
+class RiskAnalysisRequest(RiskAnalysisOptions):
+    allocation: Dict[str, float]
+
+
+class RiskBatchRequest(RiskAnalysisOptions):
+    allocations: List[Dict[str, float]] = Field(..., max_length=10000)
+
+
+class RiskBatchResponse(BaseModel):
+    results: List[RiskMetrics]
 
 
 # Feasibility recalculation (for manual allocation updates)
 class FeasibilityRequest(BaseModel):
     user_id: int
     allocation: Dict[str, float]
-    goals: List[FinancialGoalCreate]
+    goals: Optional[List[FinancialGoalCreate]] = None  # None: use the user's stored goals
 
 
 class FeasibilityResponse(BaseModel):
@@ -141,12 +207,35 @@ class FeasibilityResponse(BaseModel):
     projection: List[ProjectionPoint] = []
 
 
+class WhatIfUpdate(BaseModel):
+    """One allocation change on a what-if WebSocket; seq is echoed back with its result"""
+    allocation: Dict[str, float]
+    seq: Optional[int] = None
+
+
 # Financial Plan Schemas
 class FinancialPlanRequest(BaseModel):
     user_id: int
-    goals: List[FinancialGoalCreate]
+    goals: Optional[List[FinancialGoalCreate]] = None  # None: use the user's stored goals
 
 
 class FinancialPlanResponse(BaseModel):
     summary: str
 
+
+
+# Background plan jobs
+class PlanJobRequest(FinancialPlanRequest):
+    priority: str = "normal"  # high, normal, low
+
+
+class PlanJobResponse(BaseModel):
+    id: str
+    user_id: int
+    status: str  # queued, running, succeeded, failed
+    priority: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
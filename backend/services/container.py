@@ -0,0 +1,157 @@
+"""
+Service container - application-wide service singletons
+Services (and the clients they own) are created once at startup instead of
+on every request.  Heavy ML models load lazily on first use, or eagerly
+during warmup when ML_WARMUP is enabled.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from database import AsyncDB, get_db
+from schemas import FinancialGoalCreate
+from services.goal_cache import AnalysisCache, GoalCache
+from services.job_queue import JobQueue, JobStore
+from services.ml_service import MLService
+from services.plan_cache import PlanCache
+from services.plan_service import PlanService, TEMPLATE_VERSION
+from services.portfolio_service import PortfolioService
+from services.rate_limiter import KeyedRateLimiter, LoginRateLimiter, SqliteKeyedRateLimiter
+from services.risk_service import RiskService
+
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_PLAN_CACHE_PATH = DATA_DIR / "plan_cache.db"
+DEFAULT_JOB_STORE_PATH = DATA_DIR / "jobs.jsonl"
+
+
+def build_plan_cache() -> Optional[PlanCache]:
+    """Plan cache configured from PLAN_CACHE_* environment variables"""
+    if os.getenv("PLAN_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    ttl = os.getenv("PLAN_CACHE_TTL_SECONDS")
+    return PlanCache(
+        os.getenv("PLAN_CACHE_PATH", str(DEFAULT_PLAN_CACHE_PATH)),
+        template_version=TEMPLATE_VERSION,
+        max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", 5000)),
+        ttl_seconds=float(ttl) if ttl else None,
+    )
+
+
+def build_login_limiter() -> Optional[LoginRateLimiter]:
+    """
+    Login admission control configured from LOGIN_RATE_* environment
+    variables.  With LOGIN_RATE_SHARED_PATH set, buckets live in a SQLite
+    file shared by every worker on the host; otherwise they are per process.
+    """
+    if os.getenv("LOGIN_RATE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    shared_path = os.getenv("LOGIN_RATE_SHARED_PATH")
+    max_keys = int(os.getenv("LOGIN_RATE_MAX_KEYS", 10000))
+
+    def limiter(scope: str, per_minute: float) -> KeyedRateLimiter:
+        if shared_path:
+            return SqliteKeyedRateLimiter(shared_path, scope, per_minute, max_keys=max_keys)
+        return KeyedRateLimiter(per_minute, max_keys=max_keys)
+
+    return LoginRateLimiter(
+        per_ip=limiter("ip", float(os.getenv("LOGIN_RATE_PER_IP", 30))),
+        per_email=limiter("email", float(os.getenv("LOGIN_RATE_PER_EMAIL", 10))),
+    )
+
+
+def warmup_enabled() -> bool:
+    """Whether heavy models should be loaded eagerly at startup (ML_WARMUP)"""
+    return os.getenv("ML_WARMUP", "true").lower() in ("1", "true", "yes")
+
+
+class ServiceContainer:
+    """Holds one instance of every service for the lifetime of the app"""
+
+    def __init__(self):
+        self.ml_service = MLService()
+        self.risk_service = RiskService()
+        self.portfolio_service = PortfolioService(
+            ml_service=self.ml_service,
+            risk_service=self.risk_service,
+        )
+        self.plan_cache = build_plan_cache()
+        self.plan_service = PlanService(cache=self.plan_cache)
+        self.job_queue = JobQueue(
+            JobStore(os.getenv("JOB_STORE_PATH", str(DEFAULT_JOB_STORE_PATH))),
+            runner=self.run_plan_job,
+            workers=int(os.getenv("JOB_WORKERS", 2)),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", 1000)),
+        )
+        self.login_limiter = build_login_limiter()
+        self.goal_cache = GoalCache(max_users=int(os.getenv("GOAL_CACHE_MAX_USERS", 10000)))
+        self.analysis_cache = AnalysisCache(max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 2000)))
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+
+    def warmup(self):
+        """Load models and prime caches so the first request is not slow"""
+        start = time.perf_counter()
+        self.ml_service.load_models()
+        # Builds the shared drawdown table used by every risk calculation
+        self.risk_service.analyze({"stocks": 60, "bonds": 30, "cash": 10})
+        self.warmup_seconds = round(time.perf_counter() - start, 4)
+        self.ready = True
+
+    async def run_plan_job(self, job: dict) -> str:
+        """Job runner: load the user and portfolio, then generate the plan"""
+        db = AsyncDB(get_db())
+        payload = job["payload"]
+        user = await db.get_user(payload["user_id"])
+        if not user:
+            raise LookupError("User not found")
+        portfolio = await db.get_portfolio_by_user_id(payload["user_id"])
+        if not portfolio:
+            raise LookupError("Portfolio not found")
+        goals = [FinancialGoalCreate(**g) for g in payload["goals"]]
+        return await self.plan_service.generate_plan(user=user, portfolio=portfolio, goals=goals)
+
+    def close(self):
+        """Release resources held by services"""
+        self.ready = False
+        if self.plan_cache is not None:
+            self.plan_cache.close()
+            self.plan_cache = None
+            self.plan_service.cache = None
+        if self.login_limiter is not None:
+            self.login_limiter.close()
+
+    async def aclose(self):
+        """Stop workers and close async clients (called on the loop that used them)"""
+        await self.job_queue.stop()
+        await self.plan_service.llm.aclose()
+        self.close()
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+
+def init_services() -> ServiceContainer:
+    """Build the container (called from the FastAPI lifespan handler)"""
+    global _container
+    with _container_lock:
+        if _container is None:
+            _container = ServiceContainer()
+        return _container
+
+
+def shutdown_services():
+    """Close and drop the container"""
+    global _container
+    with _container_lock:
+        if _container is not None:
+            _container.close()
+        _container = None
+
+
+def get_services() -> ServiceContainer:
+    """Dependency function that returns the service container"""
+    return _container or init_services()
@@ -0,0 +1,155 @@
+"""
+Goal Cache - per-user cache of stored goals, parsed and versioned
+Analysis endpoints that are given only a user id load the user's goals from
+storage.  The parsed goals are kept per user in a bounded LRU together with
+a content version (a hash of the goals), so repeat requests skip the goals
+file and responses can be validated by (user, goals version).
+
+Entries are dropped when the goals API writes for that user, and all of
+them when the goals file changes on disk (another worker or tool wrote it),
+which is detected from its inode, size and mtime on every lookup.
+
+AnalysisCache holds the results computed from stored goals, keyed by their
+validator (user, goals version, inputs, date), so repeat analyses of
+unchanged goals are not recomputed.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics import CACHE_REQUESTS
+from models import FinancialGoal
+from schemas import FinancialGoalCreate
+from services.singleflight import fingerprint
+
+GOAL_FIELDS = ("user_id", "goal_name", "target_amount", "target_date", "priority")
+
+
+class StoredGoals(NamedTuple):
+    """A user's stored goals: content version, parsed goals and the stored records"""
+    version: str
+    goals: Tuple[FinancialGoalCreate, ...]
+    records: Tuple[FinancialGoal, ...]
+
+
+def goals_file_signature() -> Optional[Tuple[str, int, int, int]]:
+    """(path, inode, size, mtime) of the goals file, or None if it does not exist"""
+    import storage
+
+    try:
+        st = os.stat(storage.GOALS_FILE)
+    except FileNotFoundError:
+        return None
+    return str(storage.GOALS_FILE), st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class GoalCache:
+    """Bounded LRU of StoredGoals per user id"""
+
+    def __init__(self, max_users: int = 10000,
+                 signature: Optional[Callable[[], object]] = goals_file_signature):
+        self.max_users = max_users
+        self.signature = signature
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, StoredGoals]" = OrderedDict()
+        self._seen_signature = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_of(goals: List[FinancialGoalCreate]) -> str:
+        """Content version of a goal list (order-sensitive, ids excluded)"""
+        return fingerprint([g.model_dump(include=set(GOAL_FIELDS)) for g in goals])[:16]
+
+    def get(self, user_id: int, loader: Callable[[int], List[FinancialGoal]]) -> StoredGoals:
+        """A user's stored goals, calling loader(user_id) for the records on a miss"""
+        current = self.signature() if self.signature else None
+        with self._lock:
+            if current != self._seen_signature:
+                self._entries.clear()
+                self._seen_signature = current
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                CACHE_REQUESTS.labels("goals", "hit").inc()
+                return entry
+            self.misses += 1
+        CACHE_REQUESTS.labels("goals", "miss").inc()
+
+        records = tuple(loader(user_id))
+        goals = tuple(
+            FinancialGoalCreate(**{field: getattr(record, field) for field in GOAL_FIELDS})
+            for record in records
+        )
+        entry = StoredGoals(self.version_of(list(goals)), goals, records)
+        with self._lock:
+            # A write since the lookup invalidates what was just loaded
+            if (self.signature() if self.signature else None) == self._seen_signature:
+                self._entries[user_id] = entry
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget one user's goals, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "max_users": self.max_users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AnalysisCache:
+    """Bounded LRU of analysis results keyed by their validator; results are shared, read-only"""
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.labels("analysis", "hit").inc()
+                return self._entries[key]
+            self.misses += 1
+        CACHE_REQUESTS.labels("analysis", "miss").inc()
+
+        result = compute()
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
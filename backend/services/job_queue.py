@@ -0,0 +1,279 @@
+"""
+Job Queue - Background plan generation with a submit/poll API
+Jobs are persisted to an append-only JSON-lines log so queued work survives a
+restart, run by a bounded pool of asyncio workers in priority order, and
+deduplicated per user so repeated submits of the same request share a job.
+Workers persist state changes on the storage thread pool, and submit() may be
+called from any thread.
+"""
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database import get_storage_executor
+from services.singleflight import fingerprint
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobStore:
+    """
+    Jobs persisted as an append-only log of JSON lines (one job snapshot per
+    state change, the last line of a job wins), mirrored in memory for reads.
+    A save appends one line instead of rewriting every retained result; the
+    log is compacted to one line per job once it holds more than
+    COMPACT_FACTOR lines per live job.  A torn last line from a crash is
+    skipped on load.
+    """
+
+    COMPACT_FACTOR = 4
+
+    def __init__(self, path, retention: int = 1000):
+        self.path = Path(path)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+        self._lines = 0
+        jobs, legacy = self._load()
+        for job in jobs:
+            self._jobs[job["id"]] = job
+            self._lines += 1
+        self._prune()
+        if legacy:
+            self._compact()
+
+    def _load(self) -> Tuple[List[Dict], bool]:
+        """Stored job snapshots, and whether the file is in the old JSON array format"""
+        if not self.path.exists():
+            return [], False
+        with open(self.path) as f:
+            text = f.read()
+        if text.lstrip().startswith("["):
+            # Whole-file JSON array written by earlier versions; rewritten as a log
+            try:
+                return json.loads(text), True
+            except json.JSONDecodeError:
+                return [], True
+        jobs = []
+        for line in text.splitlines():
+            try:
+                jobs.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return jobs, False
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def find_active(self, user_id: int, request_key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._find_active(user_id, request_key)
+
+    def _find_active(self, user_id: int, request_key: str) -> Optional[Dict]:
+        for job in self._jobs.values():
+            if (job["user_id"] == user_id and job["request_key"] == request_key
+                    and job["status"] in ACTIVE_STATUSES):
+                return dict(job)
+        return None
+
+    def add_unless_active(self, job: Dict) -> Tuple[Dict, bool]:
+        """
+        Save a new job unless the same user already has an identical active one;
+        the check and the save are atomic, so simultaneous submits share a job
+        """
+        with self._lock:
+            existing = self._find_active(job["user_id"], job["request_key"])
+            if existing:
+                return existing, False
+            self._save(job)
+            return dict(job), True
+
+    def save(self, job: Dict):
+        with self._lock:
+            self._save(job)
+
+    def _save(self, job: Dict):
+        """Record one state change (lock held)"""
+        self._jobs[job["id"]] = dict(job)
+        self._prune()
+        if self._lines > self.COMPACT_FACTOR * max(len(self._jobs), 1):
+            self._compact()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(job, default=str)
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+        self._lines += 1
+
+    def _compact(self):
+        """Rewrite the log with one line per live job via a temporary file (lock held)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                for job in self._jobs.values():
+                    f.write(json.dumps(job, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._lines = len(self._jobs)
+
+    def _prune(self):
+        """Keep only the most recent `retention` finished jobs (lock held)"""
+        finished = [j for j in self._jobs.values() if j["status"] not in ACTIVE_STATUSES]
+        excess = len(finished) - self.retention
+        if excess > 0:
+            finished.sort(key=lambda j: j.get("finished_at") or "")
+            for job in finished[:excess]:
+                del self._jobs[job["id"]]
+
+
+class JobQueue:
+    """Priority job queue drained by a bounded pool of asyncio workers"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        runner: Callable[[Dict], Awaitable[str]],
+        workers: int = 2,
+        max_pending: int = 1000,
+    ):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Re-enqueue jobs left queued or running by a previous process, then start workers"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        for job in sorted(self.store.all(), key=lambda j: j["created_at"]):
+            if job["status"] in ACTIVE_STATUSES:
+                job["status"] = QUEUED
+                job["started_at"] = None
+                await self._save(job)
+                self._enqueue(job)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, user_id: int, payload: Dict, priority: str = "normal") -> Tuple[Dict, bool]:
+        """
+        Persist and enqueue a job.  Returns (job, created); when the same user
+        already has an identical job queued or running, that job is returned
+        with created=False.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+
+        request_key = fingerprint(user_id, payload)
+        existing = self.store.find_active(user_id, request_key)
+        if existing:
+            return existing, False
+
+        if self._queue is not None and self._queue.qsize() >= self.max_pending:
+            raise QueueFullError("Too many plan jobs are waiting")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "request_key": request_key,
+            "payload": payload,
+            "priority": priority,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        job, created = self.store.add_unless_active(job)
+        if created and self._queue is not None:
+            self._enqueue(job)
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def _enqueue(self, job: Dict):
+        item = (PRIORITIES[job["priority"]], next(self._seq), job["id"])
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._queue.put_nowait(item)
+        else:
+            # asyncio queues are not thread-safe; sync endpoints submit from the threadpool
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def _save(self, job: Dict):
+        """Persist on the storage thread pool so file writes never block the loop"""
+        await self._loop.run_in_executor(get_storage_executor(), self.store.save, job)
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or job["status"] != QUEUED:
+                    continue
+                job["status"] = RUNNING
+                job["started_at"] = datetime.now().isoformat()
+                await self._save(job)
+                try:
+                    job["result"] = await self.runner(job)
+                    job["status"] = SUCCEEDED
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    job["error"] = str(e) or e.__class__.__name__
+                    job["status"] = FAILED
+                job["finished_at"] = datetime.now().isoformat()
+                await self._save(job)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        for job in self.store.all():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"workers": self.workers, "running": self.running, **counts}
@@ -0,0 +1,247 @@
+"""
+LLM Client - Non-blocking OpenAI chat client
+Wraps AsyncOpenAI with a bounded concurrency semaphore, an overall per-call
+timeout and retries with jittered exponential backoff, so a slow provider
+never blocks the event loop or piles up unbounded requests.
+"""
+import asyncio
+import functools
+import os
+import random
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from metrics import LLM_IN_FLIGHT, LLM_SECONDS
+from tracing import span
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+DEFAULT_MODEL = "gpt-4"
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[Type[Exception], ...]:
+    """
+    Errors worth retrying: transport problems, rate limits and 5xx responses.
+    openai is imported here rather than at module level so that importing
+    the app does not pay for the SDK until a provider call is made.
+    """
+    import openai
+    return (
+        openai.APIConnectionError,   # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+class LLMClient:
+    """Async chat-completions client with concurrency, timeout and retry control"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.model = model or os.getenv("OPENAI_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout if timeout is not None else float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", 2))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional["AsyncOpenAI"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def available(self) -> bool:
+        """False when no API key is configured (callers should fall back)"""
+        return bool(self.api_key)
+
+    def _bind_loop(self):
+        """
+        Create the AsyncOpenAI client and semaphore for the running loop.
+        Both are loop-bound; in production there is one loop, but tests may
+        drive the app from several short-lived loops.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            from openai import AsyncOpenAI
+
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,  # retries are handled here, with jitter
+            )
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 800,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Return the completion text.  Raises asyncio.TimeoutError when the
+        whole call (queueing + retries) exceeds the timeout, or the last
+        provider error once retries are exhausted.
+        """
+        self._bind_loop()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span("llm.complete", model=self.model, max_tokens=max_tokens):
+                text = await asyncio.wait_for(
+                    self._complete_with_retries(messages, max_tokens, temperature),
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            outcome = "ok"
+            return text
+        finally:
+            LLM_SECONDS.labels("complete", outcome).observe(time.perf_counter() - start)
+
+    async def _complete_with_retries(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+    ) -> str:
+        async with self._semaphore:
+            LLM_IN_FLIGHT.inc()
+            try:
+                return await self._create_with_retries(messages, max_tokens, temperature)
+            finally:
+                LLM_IN_FLIGHT.dec()
+
+    async def _create_with_retries(self, messages, max_tokens: int, temperature: float) -> str:
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                )
+                return response.choices[0].message.content.strip()
+            except retryable_errors():
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 800,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield completion text deltas as they arrive.  Opening the stream is
+        retried and bounded by the timeout; once tokens have been yielded,
+        each further chunk must arrive within the timeout as well.
+
+        The provider stream is read by a separate task into a buffer (at most
+        max_tokens deltas), so the concurrency slot is held only as long as
+        the provider takes, however slowly the caller consumes.  Closing this
+        generator early cancels that task, which closes the provider response.
+        """
+        self._bind_loop()
+        timeout = timeout if timeout is not None else self.timeout
+        buffer: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(self._read_stream(buffer, messages, max_tokens, temperature, timeout))
+        try:
+            while True:
+                kind, value = await buffer.get()
+                if kind == "delta":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    async def _read_stream(self, buffer: asyncio.Queue, messages, max_tokens: int,
+                           temperature: float, timeout: float):
+        """Copy provider deltas into `buffer`, ending with ("end", None) or ("error", exc)"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._semaphore:
+                LLM_IN_FLIGHT.inc()
+                response = None
+                try:
+                    response = await asyncio.wait_for(
+                        self._open_stream(messages, max_tokens, temperature), timeout=timeout
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            buffer.put_nowait(("delta", chunk.choices[0].delta.content))
+                    outcome = "ok"
+                finally:
+                    LLM_IN_FLIGHT.dec()
+                    if response is not None:
+                        await _close_stream(response)
+            buffer.put_nowait(("end", None))
+        except Exception as e:
+            buffer.put_nowait(("error", e))
+        finally:
+            LLM_SECONDS.labels("stream", outcome).observe(time.perf_counter() - start)
+
+    async def _open_stream(self, messages, max_tokens: int, temperature: float):
+        attempt = 0
+        while True:
+            try:
+                return await self._client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                )
+            except retryable_errors():
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._loop = None
+
+
+async def _close_stream(response):
+    """Release the provider connection of a streamed response"""
+    close = getattr(response, "close", None)
+    if close is not None:
+        await close()
+    else:
+        # openai < 1.6 has no AsyncStream.close; close the underlying httpx response
+        await response.response.aclose()
@@ -6,6 +6,7 @@ In production, this would integrate with:
 - Historical ETF performance data
 """
 import random
+import threading
 from typing import Dict, List
 
 
@@ -18,16 +19,39 @@ class MLService:
     """
     
     def __init__(self):
-        # In production, would load models here
-        # self.finbert_model = load_finbert_model()
-        # self.gnn_model = load_gnn_model()
-        pass
+        # Models are loaded lazily on first use (or eagerly via load_models()
+        # during application warmup) so constructing the service is cheap.
+        self._models = None
+        self._load_lock = threading.Lock()
+    
+    @property
+    def models_loaded(self) -> bool:
+        return self._models is not None
+    
+    def load_models(self) -> Dict:
+        """Load the heavy models once; safe to call from several threads"""
+        if self._models is None:
+            with self._load_lock:
+                if self._models is None:
+                    self._models = self._load_models()
+        return self._models
+    
+    def _load_models(self) -> Dict:
+        # In production, would load models here.  Import the ML frameworks
+        # (transformers, torch, torch_geometric) inside this method, not at
+        # module level, so they never slow down app import or cold start.
+        # return {
+        #     "finbert": load_finbert_model(),
+        #     "gnn": load_gnn_model(),
+        # }
+        return {}
     
     def analyze_sentiment(self, asset_symbols: List[str]) -> Dict[str, float]:
         """
         Mock sentiment analysis using FinBERT
         Returns sentiment scores (-1 to 1) for each asset
         """
+        self.load_models()
         # Mock implementation - in production would use FinBERT
         return {
             symbol: round(random.uniform(-0.5, 0.8), 3)
@@ -43,6 +67,7 @@ class MLService:
         Mock ETF performance prediction using GNN
         Returns predicted returns and risk metrics
         """
+        self.load_models()
         # Mock implementation - in production would use GNN models
         results = {}
         for symbol in etf_symbols:
@@ -58,6 +83,7 @@ class MLService:
         Mock sector correlation analysis using GNN
         Returns correlation matrix between sectors
         """
+        self.load_models()
         # Mock implementation - in production would use GNN
         correlations = {}
         for sector1 in sectors:
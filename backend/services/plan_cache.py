@@ -0,0 +1,140 @@
+"""
+Plan Cache - Content-addressed, disk-backed LRU cache for generated plans
+Entries are keyed by a hash of (template version, model, temperature,
+prompt), so identical requests are answered without calling the LLM.
+Backed by SQLite in WAL mode so hits stay well under a millisecond and the
+cache survives restarts.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from metrics import CACHE_REQUESTS
+
+
+class PlanCache:
+    """Size-bounded LRU cache of plan summaries with optional TTL"""
+
+    def __init__(
+        self,
+        path,
+        template_version: str,
+        max_entries: int = 5000,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = Path(path)
+        self.template_version = str(template_version)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS plan_cache (
+                   key TEXT PRIMARY KEY,
+                   value TEXT NOT NULL,
+                   template_version TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_cache_access ON plan_cache (last_access)")
+        # Entries rendered from another template version can never be hit again
+        self.invalidate()
+
+    @staticmethod
+    def make_key(template_version: str, model: str, temperature: float, prompt: str) -> str:
+        """Content address for a completion request"""
+        material = json.dumps([str(template_version), model, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def key_for(self, model: str, temperature: float, prompt: str) -> str:
+        """Content address using this cache's template version"""
+        return self.make_key(self.template_version, model, temperature, prompt)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM plan_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                CACHE_REQUESTS.labels("plan", "miss").inc()
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+                self.misses += 1
+                CACHE_REQUESTS.labels("plan", "miss").inc()
+                return None
+            self._conn.execute("UPDATE plan_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            CACHE_REQUESTS.labels("plan", "hit").inc()
+            return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO plan_cache
+                   (key, value, template_version, created_at, last_access)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (key, value, self.template_version, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries (lock held)"""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM plan_cache WHERE key IN (
+                       SELECT key FROM plan_cache ORDER BY last_access ASC LIMIT ?
+                   )""",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def invalidate(self, template_version: Optional[str] = None):
+        """Remove entries not rendered with `template_version` (default: current)"""
+        version = str(template_version or self.template_version)
+        with self._lock:
+            self._conn.execute("DELETE FROM plan_cache WHERE template_version != ?", (version,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM plan_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "template_version": self.template_version,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
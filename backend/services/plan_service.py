@@ -1,20 +1,44 @@
 """
 Plan Service - Generates financial plan summaries using OpenAI
 """
-import os
-from openai import OpenAI
-from typing import List
+import asyncio
+import hashlib
+from typing import AsyncIterator, List, Optional, Tuple
+from metrics import LLM_FALLBACKS
+from tracing import span, traced
+from database import get_storage_executor
 from models import User, Portfolio
 from schemas import FinancialGoalCreate
+from services.llm_client import LLMClient
+from services.plan_cache import PlanCache
+from services.singleflight import SingleFlight
+
+SYSTEM_PROMPT = "You are an expert financial advisor providing personalized financial planning advice."
+MAX_TOKENS = 800
+TEMPERATURE = 0.7
+
+# Bump when build_prompt or the post-processing of completions changes.
+# Together with the system prompt and token limit it forms the template
+# version; cached plans rendered under another version are discarded.
+PLAN_TEMPLATE_REVISION = 1
+TEMPLATE_VERSION = hashlib.sha256(
+    f"{PLAN_TEMPLATE_REVISION}|{MAX_TOKENS}|{SYSTEM_PROMPT}".encode("utf-8")
+).hexdigest()[:12]
+
+
+class PlanStreamInterrupted(Exception):
+    """The provider failed after part of the plan had already been streamed"""
 
 
 class PlanService:
     """Service for generating financial plan summaries using OpenAI"""
     
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key) if api_key else None
+    def __init__(self, llm_client: LLMClient = None, cache: Optional[PlanCache] = None):
+        self.llm = llm_client or LLMClient()
+        self.cache = cache
+        self.inflight = SingleFlight("plan")
     
+    @traced("plan.generate")
     async def generate_plan(
         self,
         user: User,
@@ -22,9 +46,138 @@ class PlanService:
         goals: List[FinancialGoalCreate]
     ) -> str:
         """
-        Generate a comprehensive financial plan summary using OpenAI
+        Generate a comprehensive financial plan summary using OpenAI.
+        Falls back to a template plan when no API key is configured, or when
+        the LLM call times out or fails after retries.  Completions (never
+        fallbacks) are stored in the plan cache when one is configured.
+        Concurrent calls with an identical prompt share one LLM request.
+        """
+        goals_text, allocation_text = self._context_texts(portfolio, goals)
+        prompt = self.build_prompt(user, goals_text, allocation_text)
+
+        # If OpenAI client is not available, return fallback plan
+        if not self.llm.available:
+            # Fallback if OpenAI API key not configured
+            LLM_FALLBACKS.labels("unavailable").inc()
+            return self._generate_fallback_plan(user, goals_text, allocation_text)
+        
+        cache_key = self.cache_key(prompt)
+        return await self.inflight.do_async(
+            cache_key, self._complete_plan, cache_key, prompt, user, goals_text, allocation_text
+        )
+    
+    async def _complete_plan(
+        self,
+        cache_key: str,
+        prompt: str,
+        user: User,
+        goals_text: str,
+        allocation_text: str,
+    ) -> str:
+        """Cache lookup, LLM call and cache fill for one distinct prompt"""
+        if self.cache is not None:
+            with span("plan.cache_get") as cache_span:
+                cached = await self._cache_get(cache_key)
+                if cache_span is not None:
+                    cache_span.set_attribute("hit", cached is not None)
+            if cached is not None:
+                return cached
+        
+        try:
+            summary = await self.llm.complete(
+                self.build_messages(prompt),
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+            )
+        except Exception:
+            # Fallback if OpenAI API fails or times out
+            LLM_FALLBACKS.labels("error").inc()
+            return self._generate_fallback_plan(user, goals_text, allocation_text)
+        
+        if self.cache is not None:
+            await self._cache_put(cache_key, summary)
+        return summary
+    
+    async def stream_plan(
+        self,
+        user: User,
+        portfolio: Portfolio,
+        goals: List[FinancialGoalCreate]
+    ) -> AsyncIterator[str]:
+        """
+        Stream the plan summary as text chunks.  Cached plans and the
+        fallback plan are streamed line by line; LLM tokens are forwarded
+        as they arrive and the full text is cached once the stream ends.
+        Raises PlanStreamInterrupted if the provider fails mid-stream.
         """
-        # Prepare user context
+        goals_text, allocation_text = self._context_texts(portfolio, goals)
+        prompt = self.build_prompt(user, goals_text, allocation_text)
+
+        if not self.llm.available:
+            LLM_FALLBACKS.labels("unavailable").inc()
+            for line in self._generate_fallback_plan(user, goals_text, allocation_text).splitlines(keepends=True):
+                yield line
+            return
+
+        cache_key = self.cache_key(prompt)
+        cached = await self._cache_get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            for line in cached.splitlines(keepends=True):
+                yield line
+            return
+
+        parts = []
+        try:
+            async for delta in self.llm.stream(
+                self.build_messages(prompt),
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+            ):
+                # Match complete(): no leading whitespace in the summary
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            if parts:
+                # Tokens were already sent: the plan is truncated, so it is not
+                # cached and the caller must not report it as complete
+                raise PlanStreamInterrupted(str(e) or e.__class__.__name__) from e
+            LLM_FALLBACKS.labels("error").inc()
+            for line in self._generate_fallback_plan(user, goals_text, allocation_text).splitlines(keepends=True):
+                yield line
+            return
+
+        summary = "".join(parts).strip()
+        if self.cache is not None and summary:
+            await self._cache_put(cache_key, summary)
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        """PlanCache.get on the storage thread pool (SQLite read plus an LRU UPDATE)"""
+        return await asyncio.get_running_loop().run_in_executor(get_storage_executor(), self.cache.get, key)
+
+    async def _cache_put(self, key: str, summary: str):
+        """PlanCache.put on the storage thread pool (INSERT plus eviction)"""
+        await asyncio.get_running_loop().run_in_executor(get_storage_executor(), self.cache.put, key, summary)
+
+    def cache_key(self, prompt: str) -> str:
+        return PlanCache.make_key(TEMPLATE_VERSION, self.llm.model, TEMPERATURE, prompt)
+    
+    def prompt_for(self, user: User, portfolio: Portfolio, goals: list) -> str:
+        """The exact prompt generate_plan would send for these inputs"""
+        goals_text, allocation_text = self._context_texts(portfolio, goals)
+        return self.build_prompt(user, goals_text, allocation_text)
+    
+    def build_messages(self, prompt: str) -> List[dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _context_texts(self, portfolio: Portfolio, goals: List[FinancialGoalCreate]) -> Tuple[str, str]:
+        """Render the goals and allocation sections used by the prompt and fallback"""
         goals_text = "\n".join([
             f"- {goal.goal_name}: ${goal.target_amount:,.0f} by {goal.target_date} (Priority: {goal.priority})"
             for goal in goals
@@ -34,8 +187,12 @@ class PlanService:
             f"{asset}: {percentage}%"
             for asset, percentage in portfolio.allocation.items()
         ])
-        
-        prompt = f"""You are a financial planning advisor. Create a comprehensive financial plan summary for the following client:
+        return goals_text, allocation_text
+    
+    @traced("plan.build_prompt")
+    def build_prompt(self, user: User, goals_text: str, allocation_text: str) -> str:
+        """Build the user prompt; fully determined by the profile, goals and allocation"""
+        return f"""You are a financial planning advisor. Create a comprehensive financial plan summary for the following client:
 
 Client Profile:
 - Name: {user.name}
@@ -58,28 +215,6 @@ Please provide a clear, actionable financial plan that:
 5. Includes considerations for risk management
 
 Keep the response professional, clear, and under 500 words."""
-
-        # If OpenAI client is not available, return fallback plan
-        if not self.client:
-            # Fallback if OpenAI API key not configured
-            return self._generate_fallback_plan(user, goals_text, allocation_text)
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert financial advisor providing personalized financial planning advice."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-        
-        except Exception as e:
-            # Fallback if OpenAI API fails
-            return self._generate_fallback_plan(user, goals_text, allocation_text)
     
     def _generate_fallback_plan(self, user: User, goals_text: str, allocation_text: str) -> str:
         """Generate a fallback plan when OpenAI is not available"""
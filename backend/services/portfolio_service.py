@@ -5,8 +5,12 @@ For MVP, we use rule-based allocation based on risk profile and goals
 """
 from typing import Dict, List
 from datetime import date, datetime
+from metrics import ALLOCATION_SECONDS
+from tracing import span, traced
 from models import User
 from schemas import FinancialGoalCreate
+from services.risk_service import RiskService
+from services.singleflight import SingleFlight, fingerprint
 
 
 PRIORITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
@@ -21,8 +25,10 @@ BASE_ALLOCATIONS = {
 class PortfolioService:
     """Service for portfolio allocation and analysis"""
 
-    def __init__(self):
-        self.ml_service = None  # Would initialize ML service here in production
+    def __init__(self, ml_service=None, risk_service: RiskService = None):
+        self.ml_service = ml_service  # Not used by the rule-based MVP allocation
+        self.risk_service = risk_service or RiskService()
+        self.inflight = SingleFlight("allocation")
 
     # ------------------------------------------------------------------
     # Public entry point
@@ -33,6 +39,28 @@ class PortfolioService:
         user: User,
         goals: list,
         time_horizon: int = 10,
+    ) -> Dict:
+        """
+        Coalescing wrapper around _generate_allocation: concurrent calls for
+        the same user inputs, goals and horizon share one computation and
+        receive the same (read-only) result.
+        """
+        key = fingerprint(
+            [user.id, user.risk_profile, user.current_savings, user.monthly_savings],
+            [self._goal_fields(g) for g in goals],
+            time_horizon,
+        )
+        return self.inflight.do(key, self._timed_allocation, user, goals, time_horizon)
+
+    def _timed_allocation(self, user: User, goals: list, time_horizon: int) -> Dict:
+        with ALLOCATION_SECONDS.time(), span("portfolio.generate_allocation", goals=len(goals)):
+            return self._generate_allocation(user, goals, time_horizon)
+
+    def _generate_allocation(
+        self,
+        user: User,
+        goals: list,
+        time_horizon: int = 10,
     ) -> Dict:
         """
         Derive an ideal allocation for each goal from its own time horizon
@@ -40,59 +68,10 @@ class PortfolioService:
         target_amount × priority.  Falls back to the single time_horizon
         value only when a goal has no parseable date.
         """
-        today = date.today()
         risk_profile = user.risk_profile.lower()
-
-        # --- per-goal allocations ----------------------------------------
-        goal_breakdowns = []
-        total_weight = 0.0
-
-        for goal in goals:
-            # Derive years-to-goal from target_date
-            try:
-                tdate = datetime.strptime(goal.target_date, "%Y-%m-%d").date()
-                months = max(1, (tdate.year - today.year) * 12 + (tdate.month - today.month))
-                years = max(1, round(months / 12))
-            except (ValueError, AttributeError):
-                years = time_horizon  # fallback
-
-            priority_w = PRIORITY_WEIGHTS.get(goal.priority.lower(), 2)
-            weight = goal.target_amount * priority_w
-            alloc = self._allocation_for_horizon(risk_profile, years)
-
-            goal_breakdowns.append({
-                "goal_name": goal.goal_name,
-                "time_horizon_years": years,
-                "allocation": alloc,
-                "weight": weight,
-                "weight_pct": 0.0,
-            })
-            total_weight += weight
-
-        # --- blend -----------------------------------------------------------
-        if not goal_breakdowns or total_weight == 0:
-            blended = self._allocation_for_horizon(risk_profile, time_horizon)
-            effective_horizon = time_horizon
-        else:
-            blended_f = {"stocks": 0.0, "bonds": 0.0, "cash": 0.0}
-            for bd in goal_breakdowns:
-                bd["weight_pct"] = round(bd["weight"] / total_weight * 100, 1)
-                w = bd["weight"] / total_weight
-                for asset in blended_f:
-                    blended_f[asset] += bd["allocation"].get(asset, 0) * w
-
-            blended = {k: round(v) for k, v in blended_f.items()}
-
-            # Fix integer rounding so total == 100
-            diff = 100 - sum(blended.values())
-            if diff != 0:
-                largest = max(blended, key=blended.get)
-                blended[largest] += diff
-
-            effective_horizon = round(
-                sum(bd["time_horizon_years"] * (bd["weight"] / total_weight)
-                    for bd in goal_breakdowns)
-            )
+        goal_breakdowns, total_weight, blended, effective_horizon = self._blend_goal_allocations(
+            risk_profile, goals, time_horizon
+        )
 
         # --- derived metrics --------------------------------------------------
         expected_return = (
@@ -131,6 +110,8 @@ class PortfolioService:
 
         goal_feasibility = self._compute_goal_feasibility(user, goals, expected_return)
         projection = self._compute_projection(user, goals, expected_return)
+        with span("portfolio.risk"):
+            risk_metrics = self.risk_service.analyze(blended)
 
         return {
             "allocation": blended,
@@ -140,12 +121,79 @@ class PortfolioService:
             "goal_feasibility": goal_feasibility,
             "projection": projection,
             "goal_allocation_breakdown": clean_breakdowns,
+            "risk_metrics": risk_metrics,
         }
 
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def _goal_fields(goal) -> list:
+        return [goal.goal_name, goal.target_amount, goal.target_date, goal.priority]
+
+    @traced("portfolio.blend")
+    def _blend_goal_allocations(self, risk_profile: str, goals: list, time_horizon: int):
+        """
+        Per-goal allocations from each goal's horizon, blended by
+        target_amount × priority.  Returns (breakdowns, total_weight,
+        blended allocation, weighted horizon).
+        """
+        today = date.today()
+
+        # --- per-goal allocations ----------------------------------------
+        goal_breakdowns = []
+        total_weight = 0.0
+
+        for goal in goals:
+            # Derive years-to-goal from target_date
+            try:
+                tdate = datetime.strptime(goal.target_date, "%Y-%m-%d").date()
+                months = max(1, (tdate.year - today.year) * 12 + (tdate.month - today.month))
+                years = max(1, round(months / 12))
+            except (ValueError, AttributeError):
+                years = time_horizon  # fallback
+
+            priority_w = PRIORITY_WEIGHTS.get(goal.priority.lower(), 2)
+            weight = goal.target_amount * priority_w
+            alloc = self._allocation_for_horizon(risk_profile, years)
+
+            goal_breakdowns.append({
+                "goal_name": goal.goal_name,
+                "time_horizon_years": years,
+                "allocation": alloc,
+                "weight": weight,
+                "weight_pct": 0.0,
+            })
+            total_weight += weight
+
+        # --- blend -----------------------------------------------------------
+        if not goal_breakdowns or total_weight == 0:
+            blended = self._allocation_for_horizon(risk_profile, time_horizon)
+            effective_horizon = time_horizon
+        else:
+            blended_f = {"stocks": 0.0, "bonds": 0.0, "cash": 0.0}
+            for bd in goal_breakdowns:
+                bd["weight_pct"] = round(bd["weight"] / total_weight * 100, 1)
+                w = bd["weight"] / total_weight
+                for asset in blended_f:
+                    blended_f[asset] += bd["allocation"].get(asset, 0) * w
+
+            blended = {k: round(v) for k, v in blended_f.items()}
+
+            # Fix integer rounding so total == 100
+            diff = 100 - sum(blended.values())
+            if diff != 0:
+                largest = max(blended, key=blended.get)
+                blended[largest] += diff
+
+            effective_horizon = round(
+                sum(bd["time_horizon_years"] * (bd["weight"] / total_weight)
+                    for bd in goal_breakdowns)
+            )
+
+        return goal_breakdowns, total_weight, blended, effective_horizon
+
     def _allocation_for_horizon(self, risk_profile: str, years: int) -> Dict:
         """Return a copy of the base allocation adjusted for time horizon."""
         alloc = BASE_ALLOCATIONS.get(risk_profile, BASE_ALLOCATIONS["moderate"]).copy()
@@ -161,6 +209,7 @@ class PortfolioService:
 
         return alloc
 
+    @traced("portfolio.feasibility")
     def _compute_goal_feasibility(
         self,
         user: User,
@@ -229,6 +278,7 @@ class PortfolioService:
 
         return results
 
+    @traced("portfolio.projection")
     def _compute_projection(
         self,
         user: User,
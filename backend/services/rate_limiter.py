@@ -0,0 +1,273 @@
+"""
+Rate limiting primitives for outbound provider calls
+- AsyncTokenBucket: waits until `amount` tokens are available (requests/min,
+  tokens/min budgets)
+- AdaptiveConcurrency: AIMD concurrency limit that halves on throttling and
+  grows back slowly while calls succeed
+
+and for inbound admission control on the auth endpoints:
+- KeyedRateLimiter: non-blocking per-key token buckets in a bounded LRU
+- SqliteKeyedRateLimiter: the same buckets in a SQLite file shared by workers
+- LoginRateLimiter: per-IP and per-email limits checked before any hashing
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+class AsyncTokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per `period` seconds"""
+
+    def __init__(self, rate: float, period: float = 60.0, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.period = period
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.rate / self.period
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens can be taken (requests larger than capacity are capped)"""
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # The lock keeps waiters in FIFO order so large requests are not starved
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.refill_per_second)
+
+    def drain(self, seconds: float):
+        """Provider said we are over budget: pay back `seconds` worth of refill"""
+        self._refill()
+        self._tokens -= seconds * self.refill_per_second
+
+
+class AdaptiveConcurrency:
+    """Additive-increase / multiplicative-decrease concurrency limit"""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._successes = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        cond = self._cond()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        cond = self._cond()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def on_success(self):
+        """Grow the limit by one after a full window of successes"""
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttle(self):
+        """Halve the limit when the provider pushes back"""
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+class KeyedRateLimiter:
+    """
+    Token bucket per key (client IP, email, ...) that rejects instead of
+    waiting.  Buckets live in an LRU capped at `max_keys`; a bucket that has
+    refilled completely is the same as a missing one, so idle keys cost
+    nothing once evicted.
+    """
+
+    # hit() only takes an in-process lock; safe to call on the event loop
+    blocking = False
+
+    def __init__(self, rate: float, period: float = 60.0, burst: Optional[float] = None, max_keys: int = 10000):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.period = period
+        self.capacity = burst if burst is not None else rate
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.rate / self.period
+
+    def _take(self, tokens: float, updated: float, now: float, amount: float) -> Tuple[float, float]:
+        """Refill then take `amount`; returns (tokens left, seconds to wait or 0.0)"""
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.refill_per_second)
+        if tokens >= amount:
+            return tokens - amount, 0.0
+        self.rejected += 1
+        return tokens, (amount - tokens) / self.refill_per_second
+
+    def hit(self, key: str, amount: float = 1.0) -> float:
+        """Charge `key`; returns 0.0 when allowed, otherwise the Retry-After in seconds"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens, wait = self._take(tokens, updated, now, amount)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def close(self):
+        pass
+
+
+class SqliteKeyedRateLimiter(KeyedRateLimiter):
+    """
+    KeyedRateLimiter whose buckets live in a SQLite file, so every worker
+    process on the host draws from the same budget.  Each hit is one short
+    write transaction; full buckets are deleted periodically.
+    """
+
+    PRUNE_EVERY = 1000
+    # A hit may wait up to the 5s busy timeout for another process's write lock
+    blocking = True
+
+    def __init__(self, path, scope: str, rate: float, period: float = 60.0,
+                 burst: Optional[float] = None, max_keys: int = 10000):
+        super().__init__(rate, period=period, burst=burst, max_keys=max_keys)
+        self.path = Path(path)
+        self.scope = scope
+        self._calls = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS rate_buckets (
+                   scope TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   tokens REAL NOT NULL,
+                   updated REAL NOT NULL,
+                   PRIMARY KEY (scope, key)
+               )"""
+        )
+
+    def hit(self, key: str, amount: float = 1.0) -> float:
+        # Wall clock rather than monotonic: the value is compared across processes
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE scope = ? AND key = ?",
+                    (self.scope, key),
+                ).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                tokens, wait = self._take(tokens, updated, now, amount)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (scope, key, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (self.scope, key, tokens, now),
+                )
+                self._calls += 1
+                if self._calls % self.PRUNE_EVERY == 0:
+                    self._prune(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return wait
+
+    def _prune(self, now: float):
+        """Drop refilled buckets, then the least recently used beyond max_keys (transaction held)"""
+        self._conn.execute(
+            "DELETE FROM rate_buckets WHERE scope = ? AND updated < ?",
+            (self.scope, now - self.capacity / self.refill_per_second),
+        )
+        self._conn.execute(
+            """DELETE FROM rate_buckets WHERE scope = ? AND key IN (
+                   SELECT key FROM rate_buckets WHERE scope = ?
+                   ORDER BY updated DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.scope, self.scope, self.max_keys),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM rate_buckets WHERE scope = ?", (self.scope,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LoginRateLimiter:
+    """Admission control for credential checks: per client IP and per account"""
+
+    def __init__(self, per_ip: KeyedRateLimiter, per_email: KeyedRateLimiter):
+        self.per_ip = per_ip
+        self.per_email = per_email
+
+    @property
+    def blocking(self) -> bool:
+        """True when check() may block on I/O and must not run on the event loop"""
+        return self.per_ip.blocking or self.per_email.blocking
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        """Compact, non-reversible key so addresses are not kept in memory or on disk"""
+        return hashlib.blake2b(email.strip().lower().encode("utf-8"), digest_size=12).hexdigest()
+
+    def check(self, ip: Optional[str], email: Optional[str] = None) -> float:
+        """0.0 when the attempt may proceed, otherwise seconds until it may"""
+        wait = self.per_ip.hit(ip or "unknown")
+        if email and not wait:
+            wait = self.per_email.hit(self.email_key(email))
+        return wait
+
+    def stats(self):
+        return {
+            "ip_keys": len(self.per_ip),
+            "email_keys": len(self.per_email),
+            "rejected_by_ip": self.per_ip.rejected,
+            "rejected_by_email": self.per_email.rejected,
+        }
+
+    def close(self):
+        self.per_ip.close()
+        self.per_email.close()
@@ -0,0 +1,281 @@
+"""
+Risk Service - Portfolio risk analytics (VaR, CVaR, drawdown, Sharpe)
+All metrics are computed with matrix operations so that a batch of
+thousands of allocations costs roughly the same number of Python calls
+as a single one.
+"""
+import threading
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+ASSET_CLASSES = ("stocks", "bonds", "cash")
+
+# Annual capital-market assumptions per asset class.  Expected returns match
+# the figures PortfolioService uses for `expected_return`.
+DEFAULT_EXPECTED_RETURNS = {"stocks": 0.08, "bonds": 0.04, "cash": 0.02}
+DEFAULT_VOLATILITIES     = {"stocks": 0.16, "bonds": 0.06, "cash": 0.01}
+DEFAULT_CORRELATIONS = [
+    [1.00, 0.10, 0.00],
+    [0.10, 1.00, 0.20],
+    [0.00, 0.20, 1.00],
+]
+
+RISK_FREE_RATE = 0.02
+
+# Monte Carlo settings for expected max drawdown
+DRAWDOWN_PATHS = 256
+DRAWDOWN_STEPS_PER_YEAR = 12
+DRAWDOWN_SEED = 7
+# Standardised monthly drift (drift / diffusion) values the drawdown table is
+# tabulated on; ratios outside the grid are clipped to its ends.
+DRAWDOWN_DRIFT_GRID = np.linspace(-1.0, 1.0, 201)
+# Time steps per block when building the table; bounds the (G, P, steps)
+# temporaries to a few MB whatever the horizon
+DRAWDOWN_CHUNK_STEPS = 24
+
+
+class RiskService:
+    """Service for computing risk metrics for one or many allocations"""
+
+    # The drawdown table only depends on the seeded shocks, not on the
+    # assumptions, so it is shared across instances.
+    _drawdown_cache: Dict[tuple, np.ndarray] = {}
+    # One table build at a time, so concurrent requests neither duplicate
+    # the work nor stack their temporaries
+    _drawdown_lock = threading.Lock()
+
+    def __init__(
+        self,
+        expected_returns: Optional[Dict[str, float]] = None,
+        volatilities: Optional[Dict[str, float]] = None,
+        correlations: Optional[List[List[float]]] = None,
+        risk_free_rate: float = RISK_FREE_RATE,
+    ):
+        self.expected_returns = self._asset_vector(expected_returns, DEFAULT_EXPECTED_RETURNS)
+        self.volatilities = self._asset_vector(volatilities, DEFAULT_VOLATILITIES)
+        self.correlations = np.asarray(correlations or DEFAULT_CORRELATIONS, dtype=float)
+        self.risk_free_rate = risk_free_rate
+
+    # ------------------------------------------------------------------
+    # Public entry points
+    # ------------------------------------------------------------------
+
+    def analyze(self, allocation: Dict[str, float], **kwargs) -> Dict:
+        """Risk metrics for a single allocation (see analyze_batch)."""
+        return self.analyze_batch([allocation], **kwargs)[0]
+
+    def analyze_batch(
+        self,
+        allocations: List[Dict[str, float]],
+        confidence: float = 0.95,
+        horizon_years: float = 1.0,
+        drawdown_horizon_years: int = 10,
+        expected_returns: Optional[Dict[str, float]] = None,
+        volatilities: Optional[Dict[str, float]] = None,
+        history: Optional[List[Dict[str, float]]] = None,
+    ) -> List[Dict]:
+        """
+        Compute risk metrics for a list of allocations.
+
+        Allocations are dicts of asset class -> percentage (any scale; they
+        are normalised to sum to 1).  VaR/CVaR are reported as positive loss
+        fractions over `horizon_years`.  Historical VaR/CVaR are only
+        computed when `history` (a list of per-period asset-class returns)
+        is supplied.
+        """
+        if not allocations:
+            return []
+
+        weights = self.weights_matrix(allocations)
+        metrics = self.compute_metrics(
+            weights,
+            confidence=confidence,
+            horizon_years=horizon_years,
+            drawdown_horizon_years=drawdown_horizon_years,
+            expected_returns=expected_returns,
+            volatilities=volatilities,
+            history=history,
+        )
+
+        columns = {name: np.round(values, 4).tolist() for name, values in metrics.items()}
+        results = [dict(zip(columns, row)) for row in zip(*columns.values())]
+        for row in results:
+            row["confidence"] = confidence
+            row["horizon_years"] = horizon_years
+            if history is None:
+                row["historical_var"] = None
+                row["historical_cvar"] = None
+        return results
+
+    def compute_metrics(
+        self,
+        weights: np.ndarray,
+        confidence: float = 0.95,
+        horizon_years: float = 1.0,
+        drawdown_horizon_years: int = 10,
+        expected_returns: Optional[Dict[str, float]] = None,
+        volatilities: Optional[Dict[str, float]] = None,
+        history: Optional[List[Dict[str, float]]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorised core: `weights` is an (N, 3) matrix of normalised asset
+        weights; every returned value is an array of length N.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+        mu_assets = self._asset_vector(expected_returns, self.expected_returns)
+        vol_assets = self._asset_vector(volatilities, self.volatilities)
+        covariance = self.correlations * np.outer(vol_assets, vol_assets)
+
+        mu = weights @ mu_assets
+        variance = np.einsum("ij,jk,ik->i", weights, covariance, weights)
+        sigma = np.sqrt(np.maximum(variance, 0.0))
+
+        sharpe = np.divide(
+            mu - self.risk_free_rate, sigma,
+            out=np.zeros_like(mu), where=sigma > 0,
+        )
+
+        # --- parametric (normal) VaR / CVaR over the horizon ------------------
+        z = NormalDist().inv_cdf(confidence)
+        mu_h = mu * horizon_years
+        sigma_h = sigma * np.sqrt(horizon_years)
+        parametric_var = z * sigma_h - mu_h
+        parametric_cvar = sigma_h * NormalDist().pdf(z) / (1 - confidence) - mu_h
+
+        metrics = {
+            "expected_return": mu,
+            "volatility": sigma,
+            "sharpe_ratio": sharpe,
+            "parametric_var": parametric_var,
+            "parametric_cvar": parametric_cvar,
+            "expected_max_drawdown": self._expected_max_drawdown(mu, sigma, drawdown_horizon_years),
+        }
+
+        if history is not None:
+            hist_var, hist_cvar = self._historical_var_cvar(weights, history, confidence)
+            metrics["historical_var"] = hist_var
+            metrics["historical_cvar"] = hist_cvar
+
+        return metrics
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def weights_matrix(allocations: List[Dict[str, float]]) -> np.ndarray:
+        """Convert allocation dicts into an (N, 3) matrix of weights summing to 1."""
+        raw = RiskService._asset_rows(allocations)
+        if (raw < 0).any():
+            raise ValueError("allocation percentages must be non-negative")
+        totals = raw.sum(axis=1, keepdims=True)
+        if (totals <= 0).any():
+            raise ValueError("each allocation must have a positive total")
+        return raw / totals
+
+    @staticmethod
+    def _asset_rows(rows: List[Dict[str, float]]) -> np.ndarray:
+        """Stack asset-class dicts into an (N, 3) matrix (missing classes are 0)."""
+        return np.array(
+            [[float(r.get(asset, 0) or 0) for asset in ASSET_CLASSES] for r in rows],
+            dtype=float,
+        )
+
+    @staticmethod
+    def _asset_vector(overrides: Optional[Dict[str, float]], defaults) -> np.ndarray:
+        """Build a per-asset vector from defaults (dict or array) plus overrides."""
+        if isinstance(defaults, dict):
+            base = np.array([defaults[a] for a in ASSET_CLASSES], dtype=float)
+        else:
+            base = np.array(defaults, dtype=float)
+        if overrides:
+            for i, asset in enumerate(ASSET_CLASSES):
+                if asset in overrides:
+                    base[i] = float(overrides[asset])
+        return base
+
+    def _historical_var_cvar(
+        self,
+        weights: np.ndarray,
+        history: List[Dict[str, float]],
+        confidence: float,
+    ):
+        """Empirical VaR/CVaR from per-period asset-class returns."""
+        if not history:
+            raise ValueError("history must contain at least one period")
+        returns = self._asset_rows(history)                      # (T, 3)
+        portfolio = np.sort(returns @ weights.T, axis=0)        # (T, N), worst first
+        tail = max(1, int(np.floor((1 - confidence) * portfolio.shape[0])))
+        var = -np.quantile(portfolio, 1 - confidence, axis=0)
+        cvar = -portfolio[:tail].mean(axis=0)
+        return var, cvar
+
+    def _drawdown_table(self, steps: int) -> np.ndarray:
+        """
+        Per-path max drawdown (in units of diffusion) of the standardised
+        process S_t + c * t, tabulated over DRAWDOWN_DRIFT_GRID.
+
+        Shape (G, P).  The shocks are seeded and shared by every allocation
+        (common random numbers), so the table is computed once per horizon.
+        """
+        key = (DRAWDOWN_PATHS, steps, DRAWDOWN_SEED)
+        table = self._drawdown_cache.get(key)
+        if table is not None:
+            return table
+        with self._drawdown_lock:
+            if key not in self._drawdown_cache:
+                self._drawdown_cache[key] = self._build_drawdown_table(steps)
+            return self._drawdown_cache[key]
+
+    @staticmethod
+    def _build_drawdown_table(steps: int) -> np.ndarray:
+        """
+        Walk the paths DRAWDOWN_CHUNK_STEPS at a time, carrying each path's
+        running peak and max drawdown, instead of materialising (G, P, steps)
+        """
+        rng = np.random.default_rng(DRAWDOWN_SEED)
+        cum_shocks = np.cumsum(rng.standard_normal((DRAWDOWN_PATHS, steps)), axis=1)   # (P, T)
+        grid = DRAWDOWN_DRIFT_GRID[:, None, None]
+        # the starting value (0) counts towards the running peak
+        peak = np.zeros((DRAWDOWN_DRIFT_GRID.size, DRAWDOWN_PATHS))
+        max_dd = np.zeros_like(peak)
+        for start in range(0, steps, DRAWDOWN_CHUNK_STEPS):
+            stop = min(start + DRAWDOWN_CHUNK_STEPS, steps)
+            t = np.arange(start + 1, stop + 1, dtype=float)
+            paths = cum_shocks[None, :, start:stop] + grid * t                      # (G, P, C)
+            running = np.maximum(np.maximum.accumulate(paths, axis=2), peak[:, :, None])
+            np.maximum(max_dd, (running - paths).max(axis=2), out=max_dd)
+            peak = running[:, :, -1]
+        return max_dd
+
+    def _expected_max_drawdown(self, mu: np.ndarray, sigma: np.ndarray, years: int) -> np.ndarray:
+        """
+        Expected maximum drawdown under geometric Brownian motion.
+
+        Monthly log returns are a + b * Z, so a log value path is
+        b * (S_t + c * t) with c = a / b.  Its log drawdown is b times the
+        drawdown of the standardised path, which only depends on c; that is
+        read from a precomputed table by linear interpolation, keeping the
+        per-allocation cost at O(paths).
+        """
+        steps = max(1, int(years * DRAWDOWN_STEPS_PER_YEAR))
+        dt = 1.0 / DRAWDOWN_STEPS_PER_YEAR
+        table = self._drawdown_table(steps)                          # (G, P)
+
+        drift = (mu - 0.5 * sigma ** 2) * dt                         # (N,)
+        diffusion = sigma * np.sqrt(dt)                              # (N,)
+        ratio = np.divide(drift, diffusion, out=np.zeros_like(drift), where=diffusion > 0)
+
+        grid = DRAWDOWN_DRIFT_GRID
+        pos = np.interp(np.clip(ratio, grid[0], grid[-1]), grid, np.arange(grid.size))
+        lower = np.minimum(pos.astype(int), grid.size - 2)
+        frac = (pos - lower)[:, None]
+        std_dd = table[lower] * (1 - frac) + table[lower + 1] * frac  # (N, P)
+
+        max_dd_log = diffusion[:, None] * std_dd
+        return (1.0 - np.exp(-max_dd_log)).mean(axis=1)
@@ -0,0 +1,101 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key share one in-flight computation: the
+first caller runs it, everyone else waits for and receives the same result
+(or exception).  Nothing is cached once the computation finishes.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+def fingerprint(*parts: Any) -> str:
+    """Canonical hash of JSON-serialisable request parts (dict order ignored)"""
+    material = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """An in-flight synchronous computation"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls.  `do` is for blocking callables
+    (threads), `do_async` for coroutines on the event loop.  Results are
+    shared objects: callers must treat them as read-only.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.calls = 0        # total calls
+        self.executions = 0   # calls that actually ran the computation
+        self.coalesced = 0    # calls that joined an in-flight computation
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Call] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        # Tasks are loop-bound, so the loop is part of the key
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda done: self._forget(task_key, done))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        # shield: one caller disconnecting must not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: tuple, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight) + len(self._tasks),
+            }
@@ -0,0 +1,123 @@
+"""
+What-if sessions - live feasibility recalculation over a WebSocket
+The allocation editor sends an update for every slider movement.  A session
+keeps only the newest unprocessed update (latest wins): after an update
+arrives it waits `debounce` seconds for the burst to settle, then computes
+the latest allocation and pushes the result.  Updates overwritten while
+waiting or computing are never computed.
+
+Protocol (JSON text frames):
+    client -> {"allocation": {"stocks": 60, "bonds": 30, "cash": 10}, "seq": 7}
+    server -> {"type": "ready", ...}                       once, on connect
+              {"type": "feasibility", "seq": 7, "result": FeasibilityResponse}
+              {"type": "error", "seq": 7, "detail": "..."}  bad update; session stays open
+"""
+import asyncio
+import os
+from typing import Callable, Dict, Optional
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocket
+
+from metrics import WHATIF_SESSIONS, WHATIF_UPDATES
+from responses import dumps
+from schemas import WhatIfUpdate
+
+DEFAULT_DEBOUNCE_MS = 50.0
+
+
+def debounce_seconds() -> float:
+    """Burst settling time from WHATIF_DEBOUNCE_MS (0 computes as soon as possible)"""
+    return max(0.0, float(os.getenv("WHATIF_DEBOUNCE_MS", DEFAULT_DEBOUNCE_MS))) / 1000
+
+
+class LatestWins:
+    """Single-slot mailbox: put() replaces any value not yet taken"""
+
+    def __init__(self):
+        self.superseded = 0
+        self._value = None
+        self._ready = asyncio.Event()
+
+    def put(self, value):
+        if self._ready.is_set():
+            self.superseded += 1
+            WHATIF_UPDATES.labels("superseded").inc()
+        self._value = value
+        self._ready.set()
+
+    async def take(self, settle: float = 0.0):
+        """Wait for a value, then `settle` seconds more for newer ones, and return the newest"""
+        await self._ready.wait()
+        if settle:
+            await asyncio.sleep(settle)
+        self._ready.clear()
+        value, self._value = self._value, None
+        return value
+
+
+class WhatIfSession:
+    """
+    One connection: a receive loop filling a LatestWins slot and a compute
+    loop draining it.  `compute(allocation)` returns a JSON-ready result and
+    runs in the thread pool.
+    """
+
+    def __init__(self, websocket: WebSocket, compute: Callable[[Dict[str, float]], Dict],
+                 debounce: Optional[float] = None):
+        self.websocket = websocket
+        self.compute = compute
+        self.debounce = debounce_seconds() if debounce is None else debounce
+        self.received = 0
+        self.computed = 0
+        self._pending = LatestWins()
+        self._send_lock = asyncio.Lock()
+
+    async def run(self, **ready):
+        """Serve the session until the client disconnects"""
+        WHATIF_SESSIONS.inc()
+        computing = asyncio.create_task(self._compute_loop())
+        try:
+            await self._send({"type": "ready", **ready})
+            await self._receive_loop()
+        finally:
+            computing.cancel()
+            # A send that failed because the client left ends the task early
+            await asyncio.gather(computing, return_exceptions=True)
+            WHATIF_SESSIONS.dec()
+
+    async def _send(self, message: Dict):
+        async with self._send_lock:
+            await self.websocket.send_text(dumps(message).decode("utf-8"))
+
+    async def _receive_loop(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            text = message.get("text")
+            if text is None:
+                text = (message.get("bytes") or b"").decode("utf-8", "replace")
+            try:
+                update = WhatIfUpdate.model_validate_json(text)
+            except ValidationError as e:
+                WHATIF_UPDATES.labels("invalid").inc()
+                detail = e.errors(include_url=False, include_context=False)
+                await self._send({"type": "error", "seq": None, "detail": detail})
+                continue
+            self.received += 1
+            WHATIF_UPDATES.labels("received").inc()
+            self._pending.put(update)
+
+    async def _compute_loop(self):
+        while True:
+            update = await self._pending.take(self.debounce)
+            try:
+                result = await run_in_threadpool(self.compute, update.allocation)
+            except Exception as e:
+                await self._send({"type": "error", "seq": update.seq, "detail": str(e)})
+                continue
+            self.computed += 1
+            WHATIF_UPDATES.labels("computed").inc()
+            await self._send({"type": "feasibility", "seq": update.seq, "result": result})
@@ -4,13 +4,17 @@ Replaces database for MVP/mocking purposes
 """
 import json
 import os
-from typing import List, Dict, Optional
+import tempfile
+import time
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 from pathlib import Path
 
-# Data directory
-DATA_DIR = Path(__file__).parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
+from metrics import STORAGE_BYTES, STORAGE_SECONDS
+from tracing import span
+
+# Data directory (STORAGE_DIR points the app at another dataset, e.g. for load tests)
+DATA_DIR = Path(os.getenv("STORAGE_DIR") or Path(__file__).parent / "data")
 
 USERS_FILE = DATA_DIR / "users.json"
 PORTFOLIOS_FILE = DATA_DIR / "portfolios.json"
@@ -27,17 +31,67 @@ class FileStorage:
             default = []
         if not file_path.exists():
             return default
+        start = time.perf_counter()
         try:
-            with open(file_path, 'r') as f:
+            with span("storage.read", file=file_path.name), open(file_path, 'r') as f:
+                STORAGE_BYTES.labels("read", file_path.name).inc(os.fstat(f.fileno()).st_size)
                 return json.load(f)
         except (json.JSONDecodeError, IOError):
             return default
+        finally:
+            STORAGE_SECONDS.labels("read", file_path.name).observe(time.perf_counter() - start)
+    
+    @staticmethod
+    def _iter_json(file_path: Path, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+        """
+        Stream the objects of a JSON array file one at a time, holding only
+        one chunk plus the current object in memory.
+        """
+        if not file_path.exists():
+            return
+        decoder = json.JSONDecoder()
+        with open(file_path, 'r') as f:
+            buf = f.read(chunk_size).lstrip()
+            if not buf.startswith('['):
+                return
+            buf = buf[1:]
+            eof = False
+            while True:
+                buf = buf.lstrip().lstrip(',').lstrip()
+                if buf.startswith(']'):
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf)
+                except json.JSONDecodeError:
+                    if eof:
+                        return
+                    more = f.read(chunk_size)
+                    eof = not more
+                    buf += more
+                    continue
+                yield item
+                buf = buf[end:]
     
     @staticmethod
     def _write_json(file_path: Path, data: list):
-        """Write data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        """
+        Write data to JSON file.  The data goes to a temporary file that then
+        replaces the original, so readers and crashes never see a partial file.
+        """
+        # Created on first write rather than at import, keeping imports free of side effects
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with STORAGE_SECONDS.labels("write", file_path.name).time(), span("storage.write", file=file_path.name):
+            fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2, default=str)
+                    STORAGE_BYTES.labels("write", file_path.name).inc(f.tell())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
     
     @staticmethod
     def get_next_id(items: List[Dict]) -> int:
@@ -54,6 +108,10 @@ class UserStorage:
     def get_all() -> List[Dict]:
         return FileStorage._read_json(USERS_FILE)
     
+    @staticmethod
+    def iter_all() -> Iterator[Dict]:
+        return FileStorage._iter_json(USERS_FILE)
+    
     @staticmethod
     def get_by_id(user_id: int) -> Optional[Dict]:
         users = UserStorage.get_all()
@@ -86,6 +144,18 @@ class UserStorage:
                 FileStorage._write_json(USERS_FILE, users)
                 return user_data
         return None
+    
+    @staticmethod
+    def patch(user_id: int, fields: Dict) -> Optional[Dict]:
+        """Overwrite `fields` of a stored user, keeping the rest, in one read and write"""
+        users = UserStorage.get_all()
+        for user in users:
+            if user.get('id') == user_id:
+                user.update(fields)
+                user['updated_at'] = datetime.now().isoformat()
+                FileStorage._write_json(USERS_FILE, users)
+                return user
+        return None
 
 
 class PortfolioStorage:
@@ -95,6 +165,10 @@ class PortfolioStorage:
     def get_all() -> List[Dict]:
         return FileStorage._read_json(PORTFOLIOS_FILE)
     
+    @staticmethod
+    def iter_all() -> Iterator[Dict]:
+        return FileStorage._iter_json(PORTFOLIOS_FILE)
+    
     @staticmethod
     def get_by_user_id(user_id: int) -> Optional[Dict]:
         portfolios = PortfolioStorage.get_all()
@@ -145,11 +219,20 @@ class GoalStorage:
     def get_all() -> List[Dict]:
         return FileStorage._read_json(GOALS_FILE)
     
+    @staticmethod
+    def iter_all() -> Iterator[Dict]:
+        return FileStorage._iter_json(GOALS_FILE)
+    
     @staticmethod
     def get_by_user_id(user_id: int) -> List[Dict]:
         goals = GoalStorage.get_all()
         return [g for g in goals if g.get('user_id') == user_id]
     
+    @staticmethod
+    def get_by_id(goal_id: int) -> Optional[Dict]:
+        goals = GoalStorage.get_all()
+        return next((g for g in goals if g.get('id') == goal_id), None)
+    
     @staticmethod
     def create(goal_data: Dict) -> Dict:
         goals = GoalStorage.get_all()
@@ -158,4 +241,26 @@ class GoalStorage:
         goals.append(goal_data)
         FileStorage._write_json(GOALS_FILE, goals)
         return goal_data
+    
+    @staticmethod
+    def update(goal_id: int, goal_data: Dict) -> Optional[Dict]:
+        goals = GoalStorage.get_all()
+        for i, goal in enumerate(goals):
+            if goal.get('id') == goal_id:
+                goal_data['id'] = goal_id
+                goal_data['user_id'] = goal.get('user_id')
+                goal_data['created_at'] = goal.get('created_at')
+                goals[i] = goal_data
+                FileStorage._write_json(GOALS_FILE, goals)
+                return goal_data
+        return None
+    
+    @staticmethod
+    def delete(goal_id: int) -> bool:
+        goals = GoalStorage.get_all()
+        remaining = [g for g in goals if g.get('id') != goal_id]
+        if len(remaining) == len(goals):
+            return False
+        FileStorage._write_json(GOALS_FILE, remaining)
+        return True
 
@@ -1,12 +1,28 @@
 """
 Pytest configuration and fixtures for testing
 """
+import os
+import tempfile
+
 import pytest
 from unittest.mock import Mock, MagicMock
+
+# Tracing is off by default; enable the in-memory buffer before the exporter
+# is built at import, so main installs the tracing middleware
+os.environ.setdefault("TRACING_EXPORTER", "memory")
+
 from database import DB
-from models import User
+from models import User, Portfolio
+from schemas import FinancialGoalCreate
 from auth import hash_password
 
+# Keep runtime files (caches, job stores) out of backend/data during tests
+TEST_RUNTIME_DIR = tempfile.mkdtemp(prefix="finapp-tests-")
+os.environ.setdefault("PLAN_CACHE_PATH", os.path.join(TEST_RUNTIME_DIR, "plan_cache.db"))
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(TEST_RUNTIME_DIR, "jobs.jsonl"))
+# Every TestClient request comes from the same address; limiter tests opt in explicitly
+os.environ.setdefault("LOGIN_RATE_ENABLED", "false")
+
 
 @pytest.fixture
 def mock_db():
@@ -55,3 +71,17 @@ def user_without_password():
     }
     return User.from_dict(user_data)
 
+
+@pytest.fixture
+def plan_inputs():
+    """User, portfolio and goals for plan generation tests"""
+    user = User(
+        id=1, name="Test User", age=30, current_income=75000.0,
+        current_savings=50000.0, risk_profile="moderate",
+    )
+    portfolio = Portfolio(id=1, user_id=1, allocation={"stocks": 60, "bonds": 30, "cash": 10})
+    goals = [FinancialGoalCreate(
+        user_id=1, goal_name="Retirement", target_amount=500000.0,
+        target_date="2050-01-01", priority="high",
+    )]
+    return user, portfolio, goals
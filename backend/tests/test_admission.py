@@ -0,0 +1,123 @@
+"""
+Unit tests for admission control and load shedding
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from admission import AdmissionController, AdmissionMiddleware, ClassLimiter
+from main import admission, app as main_app
+
+
+def make_app(*limiters: ClassLimiter, rules=(("slow", "GET", "/slow"), ("exempt", None, "/health"))):
+    controller = AdmissionController(limiters, rules=rules, default_class="fast")
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/slow")
+    async def slow(seconds: float = 0.2):
+        await asyncio.sleep(seconds)
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast(seconds: float = 0.0):
+        await asyncio.sleep(seconds)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    return app, controller
+
+
+async def concurrently(app, *requests):
+    """Send (path, headers) requests at once, each started slightly after the previous"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def one(i, path, headers):
+            await asyncio.sleep(0.01 * i)
+            return await client.get(path, headers=headers or {})
+        return await asyncio.gather(*(one(i, path, headers) for i, (path, headers) in enumerate(requests)))
+
+
+class TestLimits:
+    """Tests for per-class concurrency, queueing and rejection"""
+
+    def test_queue_full_rejected_with_retry_after(self):
+        app, controller = make_app(ClassLimiter("slow", concurrency=1, queue_size=1, timeout=5.0))
+        responses = asyncio.run(concurrently(app, ("/slow", None), ("/slow", None), ("/slow", None)))
+
+        assert [r.status_code for r in responses] == [200, 200, 503]
+        assert responses[2].json()["reason"] == "queue_full"
+        assert int(responses[2].headers["retry-after"]) >= 1
+        stats = controller.stats()["classes"]["slow"]
+        assert stats["admitted"] == 2 and stats["rejected"]["queue_full"] == 1
+        assert stats["active"] == 0 and stats["queued"] == 0
+
+    def test_queued_request_times_out(self):
+        app, _ = make_app(ClassLimiter("slow", concurrency=1, queue_size=5, timeout=0.05))
+        responses = asyncio.run(concurrently(app, ("/slow", None), ("/slow", None)))
+        assert [r.status_code for r in responses] == [200, 503]
+        assert responses[1].json()["reason"] == "deadline"
+
+    def test_client_deadline_rejects_without_queueing(self):
+        limiter = ClassLimiter("slow", concurrency=1, queue_size=5, timeout=5.0)
+        limiter.service_time = 0.2
+        app, _ = make_app(limiter)
+        responses = asyncio.run(concurrently(app, ("/slow", None), ("/slow", {"X-Request-Timeout": "0.1"})))
+        assert responses[1].status_code == 503
+        assert responses[1].json()["reason"] == "deadline"
+        # Rejected on arrival (estimated 0.2s wait), not after waiting out 0.1s
+        assert responses[1].elapsed.total_seconds() < 0.09
+
+    def test_other_classes_and_exempt_routes_unaffected(self):
+        app, _ = make_app(ClassLimiter("slow", concurrency=1, queue_size=0, timeout=1.0),
+                          ClassLimiter("fast", concurrency=10, queue_size=10, timeout=1.0))
+        responses = asyncio.run(concurrently(app, ("/slow", None), ("/slow", None), ("/fast", None), ("/health", None)))
+        assert [r.status_code for r in responses] == [200, 503, 200, 200]
+
+    def test_expensive_class_shed_first_under_pressure(self):
+        app, controller = make_app(
+            ClassLimiter("read", concurrency=64, queue_size=256, timeout=5.0),
+            ClassLimiter("fast", concurrency=1, queue_size=3, timeout=5.0, shed_at=0.9),
+            ClassLimiter("slow", concurrency=1, queue_size=3, timeout=5.0, shed_at=0.5),
+        )
+        requests = [("/slow?seconds=0.3", None)] + [("/fast?seconds=0.1", None)] * 4 + [("/slow", None)]
+        responses = asyncio.run(concurrently(app, *requests))
+
+        # The compute calls all queue, but the second expensive call is shed: 5 of the
+        # 8 sheddable places were in use, however idle the (unsheddable) read class is
+        assert [r.status_code for r in responses] == [200, 200, 200, 200, 200, 503]
+        assert responses[-1].json()["reason"] == "shed"
+        assert controller.limiters["fast"].rejected == {"queue_full": 0, "deadline": 0, "shed": 0}
+
+
+class TestAppIntegration:
+    """Tests for the route classes and stats in the real app"""
+
+    @pytest.mark.parametrize("method, path, expected", [
+        ("GET", "/api/users/1", "read"),
+        ("POST", "/api/portfolio/analyze", "compute"),
+        ("POST", "/api/portfolio/risk/batch", "compute"),
+        ("GET", "/api/dashboard/7", "compute"),
+        ("POST", "/api/plan/generate", "expensive"),
+        ("POST", "/api/auth/login", "expensive"),
+        ("POST", "/api/users", "expensive"),
+        ("POST", "/api/users/1/goals", "read"),
+        ("GET", "/api/health/ready", "exempt"),
+    ])
+    def test_classification(self, method, path, expected):
+        assert admission.classify(method, path) == expected
+
+    def test_stats_and_gauges(self):
+        client = TestClient(main_app)
+        client.get("/")
+        stats = client.get("/api/stats/admission").json()
+        assert stats["enabled"] is True
+        assert set(stats["classes"]) == {"read", "compute", "expensive"}
+        assert stats["classes"]["read"]["admitted"] >= 1
+        assert 'admission_queue_depth{class="expensive"} 0' in client.get("/metrics").text
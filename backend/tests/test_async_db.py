@@ -0,0 +1,52 @@
+"""
+Unit tests for the AsyncDB storage wrapper
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+from database import AsyncDB, get_async_db
+
+
+class TestAsyncDB:
+    """Tests that storage calls run off the event loop"""
+
+    def test_calls_run_on_storage_pool(self, sample_user):
+        db = Mock()
+        threads = []
+
+        def get_user(user_id):
+            threads.append(threading.current_thread().name)
+            return sample_user
+
+        db.get_user.side_effect = get_user
+        result = asyncio.run(AsyncDB(db).get_user(1))
+
+        assert result is sample_user
+        db.get_user.assert_called_once_with(1)
+        assert threads[0].startswith("storage")
+
+    def test_slow_storage_does_not_block_loop(self):
+        db = Mock()
+        db.get_portfolio_by_user_id.side_effect = lambda user_id: time.sleep(0.2)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await asyncio.gather(*(AsyncDB(db).get_portfolio_by_user_id(i) for i in range(4)))
+            task.cancel()
+            return ticks
+
+        assert asyncio.run(main()) >= 5
+
+    def test_wraps_given_db(self, mock_db):
+        """Test that get_async_db wraps the (possibly overridden) get_db instance"""
+        assert get_async_db(mock_db).db is mock_db
@@ -1,8 +1,15 @@
 """
 Unit tests for password authentication utilities
 """
+import asyncio
+import threading
+
 import pytest
-from auth import hash_password, verify_password
+import auth
+from auth import (
+    hash_password, verify_password, hash_cost, needs_rehash,
+    hash_password_async, verify_password_async,
+)
 
 
 class TestHashPassword:
@@ -107,3 +114,57 @@ class TestVerifyPassword:
             assert verify_password(password, hashed) is True
             assert verify_password(password + "x", hashed) is False
 
+
+
+class TestWorkFactor:
+    """Tests for configurable cost and rehash detection"""
+    
+    def test_hash_uses_configured_rounds(self, monkeypatch):
+        """Test that new hashes use BCRYPT_ROUNDS"""
+        monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+        assert hash_cost(hash_password("pw")) == 4
+    
+    def test_explicit_rounds(self):
+        """Test that rounds can be passed explicitly"""
+        assert hash_cost(hash_password("pw", rounds=5)) == 5
+    
+    def test_hash_cost_invalid(self):
+        """Test that unparseable hashes have no cost"""
+        assert hash_cost("notavalidhash") is None
+        assert hash_cost(None) is None
+    
+    def test_needs_rehash(self, monkeypatch):
+        """Test that only hashes with a different cost need rehashing"""
+        hashed = hash_password("pw", rounds=4)
+        monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+        assert needs_rehash(hashed) is False
+        monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+        assert needs_rehash(hashed) is True
+        assert needs_rehash("notavalidhash") is False
+
+
+class TestAsyncHashing:
+    """Tests for hashing on the bounded bcrypt thread pool"""
+    
+    async def test_async_round_trip(self):
+        """Test async hash and verify"""
+        hashed = await hash_password_async("secret", rounds=4)
+        assert await verify_password_async("secret", hashed) is True
+        assert await verify_password_async("wrong", hashed) is False
+    
+    async def test_runs_off_the_event_loop(self):
+        """Test that hashing runs on the dedicated executor threads"""
+        threads = []
+        original = auth.verify_password
+        
+        def recording_verify(password, password_hash):
+            threads.append(threading.current_thread().name)
+            return original(password, password_hash)
+        
+        auth.verify_password = recording_verify
+        try:
+            hashed = hash_password("secret", rounds=4)
+            await asyncio.gather(*[verify_password_async("secret", hashed) for _ in range(4)])
+        finally:
+            auth.verify_password = original
+        assert all(name.startswith("bcrypt") for name in threads)
@@ -0,0 +1,69 @@
+"""
+Unit tests for the end-to-end load harness
+"""
+import argparse
+import asyncio
+
+import pytest
+
+from benchmarks.bench_load import compare_reports, parse_mix, run_load
+from services.container import shutdown_services
+
+
+class TestMix:
+    """Tests for --mix parsing"""
+
+    def test_weights(self):
+        assert parse_mix("get_user=6, plan=1,login") == {"get_user": 6.0, "plan": 1.0, "login": 1.0}
+
+    def test_unknown_route(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_mix("delete_everything=1")
+
+
+class TestRunLoad:
+    """In-process runs against a small generated dataset and the LLM stub"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_services(self):
+        # The harness's lifespan must build services from its own settings
+        shutdown_services()
+        yield
+        shutdown_services()
+
+    def test_closed_loop_report(self):
+        mix = {"login": 1, "get_user": 2, "analyze": 1, "feasibility": 1, "plan": 1}
+        report = asyncio.run(run_load(mix=mix, users=20, concurrency=4, requests=60, llm_latency=0))
+
+        overall = report["overall"]
+        assert overall["requests"] == 60
+        assert overall["errors"] == 0, report["routes"]
+        assert set(report["routes"]) <= set(mix)
+        for stats in report["routes"].values():
+            assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+        # Every plan call either reached the stub or joined an identical in-flight one
+        plans = report["routes"].get("plan", {}).get("requests", 0)
+        assert report["llm_stub_requests"] == plans - report["plan_calls_coalesced"]
+
+    def test_open_loop_rate(self):
+        report = asyncio.run(run_load(mix={"get_user": 1}, users=5, rps=50, requests=25, llm_latency=0))
+        assert report["config"]["mode"] == "open"
+        assert report["overall"]["requests"] == 25
+        assert report["overall"]["dropped"] == 0
+        # 25 arrivals at 50/s are spread over about half a second
+        assert report["elapsed_s"] >= 0.45
+
+
+class TestCompare:
+    """Tests for diffing two reports"""
+
+    def test_changes_listed_per_route(self):
+        stats = {"requests": 10, "p50_ms": 10.0, "p99_ms": 20.0, "error_rate": 0.0}
+        slower = {**stats, "p99_ms": 40.0, "error_rate": 0.1}
+        lines = compare_reports(
+            {"overall": stats, "routes": {"get_user": stats}},
+            {"overall": stats, "routes": {"get_user": slower, "plan": stats}},
+        )
+        assert len(lines) == 2
+        assert "p99_ms 20.0 -> 40.0 (+100%)" in lines[1]
+        assert "errors 0.00% -> 10.00%" in lines[1]
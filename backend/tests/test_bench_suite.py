@@ -0,0 +1,43 @@
+"""
+Unit tests for the microbenchmark suite and its regression comparison
+"""
+from benchmarks.bench_suite import compare, run_suite
+
+
+def result(**medians):
+    return {"results": {name: {"median_s": value} for name, value in medians.items()}}
+
+
+class TestCompare:
+    """Tests for flagging regressions against a baseline"""
+
+    def test_flags_only_slowdowns_beyond_threshold(self):
+        baseline = result(a=1.0, b=1.0, c=1.0)
+        current = result(a=1.1, b=1.3, c=0.5)
+        rows = {row["case"]: row for row in compare(baseline, current, threshold=0.15)}
+        assert not rows["a"]["regression"]
+        assert rows["b"]["regression"]
+        assert not rows["c"]["regression"]
+        assert rows["c"]["change"] == -0.5
+
+    def test_cases_missing_from_baseline_skipped(self):
+        assert compare(result(a=1.0), result(a=1.0, new=5.0)) == [
+            {"case": "a", "baseline_s": 1.0, "current_s": 1.0, "change": 0.0, "regression": False}
+        ]
+
+
+class TestRunSuite:
+    """Smoke test of the suite on tiny inputs"""
+
+    def test_storage_and_allocation_cases(self, monkeypatch):
+        monkeypatch.setattr("auth.BCRYPT_ROUNDS", 4)
+        report = run_suite(sizes=[20], goal_counts=[1, 3])
+        names = set(report["results"])
+        assert {"storage.write[20]", "storage.read[20]", "users.get_by_email[20]",
+                "allocation[goals=1]", "allocation[goals=3]", "projection[goals=10]",
+                "bcrypt.verify[rounds=4]"} <= names
+        assert all(r["median_s"] > 0 and r["rounds"] >= 3 for r in report["results"].values())
+
+    def test_filter_skips_setup_of_other_cases(self):
+        report = run_suite(sizes=[10_000_000], goal_counts=[2], name_filter="allocation")
+        assert list(report["results"]) == ["allocation[goals=2]"]
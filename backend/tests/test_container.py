@@ -0,0 +1,79 @@
+"""
+Unit tests for the service container, lazy model loading and readiness
+"""
+import pytest
+from starlette.testclient import TestClient
+
+from main import app
+from services.container import ServiceContainer, get_services, shutdown_services
+from services.ml_service import MLService
+
+
+@pytest.fixture(autouse=True)
+def fresh_container():
+    """Start and end every test without a global container"""
+    shutdown_services()
+    yield
+    shutdown_services()
+
+
+class TestMLServiceLazyLoading:
+    """Tests for lazy model loading in MLService"""
+
+    def test_models_not_loaded_on_construction(self):
+        """Test that constructing MLService does not load models"""
+        assert MLService().models_loaded is False
+
+    def test_models_loaded_on_first_use(self):
+        """Test that the first prediction loads the models once"""
+        service = MLService()
+        calls = []
+        service._load_models = lambda: calls.append(1) or {}
+        service.analyze_sentiment(["SPY"])
+        service.predict_etf_performance(["SPY"], 5)
+        assert service.models_loaded is True
+        assert calls == [1]
+
+
+class TestServiceContainer:
+    """Tests for the application-level service container"""
+
+    def test_get_services_returns_singleton(self):
+        """Test that services are created once and reused"""
+        first = get_services()
+        second = get_services()
+        assert first is second
+        assert first.portfolio_service.risk_service is first.risk_service
+
+    def test_warmup_marks_ready(self):
+        """Test that warmup loads models and reports readiness"""
+        container = ServiceContainer()
+        assert container.ready is False
+        container.warmup()
+        assert container.ready is True
+        assert container.ml_service.models_loaded is True
+        assert container.warmup_seconds is not None
+
+
+class TestReadinessEndpoint:
+    """Tests for /api/health/ready"""
+
+    def test_not_ready_without_startup(self):
+        """Test that readiness fails before the lifespan warmup has run"""
+        response = TestClient(app).get("/api/health/ready")
+        assert response.status_code == 503
+
+    def test_ready_after_startup_warmup(self):
+        """Test that readiness succeeds once the lifespan handler has warmed up"""
+        with TestClient(app) as client:
+            response = client.get("/api/health/ready")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ready"
+            assert get_services().ml_service.models_loaded is True
+
+    def test_ready_without_warmup(self, monkeypatch):
+        """Test that disabling warmup keeps models lazy but still reports ready"""
+        monkeypatch.setenv("ML_WARMUP", "false")
+        with TestClient(app) as client:
+            assert client.get("/api/health/ready").status_code == 200
+            assert get_services().ml_service.models_loaded is False
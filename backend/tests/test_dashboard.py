@@ -0,0 +1,88 @@
+"""
+Unit tests for the aggregate dashboard endpoint
+"""
+import pytest
+from starlette.testclient import TestClient
+
+import storage
+from database import DB
+from main import app, get_db
+from storage import FileStorage
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, sample_user_data):
+    """Real file storage in tmp_path holding one user with a portfolio and two goals"""
+    for name in ("USERS_FILE", "PORTFOLIOS_FILE", "GOALS_FILE"):
+        monkeypatch.setattr(storage, name, tmp_path / f"{name.lower()}.json")
+    FileStorage._write_json(storage.USERS_FILE, [sample_user_data])
+    FileStorage._write_json(storage.PORTFOLIOS_FILE, [
+        {"id": 1, "user_id": 1, "allocation": {"stocks": 60, "bonds": 30, "cash": 10}},
+    ])
+    FileStorage._write_json(storage.GOALS_FILE, [
+        {"id": 1, "user_id": 1, "goal_name": "Retirement", "target_amount": 500000.0,
+         "target_date": "2050-01-01", "priority": "high"},
+        {"id": 2, "user_id": 9, "goal_name": "Someone else's", "target_amount": 1.0,
+         "target_date": "2030-01-01", "priority": "low"},
+        {"id": 3, "user_id": 1, "goal_name": "Car", "target_amount": 30000.0,
+         "target_date": "2028-06-01", "priority": "medium"},
+    ])
+
+    reads = []
+    read_json = FileStorage._read_json
+
+    def counting_read(path, default=None):
+        if path.parent == tmp_path:
+            reads.append(path.name)
+        return read_json(path, default)
+
+    monkeypatch.setattr(FileStorage, "_read_json", staticmethod(counting_read))
+    app.dependency_overrides[get_db] = lambda: DB()
+    yield reads
+    app.dependency_overrides.clear()
+
+
+class TestDashboard:
+    """Tests for GET /api/dashboard/{user_id}"""
+
+    def test_everything_in_one_storage_pass(self, store):
+        response = TestClient(app).get("/api/dashboard/1")
+        assert response.status_code == 200
+        body = response.json()
+
+        assert body["user"]["email"] == "test@example.com"
+        assert "password_hash" not in body["user"]
+        assert body["portfolio"]["allocation"] == {"stocks": 60.0, "bonds": 30.0, "cash": 10.0}
+        assert [g["goal_name"] for g in body["goals"]] == ["Retirement", "Car"]
+        breakdown = body["analysis"]["goal_allocation_breakdown"]
+        assert [b["goal_name"] for b in breakdown] == ["Retirement", "Car"]
+        assert sorted(store) == ["goals_file.json", "portfolios_file.json", "users_file.json"]
+
+    def test_field_selection_skips_unneeded_work(self, store):
+        response = TestClient(app).get("/api/dashboard/1?fields=user.name,analysis.allocation")
+        assert response.json() == {
+            "user": {"name": "Test User"},
+            "analysis": {"allocation": response.json()["analysis"]["allocation"]},
+        }
+        # The portfolio file is not read when the portfolio is not requested
+        assert "portfolios_file.json" not in store
+
+    def test_goal_sub_fields(self, store):
+        body = TestClient(app).get("/api/dashboard/1?fields=goals.goal_name,goals.priority").json()
+        assert body == {"goals": [{"goal_name": "Retirement", "priority": "high"},
+                                  {"goal_name": "Car", "priority": "medium"}]}
+        assert "users_file.json" in store and "goals_file.json" in store
+
+    def test_unknown_field_rejected(self, store):
+        response = TestClient(app).get("/api/dashboard/1?fields=user.password_hash")
+        assert response.status_code == 400
+
+    def test_time_horizon_bounds(self, store):
+        client = TestClient(app)
+        assert client.get("/api/dashboard/1?time_horizon=0").status_code == 422
+        assert client.get("/api/dashboard/1?time_horizon=101").status_code == 422
+        assert client.get("/api/dashboard/1?fields=user&time_horizon=100").status_code == 200
+
+    def test_missing_user_reads_only_users_file(self, store):
+        assert TestClient(app).get("/api/dashboard/42").status_code == 404
+        assert store == ["users_file.json"]
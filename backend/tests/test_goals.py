@@ -0,0 +1,182 @@
+"""
+Unit tests for stored goals: the goals API, the per-user goal cache and
+analysis requests that reference stored goals instead of sending them
+"""
+import pytest
+from starlette.testclient import TestClient
+
+import storage
+from database import DB
+from main import app, get_db
+from services.container import get_services, shutdown_services
+from services.goal_cache import AnalysisCache, GoalCache
+from storage import FileStorage
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, sample_user_data):
+    """Client over real file storage in tmp_path with one user and one goal"""
+    for name in ("USERS_FILE", "PORTFOLIOS_FILE", "GOALS_FILE"):
+        monkeypatch.setattr(storage, name, tmp_path / f"{name.lower()}.json")
+    monkeypatch.setenv("PLAN_CACHE_ENABLED", "false")
+    monkeypatch.setenv("JOB_STORE_PATH", str(tmp_path / "jobs.jsonl"))
+    FileStorage._write_json(storage.USERS_FILE, [sample_user_data])
+    FileStorage._write_json(storage.GOALS_FILE, [
+        {"id": 1, "user_id": 1, "goal_name": "Retirement", "target_amount": 500000.0,
+         "target_date": "2050-01-01", "priority": "high"},
+        {"id": 2, "user_id": 9, "goal_name": "Someone else's", "target_amount": 1.0,
+         "target_date": "2030-01-01", "priority": "low"},
+    ])
+    shutdown_services()
+    app.dependency_overrides[get_db] = lambda: DB()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    shutdown_services()
+
+
+NEW_GOAL = {"goal_name": "House", "target_amount": 80000.0, "target_date": "2032-05-01", "priority": "medium"}
+
+
+class TestGoalsApi:
+    """Tests for /api/users/{user_id}/goals"""
+
+    def test_list_only_the_users_goals(self, client):
+        response = client.get("/api/users/1/goals")
+        assert response.status_code == 200
+        assert [g["goal_name"] for g in response.json()] == ["Retirement"]
+
+    def test_create_get_update_delete(self, client):
+        created = client.post("/api/users/1/goals", json=NEW_GOAL)
+        assert created.status_code == 201
+        goal = created.json()
+        assert goal["id"] == 3 and goal["user_id"] == 1 and goal["created_at"]
+
+        assert client.get(f"/api/users/1/goals/{goal['id']}").json()["goal_name"] == "House"
+
+        updated = client.put(f"/api/users/1/goals/{goal['id']}", json={**NEW_GOAL, "target_amount": 90000.0})
+        assert updated.status_code == 200
+        assert updated.json()["target_amount"] == 90000.0
+        assert updated.json()["created_at"] == goal["created_at"]
+
+        assert client.delete(f"/api/users/1/goals/{goal['id']}").status_code == 204
+        assert client.get(f"/api/users/1/goals/{goal['id']}").status_code == 404
+        assert [g["id"] for g in FileStorage._read_json(storage.GOALS_FILE)] == [1, 2]
+
+    def test_other_users_goal_is_not_found(self, client):
+        assert client.get("/api/users/1/goals/2").status_code == 404
+        assert client.put("/api/users/1/goals/2", json=NEW_GOAL).status_code == 404
+        assert client.delete("/api/users/1/goals/2").status_code == 404
+
+    def test_unknown_user(self, client):
+        assert client.get("/api/users/99/goals").status_code == 404
+        assert client.post("/api/users/99/goals", json=NEW_GOAL).status_code == 404
+
+
+class TestStoredGoalAnalysis:
+    """Tests for analysis endpoints given only a user id"""
+
+    def test_analyze_uses_stored_goals(self, client):
+        response = client.post("/api/portfolio/analyze", json={"user_id": 1})
+        assert response.status_code == 200
+        breakdown = response.json()["goal_allocation_breakdown"]
+        assert [b["goal_name"] for b in breakdown] == ["Retirement"]
+
+    def test_analyze_not_modified_until_goals_change(self, client):
+        first = client.post("/api/portfolio/analyze", json={"user_id": 1})
+        etag = first.headers["ETag"]
+
+        again = client.post("/api/portfolio/analyze", json={"user_id": 1}, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+
+        other_horizon = client.post("/api/portfolio/analyze", json={"user_id": 1, "time_horizon": 20},
+                                    headers={"If-None-Match": etag})
+        assert other_horizon.status_code == 200
+
+        client.post("/api/users/1/goals", json=NEW_GOAL)
+        changed = client.post("/api/portfolio/analyze", json={"user_id": 1}, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert len(changed.json()["goal_allocation_breakdown"]) == 2
+
+    def test_inline_goals_are_not_tagged(self, client):
+        goals = [{"user_id": 1, **NEW_GOAL}]
+        response = client.post("/api/portfolio/analyze", json={"user_id": 1, "goals": goals})
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+
+    def test_feasibility_uses_stored_goals(self, client):
+        body = {"user_id": 1, "allocation": {"stocks": 60, "bonds": 30, "cash": 10}}
+        response = client.post("/api/portfolio/feasibility", json=body)
+        assert response.status_code == 200
+        assert [g["goal_name"] for g in response.json()["goal_feasibility"]] == ["Retirement"]
+        assert client.post("/api/portfolio/feasibility", json=body,
+                           headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    def test_repeat_requests_hit_the_cache(self, client):
+        for _ in range(3):
+            client.post("/api/portfolio/analyze", json={"user_id": 1})
+        stats = client.get("/api/stats/goal-cache").json()
+        assert stats["goals"]["misses"] == 1 and stats["goals"]["hits"] == 2
+        assert stats["analysis"]["misses"] == 1 and stats["analysis"]["hits"] == 2
+
+    def test_dashboard_shares_the_caches(self, client):
+        analysis = client.post("/api/portfolio/analyze", json={"user_id": 1}).json()
+        dashboard = client.get("/api/dashboard/1").json()
+        assert dashboard["analysis"] == analysis
+        assert [g["goal_name"] for g in dashboard["goals"]] == ["Retirement"]
+        stats = client.get("/api/stats/goal-cache").json()
+        assert stats["goals"]["hits"] == 1 and stats["analysis"]["hits"] == 1
+
+        client.post("/api/users/1/goals", json=NEW_GOAL)
+        assert len(client.get("/api/dashboard/1").json()["analysis"]["goal_allocation_breakdown"]) == 2
+
+    def test_plan_job_snapshots_stored_goals(self, client):
+        response = client.post("/api/plan/jobs", json={"user_id": 1})
+        assert response.status_code == 202
+        stored = get_services().job_queue.get(response.json()["id"])
+        assert [g["goal_name"] for g in stored["payload"]["goals"]] == ["Retirement"]
+
+
+class TestGoalCache:
+    """Tests for GoalCache versioning and invalidation, and the AnalysisCache LRU"""
+
+    @staticmethod
+    def loader(records):
+        from models import FinancialGoal
+        return lambda user_id: [FinancialGoal(**r) for r in records if r["user_id"] == user_id]
+
+    def test_version_follows_content(self):
+        records = [{"id": 1, "user_id": 1, **NEW_GOAL}]
+        cache = GoalCache(signature=None)
+        stored = cache.get(1, self.loader(records))
+        assert stored.goals[0].goal_name == "House"
+        assert stored.records[0].id == 1
+        assert cache.get(1, self.loader([])) == stored
+
+        cache.invalidate(1)
+        records[0]["target_amount"] = 1.0
+        assert cache.get(1, self.loader(records)).version != stored.version
+
+    def test_file_change_clears_every_user(self):
+        signature = [1]
+        cache = GoalCache(signature=lambda: signature[0])
+        cache.get(1, self.loader([]))
+        cache.get(2, self.loader([]))
+        assert len(cache) == 2
+        signature[0] = 2
+        cache.get(1, self.loader([]))
+        assert len(cache) == 1 and cache.misses == 3
+
+    def test_bounded(self):
+        cache = GoalCache(max_users=2, signature=None)
+        for user_id in range(5):
+            cache.get(user_id, self.loader([]))
+        assert len(cache) == 2
+
+    def test_analysis_cache_computes_once_per_key(self):
+        cache = AnalysisCache(max_entries=2)
+        calls = []
+        for key in ("a", "a", "b", "c", "a"):
+            cache.get_or_compute(key, lambda: calls.append(key) or key)
+        assert calls == ["a", "b", "c", "a"]
+        assert len(cache) == 2
@@ -0,0 +1,120 @@
+"""
+Unit tests for ETag / conditional request support on user and portfolio resources
+"""
+import pytest
+from unittest.mock import Mock
+from starlette.testclient import TestClient
+
+from main import app, get_db
+from models import User, Portfolio
+from http_cache import compute_etag, etag_matches, etag_matches_none
+
+
+class TestETagHelpers:
+    """Tests for ETag computation and matching"""
+
+    def test_etag_is_stable(self, sample_user_data):
+        assert compute_etag(User.from_dict(sample_user_data)) == compute_etag(User.from_dict(sample_user_data))
+
+    def test_etag_changes_with_content_and_updated_at(self, sample_user_data):
+        etag = compute_etag(User.from_dict(sample_user_data))
+        assert compute_etag(User.from_dict({**sample_user_data, "age": 31})) != etag
+        assert compute_etag(User.from_dict({**sample_user_data, "updated_at": "2024-02-01T00:00:00"})) != etag
+
+    def test_if_none_match(self):
+        assert etag_matches_none('"a", "b"', '"b"')
+        assert etag_matches_none('W/"b"', '"b"')
+        assert etag_matches_none("*", '"b"')
+        assert not etag_matches_none('"a"', '"b"')
+        assert not etag_matches_none(None, '"b"')
+
+    def test_if_match(self):
+        assert etag_matches(None, None)
+        assert etag_matches('"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('W/"b"', '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches("*", None)
+
+
+@pytest.fixture
+def db():
+    db = Mock()
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def portfolio():
+    return Portfolio(id=1, user_id=1, allocation={"stocks": 60, "bonds": 30, "cash": 10},
+                     updated_at="2024-01-01T00:00:00")
+
+
+class TestConditionalGet:
+    """Tests for If-None-Match on GET endpoints"""
+
+    def test_user_etag_and_304(self, client, db, sample_user):
+        db.get_user.return_value = sample_user
+        first = client.get("/api/users/1")
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        etag = first.headers["ETag"]
+
+        second = client.get("/api/users/1", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_portfolio_stale_etag_returns_body(self, client, db, portfolio):
+        db.get_portfolio_by_user_id.return_value = portfolio
+        response = client.get("/api/portfolio/1", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+        assert response.json()["allocation"]["stocks"] == 60
+        assert response.headers["ETag"] == compute_etag(portfolio)
+
+
+class TestConditionalPut:
+    """Tests for If-Match optimistic concurrency on PUT endpoints"""
+
+    @pytest.fixture
+    def user_update(self):
+        return {"name": "Test User", "age": 31, "current_income": 75000.0,
+                "current_savings": 50000.0, "risk_profile": "moderate"}
+
+    def test_user_put_with_current_etag(self, client, db, sample_user, sample_user_data, user_update):
+        db.get_user.return_value = sample_user
+        db.update_user.return_value = User.from_dict({**sample_user_data, "age": 31, "updated_at": "2024-02-01"})
+
+        response = client.put("/api/users/1", json=user_update, headers={"If-Match": compute_etag(sample_user)})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] == compute_etag(db.update_user.return_value)
+
+    def test_user_put_with_stale_etag(self, client, db, sample_user, user_update):
+        db.get_user.return_value = sample_user
+        response = client.put("/api/users/1", json=user_update, headers={"If-Match": '"stale"'})
+        assert response.status_code == 412
+        db.update_user.assert_not_called()
+
+    def test_portfolio_put_with_stale_etag(self, client, db, portfolio):
+        db.get_portfolio_by_user_id.return_value = portfolio
+        response = client.put(
+            "/api/portfolio/1",
+            json={"allocation": {"stocks": 50, "bonds": 40, "cash": 10}},
+            headers={"If-Match": '"stale"'},
+        )
+        assert response.status_code == 412
+        db.update_portfolio.assert_not_called()
+
+    def test_portfolio_put_without_precondition(self, client, db, portfolio):
+        db.update_portfolio.return_value = portfolio
+        response = client.put("/api/portfolio/1", json={"allocation": {"stocks": 60, "bonds": 30, "cash": 10}})
+        assert response.status_code == 200
+        assert response.headers["ETag"] == compute_etag(portfolio)
+        db.get_portfolio_by_user_id.assert_not_called()
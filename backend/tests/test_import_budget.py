@@ -0,0 +1,46 @@
+"""
+Cold start tests: app import stays within budget and heavy SDKs load lazily
+"""
+import subprocess
+import sys
+
+from starlette.testclient import TestClient
+
+from benchmarks.bench_import import BACKEND_DIR, import_budget, measure
+from main import app
+
+
+class TestImportBudget:
+    """Tests run against a fresh interpreter so earlier imports do not hide costs"""
+
+    def test_app_import_within_budget(self):
+        total, packages, _ = measure("main")
+        slowest = ", ".join(f"{name} {sec * 1000:.0f}ms" for name, sec in packages[:5])
+        assert total <= import_budget(), f"import main took {total:.2f}s; slowest: {slowest}"
+
+    def test_openai_not_imported_at_startup(self):
+        _, _, loaded = measure("main")
+        assert "openai" not in loaded
+
+    def test_retryable_errors_import_openai_on_first_use(self):
+        code = (
+            "import sys, main\n"
+            "assert 'openai' not in sys.modules, 'openai imported by main'\n"
+            "from services.llm_client import retryable_errors\n"
+            "errors = retryable_errors()\n"
+            "assert 'openai' in sys.modules, 'openai not imported on first use'\n"
+            "assert sys.modules['openai'].RateLimitError in errors\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+
+class TestStartupEndpoint:
+    """Tests for /api/health/startup"""
+
+    def test_report(self):
+        with TestClient(app) as client:
+            body = client.get("/api/health/startup").json()
+        assert body["import_seconds"] > 0
+        assert body["ready"] is True
+        assert set(body["lazy_modules_loaded"]) >= {"openai", "torch"}
@@ -0,0 +1,59 @@
+"""
+Unit tests for the seeded synthetic dataset generator in init_data.py
+"""
+import json
+from datetime import date
+
+from auth import verify_password
+from init_data import MAX_GOALS, generate, main
+from storage import FileStorage
+
+FIXED = {"seed": 7, "created_at": "2025-01-01T00:00:00", "today": date(2025, 1, 1)}
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestGenerate:
+    """Tests for determinism, shape and output formats"""
+
+    def test_storage_layout_readable_by_file_storage(self, tmp_path):
+        counts = generate(50, tmp_path, shard_size=16, **FIXED)
+        users = FileStorage._read_json(tmp_path / "users.json")
+        portfolios = list(FileStorage._iter_json(tmp_path / "portfolios.json"))
+        goals = FileStorage._read_json(tmp_path / "goals.json")
+
+        assert counts == {"users": 50, "portfolios": 50, "goals": len(goals)}
+        assert [u["id"] for u in users] == list(range(1, 51))
+        assert len({u["email"] for u in users}) == 50
+        assert [p["user_id"] for p in portfolios] == list(range(1, 51))
+        assert all(sum(p["allocation"].values()) == 100 for p in portfolios)
+        assert len({g["id"] for g in goals}) == len(goals)
+        per_user = [sum(g["user_id"] == u["id"] for g in goals) for u in users]
+        assert max(per_user) <= MAX_GOALS
+        assert {u["risk_profile"] for u in users} <= {"conservative", "moderate", "aggressive"}
+        assert all(18 <= u["age"] <= 80 and u["current_income"] > 0 for u in users)
+
+    def test_same_seed_same_data_regardless_of_sharding(self, tmp_path):
+        generate(40, tmp_path / "a", fmt="ndjson", shard_size=40, **FIXED)
+        generate(40, tmp_path / "b", fmt="ndjson", shard_size=7, workers=3, **FIXED)
+        for name in ("users.ndjson", "portfolios.ndjson", "goals.ndjson"):
+            assert (tmp_path / "a" / name).read_text() == (tmp_path / "b" / name).read_text()
+
+    def test_different_seed_different_data(self, tmp_path):
+        generate(10, tmp_path / "a", fmt="ndjson", **FIXED)
+        generate(10, tmp_path / "b", fmt="ndjson", **{**FIXED, "seed": 8})
+        assert read_lines(tmp_path / "a" / "users.ndjson") != read_lines(tmp_path / "b" / "users.ndjson")
+
+    def test_password_hashes(self, tmp_path):
+        generate(3, tmp_path, fmt="ndjson", password="pw", hash_rounds=4, unique_salts=True, **FIXED)
+        users = read_lines(tmp_path / "users.ndjson")
+        assert len({u["password_hash"] for u in users}) == 3
+        assert all(verify_password("pw", u["password_hash"]) for u in users)
+        assert users[0]["password_hash"].startswith("$2b$04$")
+
+    def test_cli_generates_without_touching_samples(self, tmp_path, capsys):
+        main(["--users", "5", "--out", str(tmp_path), "--workers", "1"])
+        assert len(FileStorage._read_json(tmp_path / "users.json")) == 5
+        assert "Generated 5 users" in capsys.readouterr().out
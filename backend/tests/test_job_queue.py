@@ -0,0 +1,240 @@
+"""
+Tests for the background plan job queue and its submit/poll API
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from starlette.testclient import TestClient
+
+from main import app, get_db
+from services.container import get_services, shutdown_services
+from services.job_queue import JobQueue, JobStore, QueueFullError, FAILED, QUEUED, SUCCEEDED
+
+PAYLOAD = {"user_id": 1, "goals": []}
+
+
+async def wait_for_status(queue, job_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if queue.get(job_id)["status"] == status:
+            return queue.get(job_id)
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+class TestJobQueue:
+    """Tests for JobQueue scheduling, dedup and persistence"""
+
+    async def test_job_runs_and_stores_result(self, tmp_path):
+        """Test that a submitted job is executed and its result persisted"""
+        async def runner(job):
+            return f"plan for {job['user_id']}"
+
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner, workers=1)
+        await queue.start()
+        job, created = queue.submit(1, PAYLOAD)
+        assert created and job["status"] == QUEUED
+        done = await wait_for_status(queue, job["id"], SUCCEEDED)
+        assert done["result"] == "plan for 1"
+        await queue.stop()
+
+        assert JobStore(tmp_path / "jobs.jsonl").get(job["id"])["status"] == SUCCEEDED
+
+    async def test_failures_are_recorded(self, tmp_path):
+        """Test that runner exceptions mark the job failed"""
+        async def runner(job):
+            raise LookupError("User not found")
+
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner, workers=1)
+        await queue.start()
+        job, _ = queue.submit(1, PAYLOAD)
+        failed = await wait_for_status(queue, job["id"], FAILED)
+        assert failed["error"] == "User not found"
+        await queue.stop()
+
+    async def test_priority_lanes(self, tmp_path):
+        """Test that high priority jobs run before earlier low priority ones"""
+        order = []
+
+        async def runner(job):
+            order.append(job["priority"])
+            return "ok"
+
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner, workers=1)
+        # Submit before starting so all jobs compete for the single worker
+        for user_id, priority in ((1, "low"), (2, "normal"), (3, "high")):
+            queue.submit(user_id, {**PAYLOAD, "user_id": user_id}, priority)
+        await queue.start()
+        await asyncio.sleep(0.1)
+        assert order == ["high", "normal", "low"]
+        await queue.stop()
+
+    async def test_per_user_dedup(self, tmp_path):
+        """Test that identical active submits return the same job"""
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner=None)
+        first, created_first = queue.submit(1, PAYLOAD)
+        second, created_second = queue.submit(1, PAYLOAD)
+        other, created_other = queue.submit(2, {**PAYLOAD, "user_id": 2})
+        assert created_first and not created_second and created_other
+        assert first["id"] == second["id"] != other["id"]
+
+    def test_invalid_priority(self, tmp_path):
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner=None)
+        with pytest.raises(ValueError):
+            queue.submit(1, PAYLOAD, "urgent")
+
+    async def test_bounded_pending(self, tmp_path):
+        """Test that submits beyond max_pending are rejected"""
+        async def runner(job):
+            await asyncio.sleep(10)
+
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner, workers=1, max_pending=1)
+        await queue.start()
+        queue.submit(1, PAYLOAD)
+        await asyncio.sleep(0.05)            # picked up by the worker
+        queue.submit(2, {**PAYLOAD, "user_id": 2})
+        with pytest.raises(QueueFullError):
+            queue.submit(3, {**PAYLOAD, "user_id": 3})
+        await queue.stop()
+
+    async def test_submit_from_another_thread(self, tmp_path):
+        """Test that jobs submitted from a threadpool thread are picked up by the loop's workers"""
+        async def runner(job):
+            return "from thread"
+
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner, workers=1)
+        await queue.start()
+        job, _ = await asyncio.to_thread(queue.submit, 1, PAYLOAD)
+        assert (await wait_for_status(queue, job["id"], SUCCEEDED))["result"] == "from thread"
+        await queue.stop()
+
+    def test_identical_submits_from_threads_share_one_job(self, tmp_path):
+        """Test that simultaneous duplicate submits (a double click) create a single job"""
+        queue = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner=None)
+        barrier = threading.Barrier(8)
+
+        def submit():
+            barrier.wait()
+            return queue.submit(1, PAYLOAD)
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: submit(), range(8)))
+        assert sum(created for _, created in results) == 1
+        assert len({job["id"] for job, _ in results}) == 1
+
+    def test_state_changes_are_appended(self, tmp_path):
+        """Test that a save appends one line rather than rewriting the stored jobs"""
+        path = tmp_path / "jobs.jsonl"
+        store = JobStore(path)
+        first, _ = JobQueue(store, runner=None).submit(1, PAYLOAD)
+        size = path.stat().st_size
+        store.save({**first, "status": SUCCEEDED, "result": "x" * 1000})
+
+        with open(path) as f:
+            f.seek(size)
+            assert json.loads(f.read())["status"] == SUCCEEDED
+        assert JobStore(path).get(first["id"])["result"] == "x" * 1000
+
+    def test_log_is_compacted(self, tmp_path):
+        path = tmp_path / "jobs.jsonl"
+        store = JobStore(path)
+        job, _ = JobQueue(store, runner=None).submit(1, PAYLOAD)
+        for i in range(50):
+            store.save({**job, "result": str(i)})
+        assert len(path.read_text().splitlines()) <= JobStore.COMPACT_FACTOR + 1
+        assert JobStore(path).get(job["id"])["result"] == "49"
+
+    def test_torn_last_line_skipped(self, tmp_path):
+        path = tmp_path / "jobs.jsonl"
+        job, _ = JobQueue(JobStore(path), runner=None).submit(1, PAYLOAD)
+        with open(path, "a") as f:
+            f.write('{"id": "half-writ')
+        assert [j["id"] for j in JobStore(path).all()] == [job["id"]]
+
+    def test_json_array_file_converted(self, tmp_path):
+        """Test that a jobs file written by earlier versions is loaded and rewritten as a log"""
+        path = tmp_path / "jobs.json"
+        job, _ = JobQueue(JobStore(tmp_path / "jobs.jsonl"), runner=None).submit(1, PAYLOAD)
+        path.write_text(json.dumps([job]))
+
+        store = JobStore(path)
+        assert store.get(job["id"])["status"] == QUEUED
+        store.save({**job, "status": SUCCEEDED})
+        assert JobStore(path).get(job["id"])["status"] == SUCCEEDED
+
+    def test_failed_compaction_keeps_previous_log(self, tmp_path, monkeypatch):
+        """Test that a compaction interrupted mid-way leaves the stored jobs intact"""
+        path = tmp_path / "jobs.jsonl"
+        store = JobStore(path)
+        job, _ = JobQueue(store, runner=None).submit(1, PAYLOAD)
+        before = path.read_text()
+
+        def broken_replace(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr("services.job_queue.os.replace", broken_replace)
+        with pytest.raises(OSError):
+            store._compact()
+        monkeypatch.undo()
+
+        assert path.read_text() == before
+        assert list(tmp_path.iterdir()) == [path]
+
+    async def test_jobs_survive_restart(self, tmp_path):
+        """Test that queued jobs are picked up by a new process"""
+        path = tmp_path / "jobs.jsonl"
+        job, _ = JobQueue(JobStore(path), runner=None).submit(1, PAYLOAD)
+
+        async def runner(job):
+            return "recovered"
+
+        queue = JobQueue(JobStore(path), runner, workers=1)
+        await queue.start()
+        assert (await wait_for_status(queue, job["id"], SUCCEEDED))["result"] == "recovered"
+        await queue.stop()
+
+
+class TestPlanJobEndpoints:
+    """Tests for /api/plan/jobs"""
+
+    @pytest.fixture
+    def client(self, sample_user):
+        shutdown_services()
+        db = Mock()
+        db.get_user.return_value = sample_user
+        app.dependency_overrides[get_db] = lambda: db
+        with TestClient(app) as client:
+            async def runner(job):
+                return "Background plan"
+            get_services().job_queue.runner = runner
+            yield client, db
+        app.dependency_overrides.clear()
+        shutdown_services()
+
+    def test_submit_and_poll(self, client):
+        """Test that a job id is returned immediately and the result can be polled"""
+        client, _ = client
+        response = client.post("/api/plan/jobs", json={**PAYLOAD, "priority": "high"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        for _ in range(100):
+            job = client.get(f"/api/plan/jobs/{job_id}").json()
+            if job["status"] == SUCCEEDED:
+                break
+            time.sleep(0.01)
+        assert job["result"] == "Background plan"
+
+    def test_unknown_job(self, client):
+        client, _ = client
+        assert client.get("/api/plan/jobs/missing").status_code == 404
+
+    def test_unknown_user(self, client):
+        client, db = client
+        db.get_user.return_value = None
+        assert client.post("/api/plan/jobs", json=PAYLOAD).status_code == 404
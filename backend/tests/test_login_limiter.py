@@ -0,0 +1,149 @@
+"""
+Unit tests for login admission control (per-IP / per-email token buckets)
+"""
+import asyncio
+
+import pytest
+from unittest.mock import Mock, patch
+from starlette.testclient import TestClient
+
+from main import app, get_db
+from services.container import build_login_limiter, get_services, shutdown_services
+from services.rate_limiter import KeyedRateLimiter, LoginRateLimiter, SqliteKeyedRateLimiter
+
+
+class TestKeyedRateLimiter:
+    """Tests for the in-memory keyed token buckets"""
+
+    def test_burst_then_reject(self):
+        limiter = KeyedRateLimiter(rate=3, period=60)
+        assert [limiter.hit("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+        wait = limiter.hit("a")
+        assert 19 < wait <= 20
+        assert limiter.rejected == 1
+
+    def test_keys_are_independent(self):
+        limiter = KeyedRateLimiter(rate=1, period=60)
+        assert limiter.hit("a") == 0.0
+        assert limiter.hit("b") == 0.0
+        assert limiter.hit("a") > 0
+
+    def test_refill(self):
+        limiter = KeyedRateLimiter(rate=1, period=60)
+        with patch("services.rate_limiter.time.monotonic", side_effect=[0.0, 1.0, 61.0]):
+            assert limiter.hit("a") == 0.0
+            assert limiter.hit("a") > 0
+            assert limiter.hit("a") == 0.0
+
+    def test_lru_bound(self):
+        limiter = KeyedRateLimiter(rate=1, max_keys=100)
+        for i in range(1000):
+            limiter.hit(f"ip-{i}")
+        assert len(limiter) == 100
+
+
+class TestSqliteKeyedRateLimiter:
+    """Tests for buckets shared through a SQLite file"""
+
+    def test_state_shared_between_instances(self, tmp_path):
+        path = tmp_path / "limits.db"
+        first = SqliteKeyedRateLimiter(path, "ip", rate=2)
+        second = SqliteKeyedRateLimiter(path, "ip", rate=2)
+        try:
+            assert first.hit("a") == 0.0
+            assert second.hit("a") == 0.0
+            assert first.hit("a") > 0
+            # Scopes do not share buckets
+            assert SqliteKeyedRateLimiter(path, "email", rate=2).hit("a") == 0.0
+        finally:
+            first.close()
+            second.close()
+
+    def test_prune_bounds_rows(self, tmp_path):
+        limiter = SqliteKeyedRateLimiter(tmp_path / "limits.db", "ip", rate=1, max_keys=10)
+        limiter.PRUNE_EVERY = 50
+        for i in range(200):
+            limiter.hit(f"ip-{i}")
+        assert len(limiter) <= 10 + limiter.PRUNE_EVERY
+        limiter.close()
+
+
+class TestLoginRateLimiter:
+    """Tests for combining the per-IP and per-email limits"""
+
+    def test_email_limit_across_ips(self):
+        limiter = LoginRateLimiter(KeyedRateLimiter(100), KeyedRateLimiter(2))
+        assert limiter.check("1.1.1.1", "a@example.com") == 0.0
+        assert limiter.check("2.2.2.2", "A@Example.com ") == 0.0
+        assert limiter.check("3.3.3.3", "a@example.com") > 0
+        assert limiter.check("3.3.3.3", "b@example.com") == 0.0
+
+    def test_emails_not_stored_in_clear(self):
+        limiter = LoginRateLimiter(KeyedRateLimiter(100), KeyedRateLimiter(2))
+        limiter.check("1.1.1.1", "a@example.com")
+        assert all("@" not in key for key in limiter.per_email._buckets)
+
+    def test_disabled_by_env(self, monkeypatch):
+        monkeypatch.setenv("LOGIN_RATE_ENABLED", "false")
+        assert build_login_limiter() is None
+
+
+class TestLoginAdmission:
+    """Tests that over-limit attempts get 429 before any hashing"""
+
+    @pytest.fixture
+    def client(self, sample_user):
+        shutdown_services()
+        services = get_services()
+        services.login_limiter = LoginRateLimiter(KeyedRateLimiter(100), KeyedRateLimiter(2))
+        db = Mock()
+        db.get_user_by_email.return_value = sample_user
+        app.dependency_overrides[get_db] = lambda: db
+        yield TestClient(app), db
+        app.dependency_overrides.clear()
+        shutdown_services()
+
+    def test_login_rejected_before_hashing(self, client):
+        test_client, db = client
+        body = {"email": "test@example.com", "password": "wrong-password"}
+        assert test_client.post("/api/auth/login", json=body).status_code == 401
+        assert test_client.post("/api/auth/login", json=body).status_code == 401
+        db.reset_mock()
+
+        with patch("main.verify_password_async") as verify:
+            response = test_client.post("/api/auth/login", json=body)
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        verify.assert_not_called()
+        db.get_user_by_email.assert_not_called()
+
+    def test_shared_limiter_checked_off_the_event_loop(self, client, tmp_path):
+        """Test that SQLite buckets (busy timeout up to 5s) are not hit on the loop thread"""
+        test_client, _ = client
+        on_loop = []
+        per_ip = SqliteKeyedRateLimiter(tmp_path / "limits.db", "ip", rate=100)
+        per_email = SqliteKeyedRateLimiter(tmp_path / "limits.db", "email", rate=2)
+        hit = per_ip.hit
+
+        def recording_hit(key, amount=1.0):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return hit(key, amount)
+
+        per_ip.hit = recording_hit
+        get_services().login_limiter = LoginRateLimiter(per_ip, per_email)
+
+        body = {"email": "test@example.com", "password": "wrong-password"}
+        assert test_client.post("/api/auth/login", json=body).status_code == 401
+        assert on_loop == [False]
+
+    def test_stats_endpoint(self, client):
+        test_client, _ = client
+        test_client.post("/api/auth/login", json={"email": "x@example.com", "password": "p"})
+        stats = test_client.get("/api/stats/login-limiter").json()
+        assert stats["enabled"] is True
+        assert stats["ip_keys"] == 1
@@ -5,7 +5,8 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from main import app, get_db
 from models import User
-from auth import hash_password, verify_password
+import auth
+from auth import hash_password, verify_password, hash_cost
 
 
 @pytest.fixture
@@ -50,6 +51,35 @@ class TestLoginEndpoint:
         assert "password_hash" not in data  # Password hash should not be in response
         assert "password" not in data  # Password should not be in response
     
+    def test_login_upgrades_hash_cost(self, client, mock_db, sample_user, monkeypatch):
+        """Test that a successful login rehashes with the configured work factor"""
+        monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+        mock_db.get_user_by_email.return_value = sample_user
+        
+        response = client.post(
+            "/api/auth/login",
+            json={"email": "test@example.com", "password": "testpassword123"}
+        )
+        
+        assert response.status_code == 200
+        mock_db.update_user.assert_called_once()
+        user_id, updated = mock_db.update_user.call_args[0]
+        assert user_id == 1
+        assert hash_cost(updated.password_hash) == 4
+        assert verify_password("testpassword123", updated.password_hash) is True
+    
+    def test_login_keeps_current_hash(self, client, mock_db, sample_user):
+        """Test that hashes at the configured cost are not rewritten"""
+        mock_db.get_user_by_email.return_value = sample_user
+        
+        response = client.post(
+            "/api/auth/login",
+            json={"email": "test@example.com", "password": "testpassword123"}
+        )
+        
+        assert response.status_code == 200
+        mock_db.update_user.assert_not_called()
+    
     def test_login_invalid_email(self, client, mock_db):
         """Test login with non-existent email"""
         mock_db.get_user_by_email.return_value = None
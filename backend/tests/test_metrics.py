@@ -0,0 +1,123 @@
+"""
+Unit tests for the metrics registry and the /metrics endpoint
+"""
+import threading
+
+import pytest
+from unittest.mock import Mock
+from starlette.testclient import TestClient
+
+import metrics
+from auth import hash_password
+from main import app, get_db
+from metrics import Registry
+from storage import FileStorage
+
+
+def sample(registry_text: str, series: str) -> float:
+    """Value of one exposition line, e.g. sample(text, 'x_total{a="b"}')"""
+    for line in registry_text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not found")
+
+
+class TestRegistry:
+    """Tests for counters, gauges and histograms"""
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests", ["route"])
+        in_flight = registry.gauge("in_flight", "In flight")
+        requests.labels("/a").inc()
+        requests.labels("/a").inc(2)
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert sample(text, 'requests_total{route="/a"}') == 3
+        assert sample(text, "in_flight") == 1
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.observe(value)
+
+        text = registry.render()
+        assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 1
+        assert sample(text, 'latency_seconds_bucket{le="1.0"}') == 3
+        assert sample(text, 'latency_seconds_bucket{le="+Inf"}') == 4
+        assert sample(text, "latency_seconds_count") == 4
+        assert sample(text, "latency_seconds_sum") == pytest.approx(6.05)
+
+    def test_label_values_escaped(self):
+        registry = Registry()
+        registry.counter("c_total", "C", ["v"]).labels('a"b\\c\nd').inc()
+        assert 'c_total{v="a\\"b\\\\c\\nd"} 1.0' in registry.render()
+
+    def test_wrong_label_count_rejected(self):
+        with pytest.raises(ValueError):
+            Registry().counter("c_total", "C", ["a", "b"]).labels("only-one")
+
+    def test_reregistering_returns_same_metric(self):
+        registry = Registry()
+        assert registry.counter("c_total", "C") is registry.counter("c_total", "C")
+        with pytest.raises(ValueError):
+            registry.gauge("c_total", "C")
+
+    def test_concurrent_increments_are_not_lost(self):
+        counter = Registry().counter("c_total", "C")
+
+        def work():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert counter.labels().value == 80000
+
+
+class TestInstrumentation:
+    """Tests that storage, bcrypt and HTTP requests are recorded"""
+
+    def test_storage_timers_and_bytes(self, tmp_path):
+        path = tmp_path / "things.json"
+        FileStorage._write_json(path, [{"id": 1}])
+        assert FileStorage._read_json(path) == [{"id": 1}]
+
+        text = metrics.REGISTRY.render()
+        size = path.stat().st_size
+        assert sample(text, 'storage_io_bytes_total{op="write",file="things.json"}') >= size
+        assert sample(text, 'storage_io_bytes_total{op="read",file="things.json"}') >= size
+        assert sample(text, 'storage_io_seconds_count{op="read",file="things.json"}') >= 1
+
+    def test_bcrypt_timer(self):
+        before = metrics.BCRYPT_SECONDS.labels("hash").snapshot()[0]
+        hash_password("pw", rounds=4)
+        assert sum(metrics.BCRYPT_SECONDS.labels("hash").snapshot()[0]) == sum(before) + 1
+
+    def test_metrics_endpoint_labels_by_route_template(self, sample_user):
+        db = Mock()
+        db.get_user.return_value = sample_user
+        app.dependency_overrides[get_db] = lambda: db
+        try:
+            client = TestClient(app)
+            client.get("/api/users/1")
+            client.get("/api/users/2")
+            response = client.get("/metrics")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert sample(text, 'http_requests_total{method="GET",route="/api/users/{user_id}",status="200"}') >= 2
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/users/{user_id}",le="+Inf"}' in text
+        assert "/api/users/1" not in text
+        assert "# TYPE plan_jobs gauge" in text
@@ -0,0 +1,157 @@
+"""
+Tests for rate-limit-aware bulk plan generation against a limiting LLM stub
+"""
+import asyncio
+import time
+
+import pytest
+
+from llm_stub import LLMStubServer
+from plan_batch import BulkPlanRunner, Checkpoint, _in_order, iter_work, ordered_by
+from services.llm_client import LLMClient
+from services.plan_cache import PlanCache
+from services.plan_service import PlanService
+from services.rate_limiter import AdaptiveConcurrency, AsyncTokenBucket
+
+
+def client_book(n):
+    users = [{
+        "id": i, "name": f"Client {i}", "email": f"c{i}@example.com", "age": 30 + i % 30,
+        "current_income": 50000.0 + i, "current_savings": 10000.0, "risk_profile": "moderate",
+    } for i in range(1, n + 1)]
+    portfolios = [{"id": i, "user_id": i, "allocation": {"stocks": 60, "bonds": 30, "cash": 10}}
+                  for i in range(1, n + 1)]
+    goals = [{"id": i, "user_id": i, "goal_name": "Retirement", "target_amount": 500000.0,
+              "target_date": "2050-01-01", "priority": "high"} for i in range(1, n + 1)]
+    return users, portfolios, goals
+
+
+class TestRateLimiters:
+    """Tests for AsyncTokenBucket and AdaptiveConcurrency"""
+
+    async def test_token_bucket_enforces_rate(self):
+        """Test that acquiring beyond the burst waits for refill"""
+        bucket = AsyncTokenBucket(rate=20, period=1.0)
+        start = time.monotonic()
+        for _ in range(30):
+            await bucket.acquire()
+        assert time.monotonic() - start >= 0.45
+
+    def test_aimd(self):
+        """Test multiplicative decrease and additive increase"""
+        limiter = AdaptiveConcurrency(initial=8, maximum=16)
+        limiter.on_throttle()
+        assert limiter.limit == 4
+        for _ in range(4):
+            limiter.on_success()
+        assert limiter.limit == 5
+
+    async def test_concurrency_limit_blocks(self):
+        limiter = AdaptiveConcurrency(initial=1)
+        await limiter.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(), timeout=0.05)
+        await limiter.release()
+        await asyncio.wait_for(limiter.acquire(), timeout=0.05)
+
+
+class TestBulkPlanRunner:
+    """End-to-end batch runs against a stub that enforces limits"""
+
+    @pytest.fixture
+    def setup(self, tmp_path):
+        stub = LLMStubServer(rpm_limit=5, limit_window=0.5, reply="Quarterly plan").start()
+        cache = PlanCache(tmp_path / "plans.db", template_version="test")
+        client = LLMClient(api_key="test-key", base_url=stub.url, max_retries=0)
+        service = PlanService(llm_client=client, cache=cache)
+        yield stub, cache, service, tmp_path / "batch.checkpoint"
+        cache.close()
+        stub.stop()
+
+    def make_runner(self, service, cache, checkpoint_path):
+        return BulkPlanRunner(
+            service, cache, Checkpoint(checkpoint_path),
+            requests_per_minute=15, tokens_per_minute=1_000_000,
+            max_concurrency=8, initial_concurrency=4, max_attempts=20, period=1.0,
+        )
+
+    async def test_generates_all_plans_under_limits(self, setup):
+        """Test that every plan is generated and throttling is absorbed"""
+        stub, cache, service, checkpoint_path = setup
+        runner = self.make_runner(service, cache, checkpoint_path)
+        stats = await runner.run(iter_work(*client_book(20)))
+        runner.checkpoint.close()
+        await service.llm.aclose()
+
+        assert stats["generated"] == 20
+        assert stats["failed"] == 0
+        assert stats["throttled"] == stub.throttled_count
+        assert len(cache) == 20
+
+    async def test_rerun_resumes_from_checkpoint(self, setup):
+        """Test that a rerun skips users finished by an earlier, partial run"""
+        stub, cache, service, checkpoint_path = setup
+        first = self.make_runner(service, cache, checkpoint_path)
+        await first.run(iter_work(*client_book(10)), limit=4)
+        first.checkpoint.close()
+        assert first.stats["generated"] == 4
+
+        second = self.make_runner(service, cache, checkpoint_path)
+        stats = await second.run(iter_work(*client_book(10)))
+        second.checkpoint.close()
+        await service.llm.aclose()
+
+        assert stats["resumed"] == 4
+        assert stats["generated"] == 6
+        assert stub.request_count - stub.throttled_count == 10
+
+    async def test_cached_plans_are_skipped(self, setup):
+        """Test that users whose plan is already cached cost no provider call"""
+        stub, cache, service, checkpoint_path = setup
+        users, portfolios, goals = client_book(3)
+        for user, portfolio, user_goals in iter_work(users, portfolios, goals):
+            cache.put(service.cache_key(service.prompt_for(user, portfolio, user_goals)), "old plan")
+
+        runner = self.make_runner(service, cache, checkpoint_path)
+        stats = await runner.run(iter_work(users, portfolios, goals))
+        runner.checkpoint.close()
+        await service.llm.aclose()
+        assert stats["cached"] == 3
+        assert stub.request_count == 0
+
+    def test_users_without_portfolio_skipped(self):
+        users, portfolios, goals = client_book(3)
+        work = list(iter_work(users, portfolios[:2], goals))
+        assert [user.id for user, _, _ in work] == [1, 2]
+
+    def test_join_streams_one_user_at_a_time(self):
+        """Test that the join reads only as far ahead as the current user"""
+        users, portfolios, goals = client_book(100)
+        goals.insert(1, {**goals[0], "id": 101, "goal_name": "House"})
+        read = []
+
+        def tracked(records):
+            for record in records:
+                read.append(record["user_id"])
+                yield record
+
+        work = iter_work(iter(users), tracked(portfolios), tracked(goals))
+        user, _, user_goals = next(work)
+        assert user.id == 1
+        assert [g.goal_name for g in user_goals] == ["Retirement", "House"]
+        assert max(read) <= 2
+
+    def test_out_of_order_input_rejected(self):
+        users, portfolios, goals = client_book(3)
+        with pytest.raises(ValueError, match="user_id"):
+            list(iter_work(users, portfolios, goals[::-1]))
+        assert ordered_by(goals) and not ordered_by(goals[::-1])
+        assert ordered_by(users, "id") and not ordered_by(users[::-1], "id")
+
+    def test_unordered_tables_sorted_before_the_run(self, caplog):
+        """Test that out-of-order files are detected and sorted up front, with a logged warning"""
+        users, portfolios, goals = client_book(3)
+        ordered = _in_order(lambda: iter(users[::-1]), "id", "users")
+        assert "not ordered" in caplog.text
+        work = list(iter_work(ordered, _in_order(lambda: iter(portfolios), "user_id", "portfolios"), goals))
+        assert [user.id for user, _, _ in work] == [1, 2, 3]
@@ -0,0 +1,128 @@
+"""
+Unit tests for the content-addressed plan summary cache
+"""
+import threading
+import time
+
+import pytest
+
+from llm_stub import LLMStubServer
+from services.llm_client import LLMClient
+from services.plan_cache import PlanCache
+from services.plan_service import PlanService, TEMPLATE_VERSION
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PlanCache(tmp_path / "plans.db", template_version="v1", max_entries=3)
+    yield cache
+    cache.close()
+
+
+class TestPlanCache:
+    """Tests for PlanCache storage, eviction and invalidation"""
+
+    def test_key_depends_on_all_inputs(self):
+        """Test that every key component changes the content address"""
+        base = PlanCache.make_key("v1", "gpt-4", 0.7, "prompt")
+        assert base == PlanCache.make_key("v1", "gpt-4", 0.7, "prompt")
+        assert base != PlanCache.make_key("v2", "gpt-4", 0.7, "prompt")
+        assert base != PlanCache.make_key("v1", "gpt-4o", 0.7, "prompt")
+        assert base != PlanCache.make_key("v1", "gpt-4", 0.2, "prompt")
+        assert base != PlanCache.make_key("v1", "gpt-4", 0.7, "prompt!")
+
+    def test_get_put_and_stats(self, cache):
+        """Test hits, misses and hit rate"""
+        assert cache.get("a") is None
+        cache.put("a", "plan A")
+        assert cache.get("a") == "plan A"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entry is evicted first"""
+        for key in ("a", "b", "c"):
+            cache.put(key, key)
+            time.sleep(0.01)
+        cache.get("a")
+        cache.put("d", "d")
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        assert len(cache) == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        """Test that expired entries are treated as misses"""
+        cache = PlanCache(tmp_path / "ttl.db", template_version="v1", ttl_seconds=0.05)
+        cache.put("a", "plan")
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        cache.close()
+
+    def test_persists_and_invalidates_on_template_change(self, tmp_path):
+        """Test that entries survive reopening but not a template change"""
+        path = tmp_path / "persist.db"
+        first = PlanCache(path, template_version="v1")
+        first.put("a", "plan")
+        first.close()
+
+        same = PlanCache(path, template_version="v1")
+        assert same.get("a") == "plan"
+        same.close()
+
+        changed = PlanCache(path, template_version="v2")
+        assert len(changed) == 0
+        changed.close()
+
+    def test_cached_lookup_is_fast(self, cache):
+        """Test that cache hits return in well under 5 ms"""
+        cache.put("a", "x" * 4000)
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get("a")
+        assert (time.perf_counter() - start) / 100 < 0.005
+
+
+class TestPlanServiceCaching:
+    """Tests for plan generation through the cache"""
+
+    async def test_identical_prompt_served_from_cache(self, cache, plan_inputs):
+        """Test that the second identical request does not reach the LLM"""
+        with LLMStubServer(reply="Cached plan") as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url)
+            service = PlanService(llm_client=client, cache=cache)
+            assert await service.generate_plan(*plan_inputs) == "Cached plan"
+            assert await service.generate_plan(*plan_inputs) == "Cached plan"
+            assert stub.request_count == 1
+            await client.aclose()
+
+    async def test_fallback_not_cached(self, cache, plan_inputs):
+        """Test that fallback plans are never written to the cache"""
+        with LLMStubServer(fail_first=10) as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url, max_retries=0)
+            service = PlanService(llm_client=client, cache=cache)
+            await service.generate_plan(*plan_inputs)
+            assert len(cache) == 0
+            await client.aclose()
+
+    async def test_cache_io_runs_off_the_event_loop(self, cache, plan_inputs):
+        """Test that SQLite cache reads and writes do not run on the loop thread"""
+        threads = []
+        get, put = cache.get, cache.put
+        cache.get = lambda key: threads.append(threading.get_ident()) or get(key)
+        cache.put = lambda key, value: threads.append(threading.get_ident()) or put(key, value)
+
+        with LLMStubServer(reply="Cached plan") as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url)
+            service = PlanService(llm_client=client, cache=cache)
+            await service.generate_plan(*plan_inputs)
+            assert "".join([c async for c in service.stream_plan(*plan_inputs)]) == "Cached plan"
+            await client.aclose()
+
+        assert len(threads) == 3
+        assert threading.get_ident() not in threads
+
+    def test_service_uses_template_version(self, plan_inputs):
+        """Test that cache keys include the plan template version"""
+        service = PlanService(llm_client=LLMClient(api_key="k"))
+        assert service.cache_key("p") == PlanCache.make_key(TEMPLATE_VERSION, "gpt-4", 0.7, "p")
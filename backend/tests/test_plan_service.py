@@ -0,0 +1,123 @@
+"""
+Tests for non-blocking plan generation against a local LLM stub server
+"""
+import asyncio
+import time
+
+import pytest
+
+from llm_stub import LLMStubServer
+from models import User
+from services.llm_client import LLMClient
+from services.plan_service import PlanService
+
+
+def make_service(stub: LLMStubServer, **kwargs) -> PlanService:
+    client = LLMClient(api_key="test-key", base_url=stub.url, backoff_base=0.01, **kwargs)
+    return PlanService(llm_client=client)
+
+
+class TestPlanGeneration:
+    """Tests for PlanService.generate_plan with the async client"""
+
+    async def test_returns_llm_completion(self, plan_inputs):
+        """Test that the stub completion is returned"""
+        with LLMStubServer(reply="Stub plan") as stub:
+            service = make_service(stub)
+            assert await service.generate_plan(*plan_inputs) == "Stub plan"
+            await service.llm.aclose()
+
+    async def test_fallback_without_api_key(self, plan_inputs, monkeypatch):
+        """Test fallback plan when no API key is configured"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        summary = await PlanService(llm_client=LLMClient()).generate_plan(*plan_inputs)
+        assert summary.startswith("Financial Plan Summary for Test User")
+
+    async def test_timeout_falls_back_quickly(self, plan_inputs):
+        """Test that a slow provider triggers the fallback at the timeout"""
+        with LLMStubServer(latency=2.0) as stub:
+            service = make_service(stub, timeout=0.3)
+            start = time.perf_counter()
+            summary = await service.generate_plan(*plan_inputs)
+            assert time.perf_counter() - start < 1.0
+            assert summary.startswith("Financial Plan Summary for Test User")
+            await service.llm.aclose()
+
+    async def test_retries_server_errors(self, plan_inputs):
+        """Test that 5xx responses are retried with backoff"""
+        with LLMStubServer(fail_first=2, reply="Recovered") as stub:
+            service = make_service(stub, max_retries=2)
+            assert await service.generate_plan(*plan_inputs) == "Recovered"
+            assert stub.request_count == 3
+            await service.llm.aclose()
+
+    async def test_gives_up_after_max_retries(self, plan_inputs):
+        """Test that exhausted retries fall back to the template plan"""
+        with LLMStubServer(fail_first=10) as stub:
+            service = make_service(stub, max_retries=1)
+            summary = await service.generate_plan(*plan_inputs)
+            assert summary.startswith("Financial Plan Summary")
+            assert stub.request_count == 2
+            await service.llm.aclose()
+
+    async def test_concurrency_is_bounded(self, plan_inputs):
+        """Test that the semaphore caps in-flight provider calls"""
+        with LLMStubServer(latency=0.1) as stub:
+            service = make_service(stub, max_concurrency=2)
+            user, portfolio, goals = plan_inputs
+            # Distinct users so the prompts differ and calls are not coalesced
+            users = [User(**{**user.to_dict(), "name": f"User {i}"}) for i in range(6)]
+            await asyncio.gather(*[service.generate_plan(u, portfolio, goals) for u in users])
+            assert stub.request_count == 6
+            assert stub.max_in_flight == 2
+            await service.llm.aclose()
+
+    async def test_event_loop_not_blocked(self, plan_inputs):
+        """Test that other coroutines keep running during an LLM call"""
+        with LLMStubServer(latency=0.5) as stub:
+            service = make_service(stub)
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.05)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await service.generate_plan(*plan_inputs)
+            task.cancel()
+            assert ticks >= 5
+            await service.llm.aclose()
+
+
+class TestStreaming:
+    """Tests for LLMClient.stream slot and connection handling"""
+
+    MESSAGES = [{"role": "user", "content": "plan"}]
+
+    async def test_slow_consumer_does_not_hold_the_slot(self):
+        """Test that the concurrency slot is released once the provider is done, not the reader"""
+        with LLMStubServer(reply="one two three four five") as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url, max_concurrency=1)
+            stream = client.stream(self.MESSAGES)
+            first = await stream.__anext__()
+
+            # The stream has not been read past its first delta, yet the only slot is free
+            assert await asyncio.wait_for(client.complete(self.MESSAGES), timeout=2) == "one two three four five"
+            assert first + "".join([delta async for delta in stream]) == "one two three four five"
+            await client.aclose()
+
+    async def test_closing_the_stream_closes_the_provider_response(self):
+        """Test that a consumer going away ends the provider stream instead of letting it run on"""
+        with LLMStubServer(reply=" ".join(["word"] * 30), chunk_delay=0.1) as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url, max_concurrency=1)
+            stream = client.stream(self.MESSAGES)
+            await stream.__anext__()
+            await stream.aclose()
+
+            deadline = time.monotonic() + 1.5
+            while stub.in_flight and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            assert stub.in_flight == 0
+            await client.aclose()
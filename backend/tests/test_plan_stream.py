@@ -0,0 +1,109 @@
+"""
+End-to-end tests for the streaming plan endpoint against a streaming LLM stub
+"""
+import json
+from unittest.mock import Mock
+
+import pytest
+from starlette.testclient import TestClient
+
+from llm_stub import LLMStubServer
+from main import app, get_db
+from services.container import get_services
+from services.llm_client import LLMClient
+from services.plan_cache import PlanCache
+from services.plan_service import PlanService
+
+REQUEST = {
+    "user_id": 1,
+    "goals": [{
+        "user_id": 1, "goal_name": "Retirement", "target_amount": 500000.0,
+        "target_date": "2050-01-01", "priority": "high",
+    }],
+}
+
+
+def parse_events(body: str):
+    """Split an SSE body into (event, data) pairs"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_client(plan_inputs, tmp_path):
+    """Test client whose plan service talks to a streaming stub"""
+    user, portfolio, _ = plan_inputs
+    db = Mock()
+    db.get_user.return_value = user
+    db.get_portfolio_by_user_id.return_value = portfolio
+
+    stub = LLMStubServer(reply="Plan line one.\nPlan line two.", chunk_delay=0.01).start()
+    cache = PlanCache(tmp_path / "plans.db", template_version="test")
+    services = Mock()
+    services.plan_service = PlanService(
+        llm_client=LLMClient(api_key="test-key", base_url=stub.url), cache=cache,
+    )
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_services] = lambda: services
+    yield TestClient(app), stub, cache, services
+    app.dependency_overrides.clear()
+    cache.close()
+    stub.stop()
+
+
+class TestPlanStreamEndpoint:
+    """Tests for /api/plan/generate/stream"""
+
+    def test_streams_tokens_and_caches_result(self, stream_client):
+        """Test that tokens arrive as separate events and the full text is cached"""
+        client, stub, cache, _ = stream_client
+        response = client.post("/api/plan/generate/stream", json=REQUEST)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_events(response.text)
+        tokens = [data["text"] for event, data in events if event == "token"]
+        assert len(tokens) > 1
+        assert "".join(tokens) == "Plan line one.\nPlan line two."
+        assert events[-1][0] == "done"
+        assert len(cache) == 1
+
+        # A second request is served from the cache without calling the stub
+        again = parse_events(client.post("/api/plan/generate/stream", json=REQUEST).text)
+        assert "".join(d["text"] for e, d in again if e == "token") == "Plan line one.\nPlan line two."
+        assert stub.request_count == 1
+
+    def test_fallback_is_streamed(self, stream_client):
+        """Test that provider failures stream the fallback plan instead"""
+        client, stub, cache, services = stream_client
+        stub.fail_first = 10
+        services.plan_service.llm.max_retries = 0
+        events = parse_events(client.post("/api/plan/generate/stream", json=REQUEST).text)
+        text = "".join(d["text"] for e, d in events if e == "token")
+        assert text.startswith("Financial Plan Summary for Test User")
+        assert len(cache) == 0
+
+    def test_unknown_user(self, stream_client):
+        """Test 404 before any streaming starts"""
+        client, _, _, _ = stream_client
+        app.dependency_overrides[get_db] = lambda: Mock(get_user=Mock(return_value=None))
+        assert client.post("/api/plan/generate/stream", json=REQUEST).status_code == 404
+
+    def test_interrupted_stream_ends_with_error(self, stream_client):
+        """Test that a provider failure after tokens were sent ends with an error event, not done"""
+        client, _, cache, services = stream_client
+
+        async def broken_stream(*args, **kwargs):
+            yield "Plan line one.\n"
+            raise ConnectionError("provider went away")
+
+        services.plan_service.llm.stream = broken_stream
+        events = parse_events(client.post("/api/plan/generate/stream", json=REQUEST).text)
+        assert events[0] == ("token", {"text": "Plan line one.\n"})
+        assert events[-1][0] == "error"
+        assert "done" not in [event for event, _ in events]
+        assert len(cache) == 0
@@ -0,0 +1,121 @@
+"""
+Unit tests for the on-demand request profiler
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from profiling import ProfileWriter, ProfilingMiddleware, StackSampler, install_profiling
+
+
+def busy_work(seconds: float):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+def make_app(tmp_path, **options):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, writer=ProfileWriter(tmp_path, max_files=3), **options)
+
+    @app.get("/api/slow/{item_id}")
+    def slow(item_id: int):
+        busy_work(0.05)
+        return {"item_id": item_id}
+
+    return app
+
+
+class TestProfilingMiddleware:
+    """Tests for request selection and profile output"""
+
+    def test_admin_header_triggers_profile(self, tmp_path):
+        client = TestClient(make_app(tmp_path, admin_token="secret"))
+
+        assert client.get("/api/slow/1").status_code == 200
+        assert list(tmp_path.glob("*.folded")) == []
+
+        assert client.get("/api/slow/1", headers={"X-Profile": "secret"}).status_code == 200
+        files = list(tmp_path.glob("*.folded"))
+        assert len(files) == 1
+        assert "_GET_api_slow_item_id_" in files[0].name
+        folded = files[0].read_text()
+        # Work done in the threadpool by the sync endpoint is attributed to the request
+        assert "busy_work (test_profiling.py" in folded
+        for line in folded.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0 and stack
+
+    def test_concurrent_requests_to_same_endpoint_kept_apart(self, tmp_path):
+        """Test that only the profiled request's worker thread is sampled"""
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, writer=ProfileWriter(tmp_path), admin_token="secret")
+
+        def other_request_work():
+            busy_work(0.3)
+
+        @app.get("/api/work/{kind}")
+        def work(kind: str):
+            other_request_work() if kind == "other" else busy_work(0.1)
+            return {"kind": kind}
+
+        async def both():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                other = asyncio.create_task(client.get("/api/work/other"))
+                await asyncio.sleep(0.05)
+                await client.get("/api/work/mine", headers={"X-Profile": "secret"})
+                await other
+
+        asyncio.run(both())
+        folded = next(tmp_path.glob("*.folded")).read_text()
+        assert "busy_work (test_profiling.py" in folded
+        assert "other_request_work" not in folded
+
+    def test_wrong_token_not_profiled(self, tmp_path):
+        client = TestClient(make_app(tmp_path, admin_token="secret"))
+        client.get("/api/slow/1", headers={"X-Profile": "guess"})
+        assert list(tmp_path.glob("*.folded")) == []
+
+    def test_sample_rate_and_retention(self, tmp_path):
+        client = TestClient(make_app(tmp_path, sample_rate=1.0))
+        for i in range(5):
+            client.get(f"/api/slow/{i}")
+        assert len(list(tmp_path.glob("*.folded"))) == 3
+
+
+class TestStackSampler:
+    """Tests for stack filtering"""
+
+    def test_only_matching_stacks_kept(self):
+        sampler = StackSampler(lambda frame: frame.f_code.co_name == "no_such_function")
+        sampler.sample()
+        assert sampler.folded() == ""
+
+        sampler = StackSampler(lambda frame: frame.f_code is TestStackSampler.test_only_matching_stacks_kept.__code__)
+        sampler.sample()
+        assert "test_only_matching_stacks_kept" in sampler.folded()
+
+
+class TestInstall:
+    """Tests that profiling costs nothing unless configured"""
+
+    def test_not_installed_by_default(self, monkeypatch):
+        monkeypatch.delenv("PROFILE_SAMPLE_RATE", raising=False)
+        monkeypatch.delenv("PROFILE_ADMIN_TOKEN", raising=False)
+        app = FastAPI()
+        assert install_profiling(app) is False
+        assert app.user_middleware == []
+
+    def test_installed_with_admin_token(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "secret")
+        monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+        app = FastAPI()
+        assert install_profiling(app) is True
+        assert app.user_middleware[0].cls is ProfilingMiddleware
@@ -0,0 +1,139 @@
+"""
+Unit tests for fast JSON responses and response compression
+"""
+import gzip
+import json
+from datetime import datetime
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+from models import Portfolio
+from responses import FastJSONResponse, dumps
+from main import app as main_app, get_db
+from schemas import FeasibilityResponse, ProjectionPoint
+
+
+class TestFastJSON:
+    """Tests for the fast encoder"""
+
+    def test_encodes_models_and_native_types(self):
+        content = {
+            "point": ProjectionPoint(year=2030, value=1.5),
+            "portfolio": Portfolio(id=1, user_id=2, allocation={"stocks": 60.0}),
+            "when": datetime(2024, 1, 2, 3, 4, 5),
+            "numpy": np.float64(0.25),
+            "array": np.array([1, 2]),
+        }
+        decoded = json.loads(dumps(content))
+        assert decoded["point"] == {"year": 2030, "value": 1.5}
+        assert decoded["portfolio"]["allocation"] == {"stocks": 60.0}
+        assert decoded["when"].startswith("2024-01-02T03:04:05")
+        assert decoded["numpy"] == 0.25
+        assert decoded["array"] == [1, 2]
+
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        content = {"points": [ProjectionPoint(year=2030 + i, value=i * 1.5) for i in range(3)], "name": "é"}
+        fast = json.loads(dumps(content))
+        monkeypatch.setattr("responses.orjson", None)
+        assert json.loads(dumps(content)) == fast
+
+    def test_unknown_type_raises(self):
+        with pytest.raises(TypeError):
+            dumps({"x": object()})
+
+
+class TestChooseEncoding:
+    """Tests for Accept-Encoding negotiation"""
+
+    def test_gzip(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", None)
+        assert choose_encoding("gzip, deflate, br") == "gzip"
+        assert choose_encoding("gzip;q=0, deflate") is None
+        assert choose_encoding("*") == "gzip"
+        assert choose_encoding("") is None
+
+    def test_brotli_preferred_when_available(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", object())
+        assert choose_encoding("gzip, br") == "br"
+        assert choose_encoding("gzip, br;q=0") == "gzip"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return {"projection": [{"year": 2025 + i, "value": i * 1000.5} for i in range(200)]}
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: x\n\n"] * 100), media_type="text/event-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"chunk " * 100] * 3), media_type="text/plain")
+
+    return TestClient(app)
+
+
+class TestCompressionMiddleware:
+    """Tests for gzip compression above the size threshold"""
+
+    def test_large_response_gzipped(self, client):
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert int(response.headers["Content-Length"]) < len(response.content)
+        assert len(response.json()["projection"]) == 200
+
+    def test_small_response_uncompressed(self, client):
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert response.json() == {"status": "ok"}
+
+    def test_no_compression_without_accept_encoding(self, client):
+        response = client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in response.headers
+
+    def test_event_stream_not_compressed(self, client):
+        response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert response.text.count("data: x") == 100
+
+    def test_streamed_body_compressed_in_chunks(self, client):
+        with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        assert gzip.decompress(raw) == b"chunk " * 300
+
+
+class TestProjectionRoutes:
+    """Tests that projection routes rendered without response_model validation match it"""
+
+    def test_feasibility_matches_response_model(self, sample_user):
+        main_app.dependency_overrides[get_db] = lambda: Mock(get_user=Mock(return_value=sample_user))
+        try:
+            response = TestClient(main_app).post("/api/portfolio/feasibility", json={
+                "user_id": 1, "allocation": {"stocks": 60, "bonds": 30, "cash": 10},
+                "goals": [{"goal_name": "Retirement", "target_amount": 500000.0,
+                           "target_date": "2050-01-01", "priority": "high"}],
+            })
+        finally:
+            main_app.dependency_overrides.clear()
+        assert response.status_code == 200
+        assert response.json() == FeasibilityResponse.model_validate(response.json()).model_dump(mode="json")
+        assert len(response.json()["projection"]) > 1
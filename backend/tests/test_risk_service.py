@@ -0,0 +1,119 @@
+"""
+Unit tests for the vectorised portfolio risk analytics
+"""
+import pytest
+import numpy as np
+from starlette.testclient import TestClient
+
+from main import app
+from services.risk_service import RiskService
+
+
+@pytest.fixture
+def risk_service():
+    return RiskService()
+
+
+class TestRiskMetrics:
+    """Tests for RiskService metric calculations"""
+
+    def test_single_allocation_metrics(self, risk_service):
+        """Test parametric metrics for a stock-only allocation"""
+        result = risk_service.analyze({"stocks": 100, "bonds": 0, "cash": 0})
+        assert result["expected_return"] == pytest.approx(0.08)
+        assert result["volatility"] == pytest.approx(0.16)
+        assert result["sharpe_ratio"] == pytest.approx((0.08 - 0.02) / 0.16, abs=1e-4)
+        # 95% one-year parametric VaR: 1.645 * 0.16 - 0.08
+        assert result["parametric_var"] == pytest.approx(1.6449 * 0.16 - 0.08, abs=1e-3)
+        assert result["parametric_cvar"] > result["parametric_var"]
+        assert 0 < result["expected_max_drawdown"] < 1
+        assert result["historical_var"] is None
+
+    def test_allocations_are_normalised(self, risk_service):
+        """Test that allocations on different scales give the same metrics"""
+        pct = risk_service.analyze({"stocks": 60, "bonds": 30, "cash": 10})
+        frac = risk_service.analyze({"stocks": 0.6, "bonds": 0.3, "cash": 0.1})
+        assert pct == frac
+
+    def test_batch_matches_single(self, risk_service):
+        """Test that batch results equal per-allocation results"""
+        allocations = [
+            {"stocks": 40, "bonds": 50, "cash": 10},
+            {"stocks": 60, "bonds": 30, "cash": 10},
+            {"stocks": 80, "bonds": 15, "cash": 5},
+        ]
+        batch = risk_service.analyze_batch(allocations)
+        assert batch == [risk_service.analyze(a) for a in allocations]
+
+    def test_riskier_allocation_has_larger_drawdown(self, risk_service):
+        """Test that drawdown and VaR increase with equity weight"""
+        results = risk_service.analyze_batch([
+            {"stocks": 20, "bonds": 70, "cash": 10},
+            {"stocks": 90, "bonds": 5, "cash": 5},
+        ])
+        assert results[1]["expected_max_drawdown"] > results[0]["expected_max_drawdown"]
+        assert results[1]["parametric_var"] > results[0]["parametric_var"]
+
+    def test_drawdown_table_is_built_in_chunks(self, monkeypatch):
+        """Test that walking the paths in time blocks gives the same table as one block"""
+        chunked = RiskService._build_drawdown_table(61)
+        monkeypatch.setattr("services.risk_service.DRAWDOWN_CHUNK_STEPS", 61)
+        assert np.array_equal(chunked, RiskService._build_drawdown_table(61))
+
+    def test_large_batch_shapes(self, risk_service):
+        """Test that thousands of allocations are handled in one call"""
+        rng = np.random.default_rng(0)
+        weights = rng.dirichlet(np.ones(3), size=5000)
+        metrics = risk_service.compute_metrics(weights)
+        for values in metrics.values():
+            assert values.shape == (5000,)
+            assert np.isfinite(values).all()
+
+    def test_historical_var_cvar(self, risk_service):
+        """Test empirical VaR/CVaR from a supplied return history"""
+        history = [{"stocks": r, "bonds": 0.0, "cash": 0.0} for r in np.linspace(-0.5, 0.49, 100)]
+        result = risk_service.analyze({"stocks": 100}, history=history)
+        assert result["historical_var"] == pytest.approx(0.45, abs=0.01)
+        assert result["historical_cvar"] == pytest.approx(0.48, abs=0.01)
+
+    def test_invalid_allocation(self, risk_service):
+        """Test that empty or negative allocations are rejected"""
+        with pytest.raises(ValueError):
+            risk_service.analyze({"stocks": 0, "bonds": 0, "cash": 0})
+        with pytest.raises(ValueError):
+            risk_service.analyze({"stocks": -10, "bonds": 110})
+
+
+class TestRiskEndpoints:
+    """Tests for /api/portfolio/risk endpoints"""
+
+    def test_risk_endpoint(self):
+        """Test single-allocation endpoint"""
+        response = TestClient(app).post(
+            "/api/portfolio/risk",
+            json={"allocation": {"stocks": 60, "bonds": 30, "cash": 10}},
+        )
+        assert response.status_code == 200
+        assert response.json()["expected_return"] == pytest.approx(0.062)
+
+    def test_risk_batch_endpoint(self):
+        """Test batch endpoint returns one result per allocation"""
+        response = TestClient(app).post(
+            "/api/portfolio/risk/batch",
+            json={
+                "allocations": [{"stocks": s, "bonds": 100 - s} for s in range(0, 101, 10)],
+                "confidence": 0.99,
+            },
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert len(results) == 11
+        assert all(r["confidence"] == 0.99 for r in results)
+
+    def test_risk_endpoint_invalid_allocation(self):
+        """Test that an all-zero allocation returns 400"""
+        response = TestClient(app).post(
+            "/api/portfolio/risk",
+            json={"allocation": {"stocks": 0}},
+        )
+        assert response.status_code == 400
@@ -0,0 +1,122 @@
+"""
+Unit tests for single-flight coalescing of identical concurrent calls
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_stub import LLMStubServer
+from schemas import FinancialGoalCreate
+from services.llm_client import LLMClient
+from services.plan_service import PlanService
+from services.portfolio_service import PortfolioService
+from services.singleflight import SingleFlight, fingerprint
+
+
+class TestFingerprint:
+    """Tests for canonical request fingerprints"""
+
+    def test_dict_order_ignored(self):
+        assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+
+    def test_values_matter(self):
+        assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight.do and SingleFlight.do_async"""
+
+    def test_threads_share_one_execution(self):
+        """Test that concurrent identical sync calls run once"""
+        flight = SingleFlight()
+        runs = []
+
+        def slow():
+            runs.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: flight.do("k", slow), range(5)))
+
+        assert len(runs) == 1
+        assert all(r is results[0] for r in results)
+        assert flight.stats()["coalesced"] == 4
+
+    def test_exceptions_are_shared(self):
+        """Test that every waiter sees the leader's exception"""
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flight.do, "k", failing)]
+            started.wait()
+            futures += [pool.submit(flight.do, "k", failing) for _ in range(2)]
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+
+    def test_sequential_calls_not_cached(self):
+        """Test that finished computations are not reused"""
+        flight = SingleFlight()
+        assert flight.do("k", lambda: 1) == 1
+        assert flight.do("k", lambda: 2) == 2
+        assert flight.stats()["executions"] == 2
+
+    async def test_async_calls_share_one_execution(self):
+        """Test that concurrent identical coroutines run once"""
+        flight = SingleFlight()
+        runs = []
+
+        async def slow(value):
+            runs.append(value)
+            await asyncio.sleep(0.1)
+            return value
+
+        results = await asyncio.gather(*[flight.do_async("k", slow, 7) for _ in range(4)])
+        assert results == [7, 7, 7, 7]
+        assert runs == [7]
+        assert flight.stats() == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0}
+
+
+class TestServiceCoalescing:
+    """Tests for coalescing inside PlanService and PortfolioService"""
+
+    async def test_identical_plans_share_one_llm_call(self, plan_inputs):
+        """Test that concurrent identical plan requests hit the LLM once"""
+        with LLMStubServer(latency=0.2, reply="Shared plan") as stub:
+            client = LLMClient(api_key="test-key", base_url=stub.url)
+            service = PlanService(llm_client=client)
+            results = await asyncio.gather(*[service.generate_plan(*plan_inputs) for _ in range(5)])
+            assert results == ["Shared plan"] * 5
+            assert stub.request_count == 1
+            assert service.inflight.stats()["coalesced"] == 4
+            await client.aclose()
+
+    def test_identical_allocations_share_one_computation(self, sample_user):
+        """Test that concurrent identical allocation requests compute once"""
+        service = PortfolioService()
+        goals = [FinancialGoalCreate(
+            user_id=1, goal_name="House", target_amount=80000.0,
+            target_date="2035-06-30", priority="high",
+        )]
+        original = service._generate_allocation
+
+        def slow_generate(*args):
+            time.sleep(0.2)
+            return original(*args)
+
+        service._generate_allocation = slow_generate
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: service.generate_allocation(sample_user, goals, 10), range(4)))
+
+        assert all(r is results[0] for r in results)
+        assert service.inflight.stats()["executions"] == 1
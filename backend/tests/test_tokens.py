@@ -0,0 +1,235 @@
+"""
+Unit tests for signed access tokens (tokens.py) and the token endpoints
+"""
+import base64
+import json
+import time
+
+import pytest
+from unittest.mock import Mock
+from starlette.testclient import TestClient
+
+import storage
+from database import DB
+from main import app, get_db
+from tokens import TokenSigner, TokenError, RevocationList, get_token_signer
+
+
+@pytest.fixture
+def signer():
+    return TokenSigner({"k1": b"secret-one"}, active_kid="k1", ttl_seconds=60)
+
+
+class TestTokenSigner:
+    """Tests for issuing and verifying tokens"""
+
+    def test_issue_and_verify(self, signer):
+        token, claims = signer.issue(7, "aggressive")
+        verified = signer.verify(token)
+        assert verified["sub"] == "7"
+        assert verified["rp"] == "aggressive"
+        assert verified["jti"] == claims["jti"]
+
+    def test_tampered_claims_rejected(self, signer):
+        token, _ = signer.issue(7, "moderate")
+        other, _ = signer.issue(8, "moderate")
+        header, _, signature = token.split(".")
+        forged = ".".join([header, other.split(".")[1], signature])
+        with pytest.raises(TokenError, match="signature"):
+            signer.verify(forged)
+
+    def test_malformed_token_rejected(self, signer):
+        for token in ("", "abc", "a.b.c", "W10.W10.W10"):
+            with pytest.raises(TokenError):
+                signer.verify(token)
+
+    def test_unhashable_kid_rejected(self, signer):
+        token, _ = signer.issue(7, "moderate")
+        _, claims_b64, signature = token.split(".")
+        for kid in (["k1"], {"k": 1}, 1):
+            header = base64.urlsafe_b64encode(
+                json.dumps({"alg": "HS256", "typ": "JWT", "kid": kid}).encode()
+            ).rstrip(b"=").decode()
+            with pytest.raises(TokenError, match="key"):
+                signer.verify(".".join([header, claims_b64, signature]))
+
+    def test_expired_token_rejected(self):
+        signer = TokenSigner({"k1": b"secret"}, active_kid="k1", ttl_seconds=-1)
+        token, _ = signer.issue(1, "moderate")
+        with pytest.raises(TokenError, match="expired"):
+            signer.verify(token)
+
+    def test_revoked_token_rejected(self, signer):
+        token, claims = signer.issue(1, "moderate")
+        signer.revoke(claims)
+        with pytest.raises(TokenError, match="revoked"):
+            signer.verify(token)
+
+    def test_rotation_keeps_old_tokens_until_retired(self, signer):
+        old_token, _ = signer.issue(1, "moderate")
+        signer.rotate("k2", b"secret-two")
+        new_token, _ = signer.issue(1, "moderate")
+
+        assert signer.verify(old_token)["sub"] == "1"
+        assert signer.verify(new_token)["sub"] == "1"
+
+        signer.retire("k1")
+        with pytest.raises(TokenError, match="key"):
+            signer.verify(old_token)
+        assert signer.verify(new_token)["sub"] == "1"
+
+    def test_cannot_retire_active_key(self, signer):
+        with pytest.raises(ValueError):
+            signer.retire("k1")
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("TOKEN_SIGNING_KEYS", "new:abc, old:def")
+        signer = TokenSigner.from_env()
+        assert signer.active_kid == "new"
+        assert set(signer.keys) == {"new", "old"}
+
+    def test_from_env_rejects_bad_entries(self, monkeypatch):
+        monkeypatch.setenv("TOKEN_SIGNING_KEYS", "missing-secret")
+        with pytest.raises(ValueError):
+            TokenSigner.from_env()
+
+
+class TestRevocationList:
+    """Tests for the bounded revocation list"""
+
+    def test_expired_entries_pruned_when_full(self):
+        revoked = RevocationList(max_entries=2)
+        revoked.revoke("a", time.time() - 1)
+        revoked.revoke("b", time.time() + 60)
+        revoked.revoke("c", time.time() + 60)
+        assert len(revoked) == 2
+        assert not revoked.is_revoked("a")
+        assert revoked.is_revoked("b") and revoked.is_revoked("c")
+
+
+class TestTokenEndpoints:
+    """Tests for login token issuance, /api/auth/me and /api/auth/logout"""
+
+    @pytest.fixture
+    def client(self, signer, sample_user):
+        db = Mock()
+        db.get_user_by_email.return_value = sample_user
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_token_signer] = lambda: signer
+        yield TestClient(app), db
+        app.dependency_overrides.clear()
+
+    def _login(self, client):
+        response = client.post(
+            "/api/auth/login",
+            json={"email": "test@example.com", "password": "testpassword123"},
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_login_returns_token(self, client):
+        test_client, _ = client
+        data = self._login(test_client)
+        assert data["token_type"] == "bearer"
+        assert data["expires_in"] == 60
+        assert data["access_token"].count(".") == 2
+        assert data["email"] == "test@example.com"
+
+    def test_me_uses_claims_only(self, client):
+        test_client, db = client
+        token = self._login(test_client)["access_token"]
+        db.reset_mock()
+
+        response = test_client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        assert response.json()["user_id"] == 1
+        assert response.json()["risk_profile"] == "moderate"
+        assert db.method_calls == []
+
+    def test_me_requires_token(self, client):
+        test_client, _ = client
+        assert test_client.get("/api/auth/me").status_code == 401
+        response = test_client.get("/api/auth/me", headers={"Authorization": "Bearer nope"})
+        assert response.status_code == 401
+
+    def test_logout_revokes_token(self, client):
+        test_client, _ = client
+        headers = {"Authorization": f"Bearer {self._login(test_client)['access_token']}"}
+
+        assert test_client.post("/api/auth/logout", headers=headers).status_code == 204
+        response = test_client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token revoked"
+
+
+class TestClaimsOnUserRoutes:
+    """Tests for bearer claims on user-scoped routes"""
+
+    @pytest.fixture
+    def client(self, signer, sample_user):
+        db = Mock()
+        db.get_user.return_value = sample_user
+        db.get_goals_by_user_id.return_value = []
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_token_signer] = lambda: signer
+        yield TestClient(app), db
+        app.dependency_overrides.clear()
+
+    @staticmethod
+    def _headers(signer, user_id):
+        token, _ = signer.issue(user_id, "moderate")
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_matching_token_skips_user_lookup(self, client, signer):
+        test_client, db = client
+        response = test_client.get("/api/users/1/goals", headers=self._headers(signer, 1))
+        assert response.status_code == 200
+        db.get_user.assert_not_called()
+
+    def test_anonymous_request_looks_user_up(self, client):
+        test_client, db = client
+        assert test_client.get("/api/users/1/goals").status_code == 200
+        db.get_user.assert_called_once_with(1)
+
+    def test_token_for_another_user_rejected(self, client, signer):
+        test_client, db = client
+        headers = self._headers(signer, 2)
+        for path in ("/api/users/1", "/api/users/1/goals", "/api/users/1/goals/5", "/api/portfolio/1"):
+            assert test_client.get(path, headers=headers).status_code == 403
+        assert db.method_calls == []
+
+    def test_invalid_token_rejected(self, client):
+        test_client, _ = client
+        response = test_client.get("/api/portfolio/1", headers={"Authorization": "Bearer nope"})
+        assert response.status_code == 401
+
+    def test_forged_kid_is_unauthorized(self, client):
+        test_client, _ = client
+        header = base64.urlsafe_b64encode(b'{"alg": "HS256", "kid": []}').rstrip(b"=").decode()
+        response = test_client.get("/api/users/1", headers={"Authorization": f"Bearer {header}.e30.c2ln"})
+        assert response.status_code == 401
+
+    def test_update_with_matching_token_skips_user_lookup(self, client, signer, sample_user):
+        test_client, db = client
+        db.patch_user.return_value = sample_user
+        body = {"name": "Renamed", "age": 31, "current_income": 80000.0,
+                "current_savings": 60000.0, "risk_profile": "aggressive"}
+
+        response = test_client.put("/api/users/1", json=body, headers=self._headers(signer, 1))
+        assert response.status_code == 200
+        assert "ETag" in response.headers
+        db.get_user.assert_not_called()
+        assert db.patch_user.call_args.args == (1, {**body, "monthly_savings": None})
+
+        assert test_client.put("/api/users/1", json=body, headers=self._headers(signer, 2)).status_code == 403
+
+    def test_patch_keeps_other_fields(self, tmp_path, monkeypatch, sample_user_data):
+        monkeypatch.setattr(storage, "USERS_FILE", tmp_path / "users.json")
+        storage.FileStorage._write_json(storage.USERS_FILE, [sample_user_data])
+
+        user = DB().patch_user(1, {"name": "Renamed", "age": 31})
+        assert user.name == "Renamed" and user.age == 31
+        assert user.email == sample_user_data["email"]
+        assert user.password_hash == sample_user_data["password_hash"]
+        assert DB().patch_user(2, {"name": "Nobody"}) is None
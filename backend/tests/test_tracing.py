@@ -0,0 +1,218 @@
+"""
+Unit tests for tracing spans, exporters and the trace debug endpoints
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+from unittest.mock import Mock
+from starlette.testclient import TestClient
+
+import tracing
+from database import DB, AsyncDB
+from main import app, get_db
+from models import Portfolio
+from tracing import JsonFileExporter, RingBufferExporter, parse_traceparent, span, traced
+
+
+@pytest.fixture
+def buffer():
+    """Route spans into a fresh ring buffer for the test"""
+    exporter = RingBufferExporter(max_traces=50)
+    previous = tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(previous)
+
+
+def only_trace(buffer):
+    (summary,) = buffer.recent()
+    return buffer.get(summary["trace_id"])
+
+
+class TestSpans:
+    """Tests for span nesting and error capture"""
+
+    def test_nested_spans_share_trace(self, buffer):
+        with span("outer") as outer:
+            with span("inner", step=1) as inner:
+                pass
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id
+        spans = only_trace(buffer)
+        assert [s["name"] for s in spans] == ["outer", "inner"]
+        assert spans[1]["attributes"] == {"step": 1}
+
+    def test_error_recorded(self, buffer):
+        with pytest.raises(KeyError):
+            with span("failing"):
+                raise KeyError("x")
+        assert only_trace(buffer)[0]["error"] == "KeyError"
+
+    def test_async_decorator_and_gather(self, buffer):
+        @traced("child")
+        async def child():
+            await asyncio.sleep(0)
+
+        async def main():
+            with span("root"):
+                await asyncio.gather(child(), child())
+
+        asyncio.run(main())
+        spans = only_trace(buffer)
+        root = spans[0]
+        assert [s["parent_id"] for s in spans[1:]] == [root["span_id"], root["span_id"]]
+
+    def test_context_follows_async_db_into_threads(self, buffer, monkeypatch, sample_user_data):
+        monkeypatch.setattr("database.UserStorage.get_by_id", lambda user_id: sample_user_data)
+
+        async def main():
+            with span("request"):
+                await AsyncDB(DB()).get_user(1)
+
+        asyncio.run(main())
+        names = {s["name"]: s for s in only_trace(buffer)}
+        assert names["db.get_user"]["parent_id"] == names["request"]["span_id"]
+
+    def test_disabled_tracing_is_noop(self):
+        previous = tracing.set_exporter(None)
+        try:
+            with span("anything") as s:
+                assert s is None
+        finally:
+            tracing.set_exporter(previous)
+
+    def test_disabled_by_default(self, monkeypatch):
+        """Test that the debug trace buffer is only built when asked for"""
+        monkeypatch.delenv("TRACING_EXPORTER", raising=False)
+        assert tracing.build_exporter() is None
+        monkeypatch.setenv("TRACING_EXPORTER", "memory")
+        assert isinstance(tracing.build_exporter(), RingBufferExporter)
+
+    def test_ring_buffer_bound(self):
+        exporter = RingBufferExporter(max_traces=3)
+        previous = tracing.set_exporter(exporter)
+        try:
+            for _ in range(5):
+                with span("t"):
+                    pass
+        finally:
+            tracing.set_exporter(previous)
+        assert len(exporter.recent(10)) == 3
+
+
+class TestExporters:
+    """Tests for the OTLP JSON file exporter"""
+
+    def test_json_file_lines_are_otlp(self, tmp_path):
+        exporter = JsonFileExporter(tmp_path / "traces.jsonl")
+        previous = tracing.set_exporter(exporter)
+        try:
+            with span("outer"):
+                with span("inner", rows=3):
+                    pass
+        finally:
+            tracing.set_exporter(previous)
+            exporter.close()
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        assert len(lines) == 2
+        inner = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        outer = json.loads(lines[1])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert inner["parentSpanId"] == outer["spanId"]
+        assert len(inner["traceId"]) == 32 and len(inner["spanId"]) == 16
+        assert inner["attributes"] == [{"key": "rows", "value": {"intValue": "3"}}]
+        assert int(inner["endTimeUnixNano"]) >= int(inner["startTimeUnixNano"])
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent parsing"""
+
+    def test_valid(self):
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        assert parse_traceparent(header) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+
+    @pytest.mark.parametrize("header", [None, "", "garbage", "00-xyz-00f067aa0ba902b7-01",
+                                        "00-00000000000000000000000000000000-00f067aa0ba902b7-01"])
+    def test_invalid(self, header):
+        assert parse_traceparent(header) is None
+
+
+class TestTracingMiddleware:
+    """Tests for request root spans, X-Trace-Id and the debug endpoints"""
+
+    @pytest.fixture
+    def client(self, buffer, plan_inputs):
+        user, portfolio, _ = plan_inputs
+        db = Mock()
+        db.get_user.return_value = user
+        db.get_portfolio_by_user_id.return_value = portfolio
+        app.dependency_overrides[get_db] = lambda: db
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+
+    def test_plan_request_trace(self, client, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        response = client.post("/api/plan/generate", json={"user_id": 1, "goals": []})
+        assert response.status_code == 200
+        trace_id = response.headers["X-Trace-Id"]
+
+        trace = client.get(f"/api/debug/traces/{trace_id}").json()
+        names = [s["name"] for s in trace["spans"]]
+        assert names[0] == "POST /api/plan/generate"
+        assert "plan.generate" in names and "plan.build_prompt" in names
+        root = trace["spans"][0]
+        assert root["attributes"]["http.status_code"] == 200
+        assert root["attributes"]["http.route"] == "/api/plan/generate"
+
+    def test_incoming_traceparent_continued(self, client):
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        response = client.get("/api/health", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+        assert response.headers["X-Trace-Id"] == trace_id
+
+    def test_recent_and_unknown_trace(self, client):
+        client.get("/api/health")
+        recent = client.get("/api/debug/traces").json()["traces"]
+        assert recent[0]["name"] == "GET /api/health"
+        assert client.get("/api/debug/traces/" + "0" * 32).status_code == 404
+
+
+class TestFileExporterWriter:
+    """Tests that the file exporter keeps I/O off the exporting thread"""
+
+    def test_spans_written_by_background_thread(self, tmp_path, monkeypatch):
+        exporter = JsonFileExporter(tmp_path / "traces.jsonl", flush_interval=10)
+        writers = []
+        write_batch = exporter._write_batch
+
+        def recording_write_batch(f):
+            writers.append(threading.current_thread().name)
+            write_batch(f)
+
+        monkeypatch.setattr(exporter, "_write_batch", recording_write_batch)
+        previous = tracing.set_exporter(exporter)
+        try:
+            for _ in range(5):
+                with span("request"):
+                    pass
+        finally:
+            tracing.set_exporter(previous)
+        # Nothing is written on the exporting thread; close() drains the queue
+        assert not (tmp_path / "traces.jsonl").exists() or (tmp_path / "traces.jsonl").read_text() == ""
+        exporter.close()
+
+        assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 5
+        assert writers and set(writers) == {"trace-exporter"}
+
+    def test_full_queue_drops_spans(self, tmp_path):
+        exporter = JsonFileExporter(tmp_path / "traces.jsonl", max_queue=2, flush_interval=10)
+        previous = tracing.set_exporter(exporter)
+        try:
+            for _ in range(5):
+                with span("request"):
+                    pass
+        finally:
+            tracing.set_exporter(previous)
+        exporter.close()
+        assert exporter.dropped == 3
+        assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 2
@@ -0,0 +1,114 @@
+"""
+Unit tests for the what-if WebSocket: session setup, latest-wins debouncing
+and error handling
+"""
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import storage
+from database import DB
+from main import app, get_db
+from services.container import shutdown_services
+from services.what_if import LatestWins
+from storage import FileStorage
+
+ALLOCATION = {"stocks": 60, "bonds": 30, "cash": 10}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, sample_user_data):
+    """Client over real file storage in tmp_path with one user and two goals"""
+    for name in ("USERS_FILE", "PORTFOLIOS_FILE", "GOALS_FILE"):
+        monkeypatch.setattr(storage, name, tmp_path / f"{name.lower()}.json")
+    monkeypatch.setenv("WHATIF_DEBOUNCE_MS", "200")
+    FileStorage._write_json(storage.USERS_FILE, [sample_user_data])
+    FileStorage._write_json(storage.GOALS_FILE, [
+        {"id": 1, "user_id": 1, "goal_name": "Retirement", "target_amount": 500000.0,
+         "target_date": "2050-01-01", "priority": "high"},
+        {"id": 2, "user_id": 1, "goal_name": "Car", "target_amount": 30000.0,
+         "target_date": "2028-06-01", "priority": "medium"},
+    ])
+    shutdown_services()
+    app.dependency_overrides[get_db] = lambda: DB()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    shutdown_services()
+
+
+class TestWhatIfSocket:
+    """Tests for /api/portfolio/what-if/{user_id}"""
+
+    def test_ready_then_feasibility(self, client):
+        with client.websocket_connect("/api/portfolio/what-if/1") as ws:
+            ready = ws.receive_json()
+            assert ready["type"] == "ready" and ready["goals"] == 2 and ready["goals_version"]
+
+            ws.send_json({"allocation": ALLOCATION, "seq": 1})
+            message = ws.receive_json()
+        assert message["type"] == "feasibility" and message["seq"] == 1
+
+        http = client.post("/api/portfolio/feasibility", json={"user_id": 1, "allocation": ALLOCATION})
+        assert message["result"] == http.json()
+
+    def test_burst_computes_only_the_latest(self, client):
+        with client.websocket_connect("/api/portfolio/what-if/1") as ws:
+            ws.receive_json()
+            for seq in range(1, 11):
+                ws.send_json({"allocation": {"stocks": 50 + seq, "bonds": 40 - seq, "cash": 10}, "seq": seq})
+            first = ws.receive_json()
+            ws.send_json({"allocation": ALLOCATION, "seq": 11})
+            second = ws.receive_json()
+
+        assert first["seq"] == 10
+        assert first["result"]["expected_return"] == round((60 * 0.08 + 30 * 0.04 + 10 * 0.02) / 100, 4)
+        assert second["seq"] == 11
+
+    def test_invalid_update_keeps_session_open(self, client):
+        with client.websocket_connect("/api/portfolio/what-if/1") as ws:
+            ws.receive_json()
+            ws.send_text("not json")
+            error = ws.receive_json()
+            ws.send_json({"allocation": {"stocks": "lots"}})
+            invalid_field = ws.receive_json()
+            ws.send_json({"allocation": ALLOCATION, "seq": 3})
+            result = ws.receive_json()
+
+        assert error["type"] == "error"
+        assert invalid_field["type"] == "error"
+        assert invalid_field["detail"][0]["loc"] == ["allocation", "stocks"]
+        assert result["type"] == "feasibility" and result["seq"] == 3
+
+    def test_unknown_user_is_closed(self, client):
+        with client.websocket_connect("/api/portfolio/what-if/99") as ws:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                ws.receive_json()
+        assert closed.value.code == 4404
+
+
+class TestLatestWins:
+    """Tests for the single-slot mailbox"""
+
+    def test_newest_value_wins(self):
+        async def scenario():
+            slot = LatestWins()
+            for value in range(5):
+                slot.put(value)
+            first = await slot.take()
+            slot.put("next")
+            return first, await slot.take(), slot.superseded
+
+        assert asyncio.run(scenario()) == (4, "next", 4)
+
+    def test_values_arriving_while_settling_are_included(self):
+        async def scenario():
+            slot = LatestWins()
+            slot.put("first")
+            taking = asyncio.create_task(slot.take(settle=0.05))
+            await asyncio.sleep(0.01)
+            slot.put("during settle")
+            return await taking
+
+        assert asyncio.run(scenario()) == "during settle"
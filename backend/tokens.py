@@ -0,0 +1,209 @@
+"""
+Signed access tokens
+Stateless HS256 JWTs issued at login.  The token carries the user id and
+risk profile, so endpoints that only need those claims skip the storage
+lookup; user-scoped routes accept an optional token and reject one issued
+for another user.  Keys are identified by `kid` for rotation: the first key in
+TOKEN_SIGNING_KEYS signs, every listed key verifies.  Revoked token ids are
+kept in a bounded in-memory list until they would have expired anyway.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from schemas import TokenClaims
+
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", 3600))
+REVOCATION_MAX_ENTRIES = 100_000
+
+
+class TokenError(Exception):
+    """Raised when a token is malformed, forged, expired or revoked"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class RevocationList:
+    """Revoked token ids mapped to their expiry; expired entries are pruned"""
+
+    def __init__(self, max_entries: int = REVOCATION_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: float):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._prune(time.time())
+            if len(self._entries) >= self.max_entries:
+                # Still full: drop the entry closest to expiring on its own
+                del self._entries[min(self._entries, key=self._entries.get)]
+            self._entries[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._entries
+
+    def _prune(self, now: float):
+        for jti in [j for j, exp in self._entries.items() if exp <= now]:
+            del self._entries[jti]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenSigner:
+    """Issues and verifies HS256 tokens with key rotation support"""
+
+    def __init__(self, keys: Dict[str, bytes], active_kid: str, ttl_seconds: int = TOKEN_TTL_SECONDS):
+        if active_kid not in keys:
+            raise ValueError("active key id must be one of the configured keys")
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+        self.ttl_seconds = ttl_seconds
+        self.revocations = RevocationList()
+
+    @classmethod
+    def from_env(cls) -> "TokenSigner":
+        """
+        Keys from TOKEN_SIGNING_KEYS ("kid:secret,kid:secret", first signs).
+        Without it an ephemeral key is generated, so tokens do not survive a
+        restart and are not shared between workers.
+        """
+        raw = os.getenv("TOKEN_SIGNING_KEYS", "")
+        keys = {}
+        for pair in filter(None, (p.strip() for p in raw.split(","))):
+            kid, _, secret = pair.partition(":")
+            if not kid or not secret:
+                raise ValueError("TOKEN_SIGNING_KEYS entries must look like kid:secret")
+            keys[kid] = secret.encode("utf-8")
+        if not keys:
+            keys = {"ephemeral": secrets.token_bytes(32)}
+        return cls(keys, active_kid=next(iter(keys)))
+
+    def rotate(self, kid: str, secret: bytes):
+        """Start signing with a new key; older keys keep verifying until removed"""
+        self.keys[kid] = secret
+        self.active_kid = kid
+
+    def retire(self, kid: str):
+        """Stop accepting tokens signed with `kid`"""
+        if kid == self.active_kid:
+            raise ValueError("cannot retire the active signing key")
+        self.keys.pop(kid, None)
+
+    def _sign(self, kid: str, signing_input: bytes) -> bytes:
+        return hmac.new(self.keys[kid], signing_input, hashlib.sha256).digest()
+
+    def issue(self, user_id: int, risk_profile: str) -> Tuple[str, Dict]:
+        """Return (token, claims) for a user"""
+        now = int(time.time())
+        header = {"alg": "HS256", "typ": "JWT", "kid": self.active_kid}
+        claims = {
+            "sub": str(user_id),
+            "rp": risk_profile,
+            "iat": now,
+            "exp": now + self.ttl_seconds,
+            "jti": uuid.uuid4().hex,
+        }
+        signing_input = (
+            _b64encode(json.dumps(header, separators=(",", ":")).encode("utf-8")) + "." +
+            _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        ).encode("ascii")
+        token = signing_input.decode("ascii") + "." + _b64encode(self._sign(self.active_kid, signing_input))
+        return token, claims
+
+    def verify(self, token: str) -> Dict:
+        """Return the claims of a valid token or raise TokenError"""
+        try:
+            header_b64, claims_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64decode(header_b64))
+            claims = json.loads(_b64decode(claims_b64))
+            signature = _b64decode(signature_b64)
+        except (ValueError, AttributeError):
+            raise TokenError("Malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise TokenError("Malformed token")
+
+        kid = header.get("kid")
+        # A forged header may carry any JSON value; only strings can name a key
+        if header.get("alg") != "HS256" or not isinstance(kid, str) or kid not in self.keys:
+            raise TokenError("Unknown signing key")
+        expected = self._sign(kid, f"{header_b64}.{claims_b64}".encode("ascii"))
+        if not hmac.compare_digest(signature, expected):
+            raise TokenError("Invalid signature")
+        if claims.get("exp", 0) <= time.time():
+            raise TokenError("Token expired")
+        if self.revocations.is_revoked(claims.get("jti", "")):
+            raise TokenError("Token revoked")
+        return claims
+
+    def revoke(self, claims: Dict):
+        self.revocations.revoke(claims["jti"], claims["exp"])
+
+
+_signer: Optional[TokenSigner] = None
+_signer_lock = threading.Lock()
+
+
+def get_token_signer() -> TokenSigner:
+    """Dependency function that returns the process-wide token signer"""
+    global _signer
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                _signer = TokenSigner.from_env()
+    return _signer
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _verified_claims(credentials: HTTPAuthorizationCredentials, signer: TokenSigner) -> TokenClaims:
+    try:
+        claims = signer.verify(credentials.credentials)
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return TokenClaims(
+        user_id=int(claims["sub"]),
+        risk_profile=claims["rp"],
+        jti=claims["jti"],
+        expires_at=claims["exp"],
+    )
+
+
+def get_current_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    signer: TokenSigner = Depends(get_token_signer),
+) -> TokenClaims:
+    """Dependency: verified claims from the Authorization bearer token (no storage access)"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return _verified_claims(credentials, signer)
+
+
+def get_optional_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    signer: TokenSigner = Depends(get_token_signer),
+) -> Optional[TokenClaims]:
+    """Dependency: like get_current_claims, but None when no bearer token is sent"""
+    if credentials is None:
+        return None
+    return _verified_claims(credentials, signer)
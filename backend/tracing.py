@@ -0,0 +1,335 @@
+"""
+Lightweight tracing
+Spans are propagated through contextvars, so nested `with span(...)` blocks
+(and threadpool work started with a copied context) form one trace per
+request.  Finished spans go to a pluggable exporter:
+
+- RingBufferExporter: the most recent traces in memory, served by the
+  unauthenticated /api/debug/traces routes (debugging only)
+- JsonFileExporter: one OTLP/JSON ExportTraceServiceRequest per line,
+  written in batches from a background thread
+- none: tracing disabled, span() is a no-op (default)
+
+Configured with TRACING_EXPORTER (none | memory | file), TRACING_FILE and
+TRACING_MAX_TRACES.
+"""
+import asyncio
+import atexit
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SERVICE_NAME = "financial-planning-api"
+DEFAULT_TRACE_FILE = Path(__file__).parent / "data" / "traces.jsonl"
+TRACE_ID_HEADER = "x-trace-id"
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start_ns", "end_ns", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: str = "internal", attributes: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> Dict:
+        """Span in the OTLP/JSON encoding"""
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.kind == "server" else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+class RingBufferExporter:
+    """Keeps the spans of the most recent `max_traces` traces in memory"""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+
+    def get(self, trace_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return [s.to_dict() for s in sorted(spans, key=lambda s: s.start_ns)] if spans else None
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        """Summaries of the newest traces, newest first"""
+        with self._lock:
+            traces = list(self._traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(traces):
+            root = next((s for s in spans if s.parent_id is None), spans[0])
+            summaries.append({
+                "trace_id": trace_id,
+                "name": root.name,
+                "duration_ms": root.duration_ms,
+                "spans": len(spans),
+                "error": any(s.error for s in spans),
+            })
+        return summaries
+
+
+class JsonFileExporter:
+    """
+    Appends each span as an OTLP/JSON ExportTraceServiceRequest line.
+    export() only queues the span: a background thread encodes and writes
+    the queued spans every `flush_interval` seconds, with one flush per
+    batch, so requests never wait on file I/O.  Spans arriving while
+    `max_queue` are already pending are dropped and counted.
+    """
+
+    def __init__(self, path, max_queue: int = 10000, flush_interval: float = 0.5):
+        self.path = Path(path)
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def export(self, span: Span):
+        if self._closed or len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            while not self._stop.wait(self.flush_interval):
+                self._write_batch(f)
+            self._write_batch(f)
+
+    def _write_batch(self, f):
+        lines = []
+        while self._queue:
+            span = self._queue.popleft()
+            lines.append(json.dumps({
+                "resourceSpans": [{
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                    "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [span.to_otlp()]}],
+                }]
+            }, default=str) + "\n")
+        if lines:
+            f.write("".join(lines))
+            f.flush()
+
+    def close(self):
+        """Write the spans still queued and stop the writer thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+
+def build_exporter():
+    """Exporter configured from TRACING_* environment variables (None disables tracing)"""
+    kind = os.getenv("TRACING_EXPORTER", "none").lower()
+    if kind == "file":
+        return JsonFileExporter(os.getenv("TRACING_FILE", str(DEFAULT_TRACE_FILE)))
+    if kind == "memory":
+        return RingBufferExporter(max_traces=int(os.getenv("TRACING_MAX_TRACES", 200)))
+    return None
+
+
+_exporter = build_exporter()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_exporter():
+    return _exporter
+
+
+def set_exporter(exporter):
+    """Swap the exporter (None disables tracing); returns the previous one"""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", parent: Optional[Tuple[str, str]] = None,
+         **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the current span (or of `parent`,
+    a (trace_id, span_id) pair from an incoming request).  Yields None when
+    tracing is disabled.
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield None
+        return
+    current = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent
+    elif current is not None:
+        trace_id, parent_id = current.trace_id, current.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    s = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current_span.reset(token)
+        exporter.export(s)
+
+
+def traced(name: str):
+    """Decorator form of span() for sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span id) from a W3C traceparent header, if valid"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None
+    return parts[1].lower(), parts[2].lower()
+
+
+class TracingMiddleware:
+    """Root span per HTTP request; the trace id is returned in X-Trace-Id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with span(f"{scope['method']} {scope['path']}", kind="server",
+                  parent=parse_traceparent(traceparent), **{"http.method": scope["method"]}) as root:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (TRACE_ID_HEADER.encode("latin-1"), root.trace_id.encode("latin-1"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
+                    root.set_attribute("http.route", route)